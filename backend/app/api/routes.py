@@ -1,19 +1,27 @@
 """API routes for hadiscover."""
 
+import asyncio
 import logging
 import os
-from datetime import datetime, timedelta, timezone
-from typing import List, Optional
-
-from app.models import get_db
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+import orjson
+from app.models import SessionLocal, get_session_factory
+from app.services.cache import CachedResponse, accepts_gzip, response_cache
 from app.services.indexer import IndexingService
-from app.services.search_service import SearchService
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from app.services.search_service import AutomationRow, SearchCursor, SearchService
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 def is_development() -> bool:
     """Check if running in development mode."""
@@ -22,12 +30,109 @@ def is_development() -> bool:
 
 router = APIRouter()
 
-# Rate limiting for indexing endpoint
-last_indexing_time: Optional[datetime] = None
 INDEXING_COOLDOWN_MINUTES = 10
 
+# Statistics only change when indexing completes, which clears the cache
+STATISTICS_CACHE_TTL_SECONDS = 300
+
+DEFAULT_PER_PAGE = 15
+
+
+class IndexingRateLimiter:
+    """Allows at most one indexing run to start per cooldown window."""
+
+    def __init__(self, cooldown_seconds: float):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            cooldown_seconds: Minimum time between two indexing runs in seconds
+        """
+        self.cooldown_seconds = cooldown_seconds
+        self._last_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> Optional[float]:
+        """
+        Atomically check the cooldown and start a new window if it has passed.
+
+        Uses the monotonic clock, so wall clock changes cannot shorten or
+        extend the cooldown.
+
+        Returns:
+            None if a new window was started, otherwise the remaining cooldown
+            in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_started is not None:
+                elapsed = now - self._last_started
+                if elapsed < self.cooldown_seconds:
+                    return self.cooldown_seconds - elapsed
+            self._last_started = now
+            return None
+
+    def reset(self) -> None:
+        """Clear the cooldown so the next run may start immediately."""
+        with self._lock:
+            self._last_started = None
+
+
+# Rate limiting for indexing endpoint
+indexing_rate_limiter = IndexingRateLimiter(INDEXING_COOLDOWN_MINUTES * 60)
+
+# Manual indexing runs on one dedicated thread with its own event loop, so a
+# long run never stalls request handling and runs never overlap
+indexing_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indexing")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check whether an If-None-Match header matches an entity tag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cached_json_response(
+    request: Request, cached: CachedResponse, max_age: Optional[float] = None
+) -> Response:
+    """
+    Build a JSON response for a cached body, honouring If-None-Match.
+
+    Args:
+        request: Incoming request
+        cached: Cached response body and entity tag
+        max_age: Cache-Control max-age in seconds (defaults to the cache TTL)
+
+    Returns:
+        304 response if the client copy is current, otherwise the cached body,
+        precompressed for clients that accept gzip
+    """
+    if max_age is None:
+        max_age = response_cache.ttl
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={int(max_age)}",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    if cached.gzip_body is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if accepts_gzip(request.headers.get("accept-encoding")):
+            # The GZip middleware passes responses with an encoding through
+            headers["Content-Encoding"] = "gzip"
+            return Response(
+                content=cached.gzip_body,
+                media_type="application/json",
+                headers=headers,
+            )
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 
 # Pydantic models for API
+
+
 class RepositoryResponse(BaseModel):
     """Repository information in API response."""
 
@@ -112,6 +217,7 @@ class SearchResponse(BaseModel):
     page: int
     per_page: int
     facets: Facets
+    next_cursor: Optional[str] = None
 
 
 class StatisticsResponse(BaseModel):
@@ -130,43 +236,169 @@ class IndexResponse(BaseModel):
     started: bool
 
 
-class IndexStatusResponse(BaseModel):
-    """Indexing status response."""
+async def _run_in_session(
+    session_factory: sessionmaker, func: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """
+    Run a synchronous query function in a worker thread with its own session.
+
+    Sessions are not thread-safe, so every concurrent query gets a fresh
+    session from the shared pool.
+
+    Args:
+        session_factory: Factory for database sessions
+        func: Function taking the session as its first argument
+        *args: Further positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The return value of func
+    """
+
+    def run() -> T:
+        db = session_factory()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await asyncio.to_thread(run)
+
+
+def _next_cursor(
+    last_result: Optional[AutomationRow], count: int, per_page: int
+) -> Optional[str]:
+    """Return the cursor for the following page, or None on the last page."""
+    if last_result is None or count < per_page:
+        return None
+    return SearchService.encode_cursor(last_result)
+
+
+async def _get_facets(
+    session_factory: sessionmaker, q: str, filters: Dict[str, Optional[str]]
+) -> Dict[str, Any]:
+    """
+    Return the facets for a query and filters, computing them on a miss.
+
+    Facets do not depend on the page, so they are cached apart from the
+    search responses and shared by every page and by streamed responses.
 
-    repositories_found: int
-    repositories_indexed: int
-    automations_indexed: int
-    errors: int
+    Args:
+        session_factory: Factory for the session used on a cache miss
+        q: Search query string
+        filters: Keyword filters for SearchService.get_facets
+
+    Returns:
+        Facets for filtering
+    """
+    cache_key = _facets_cache_key(q, filters)
+    cached = response_cache.get("facets", cache_key)
+    if cached is not None:
+        return orjson.loads(cached.body)
+
+    facets = await _run_in_session(
+        session_factory, SearchService.get_facets, q, **filters
+    )
+    response_cache.set("facets", cache_key, orjson.dumps(facets), compress=False)
+    return facets
+
+
+def _stream_search_response(
+    q: str,
+    page: int,
+    per_page: int,
+    total: int,
+    facets: Dict[str, Any],
+    filters: Dict[str, Optional[str]],
+    session_factory: sessionmaker,
+    cursor: Optional[SearchCursor] = None,
+) -> Iterator[bytes]:
+    """
+    Encode a search response as JSON chunks while rows are read.
+
+    The generator uses its own session because it keeps reading after the
+    request's session dependency has been closed.
 
+    Args:
+        q: Search query string
+        page: Page number
+        per_page: Results per page
+        total: Total number of matching automations
+        facets: Facets for filtering
+        filters: Keyword filters for SearchService.iter_automations
+        session_factory: Factory for the session used to read rows
+        cursor: Decoded cursor to continue from
+
+    Yields:
+        Chunks of the SearchResponse JSON document
+    """
+    yield (
+        b'{"query":'
+        + orjson.dumps(q)
+        + b',"total":%d,"page":%d,"per_page":%d,"results":[' % (total, page, per_page)
+    )
+    count = 0
+    last_result: Optional[AutomationRow] = None
+    db = session_factory()
+    try:
+        for result in SearchService.iter_automations(
+            db, q, page=page, per_page=per_page, cursor=cursor, **filters
+        ):
+            yield (b"," if count else b"") + orjson.dumps(result)
+            count += 1
+            last_result = result
+    finally:
+        db.close()
+    next_cursor = _next_cursor(last_result, count, per_page)
+    yield (
+        b'],"count":%d,"facets":' % count
+        + orjson.dumps(facets)
+        + b',"next_cursor":'
+        + orjson.dumps(next_cursor)
+        + b"}"
+    )
 
-@router.get("/search", response_model=SearchResponse)
+
+@router.get("/search", response_model=None, responses={200: {"model": SearchResponse}})
 async def search_automations(
+    request: Request,
     q: str = "",
-    page: int = 1,
-    per_page: int = 15,
+    page: int = Query(1, deprecated=True),
+    per_page: int = DEFAULT_PER_PAGE,
     repo: Optional[str] = None,
     blueprint: Optional[str] = None,
     trigger: Optional[str] = None,
     action_domain: Optional[str] = None,
     action: Optional[str] = None,
-    db: Session = Depends(get_db),
-):
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> Response:
     """
     Search for Home Assistant automations.
 
     Args:
         q: Search query string (searches across automation name, description, triggers, actions, and repository)
-        page: Page number (default: 1, min: 1)
+        page: Page number (default: 1, min: 1); deprecated in favour of cursor
         per_page: Results per page (default: 15, max: 100)
         repo: Filter by repository (format: "owner/name")
         blueprint: Filter by blueprint path
         trigger: Filter by trigger type
         action_domain: Filter by action domain (e.g., "media_player")
         action: Filter by action call (service name)
-        db: Database session
+        cursor: next_cursor from a previous response; continues after it
+            without an offset scan and takes precedence over page
+        stream: Stream the results as they are read instead of buffering the page
+        session_factory: Factory for the sessions used by the concurrent queries
 
     Returns:
-        Search results with matching automations and facets for filtering
+        Search results with matching automations and facets for filtering.
+        Responses are cached briefly and carry an ETag; a matching
+        If-None-Match header yields 304 Not Modified. Streamed responses
+        are neither cached nor tagged.
+
+    Raises:
+        HTTPException: If the cursor is malformed
     """
     # Validate and constrain parameters
     if page < 1:
@@ -176,68 +408,221 @@ async def search_automations(
     if per_page < 10:
         per_page = 10
 
-    results, total = SearchService.search_automations(
-        db,
-        q,
-        page=page,
-        per_page=per_page,
-        repo_filter=repo,
-        blueprint_filter=blueprint,
-        trigger_filter=trigger,
-        action_domain_filter=action_domain,
-        action_filter=action,
-    )
+    decoded_cursor: Optional[SearchCursor] = None
+    if cursor:
+        try:
+            decoded_cursor = SearchService.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    filters = _search_filters(repo, blueprint, trigger, action_domain, action)
+
+    if stream:
+        total, facets = await asyncio.gather(
+            _run_in_session(
+                session_factory, SearchService.count_automations, q, **filters
+            ),
+            _get_facets(session_factory, q, filters),
+        )
+        return StreamingResponse(
+            _stream_search_response(
+                q,
+                page,
+                per_page,
+                total,
+                facets,
+                filters,
+                session_factory,
+                cursor=decoded_cursor,
+            ),
+            media_type="application/json",
+        )
 
-    facets = SearchService.get_facets(
-        db,
-        q,
-        repo_filter=repo,
-        blueprint_filter=blueprint,
-        trigger_filter=trigger,
-        action_domain_filter=action_domain,
-        action_filter=action,
+    cache_key = _search_cache_key(q, page, per_page, filters, cursor)
+    cached = response_cache.get("search", cache_key)
+    if cached is not None:
+        return _cached_json_response(request, cached)
+
+    # Results and facets are independent queries, so run them side by side
+    (results, total), facets = await asyncio.gather(
+        _run_in_session(
+            session_factory,
+            SearchService.search_automations,
+            q,
+            page=page,
+            per_page=per_page,
+            cursor=decoded_cursor,
+            **filters,
+        ),
+        _get_facets(session_factory, q, filters),
     )
 
+    body = _search_response_body(q, page, per_page, results, total, facets)
+    cached = response_cache.set("search", cache_key, body)
+    return _cached_json_response(request, cached)
+
+
+def _search_filters(
+    repo: Optional[str] = None,
+    blueprint: Optional[str] = None,
+    trigger: Optional[str] = None,
+    action_domain: Optional[str] = None,
+    action: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """Map the search query parameters to SearchService filter keywords."""
     return {
-        "query": q,
-        "results": results,
-        "count": len(results),
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "facets": facets,
+        "repo_filter": repo,
+        "blueprint_filter": blueprint,
+        "trigger_filter": trigger,
+        "action_domain_filter": action_domain,
+        "action_filter": action,
     }
 
 
+def _search_cache_key(
+    q: str,
+    page: int,
+    per_page: int,
+    filters: Dict[str, Optional[str]],
+    cursor: Optional[str],
+) -> str:
+    """Build the response cache key of a buffered search response."""
+    return response_cache.make_key(q, page, per_page, *filters.values(), cursor)
+
+
+def _facets_cache_key(q: str, filters: Dict[str, Optional[str]]) -> str:
+    """Build the response cache key of the facets for a query and filters."""
+    return response_cache.make_key(q, *filters.values())
+
+
+def _search_response_body(
+    q: str,
+    page: int,
+    per_page: int,
+    results: List[AutomationRow],
+    total: int,
+    facets: Dict[str, Any],
+) -> bytes:
+    """
+    Encode a buffered search response.
+
+    The service already returns rows in the SearchResponse layout, so the
+    body is encoded directly instead of being validated field by field.
+
+    Args:
+        q: Search query string
+        page: Page number
+        per_page: Results per page
+        results: Automation results of the page
+        total: Total number of matching automations
+        facets: Facets for filtering
+
+    Returns:
+        Serialized SearchResponse JSON
+    """
+    return orjson.dumps(
+        {
+            "query": q,
+            "results": results,
+            "count": len(results),
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "facets": facets,
+            "next_cursor": _next_cursor(
+                results[-1] if results else None, len(results), per_page
+            ),
+        }
+    )
+
+
+def _get_statistics_response(db: Session) -> CachedResponse:
+    """
+    Return the cached statistics response, computing it on a miss.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Cached statistics response body and entity tag
+    """
+    cached = response_cache.get("statistics", "")
+    if cached is None:
+        stats = StatisticsResponse.model_validate(SearchService.get_statistics(db))
+        cached = response_cache.set(
+            "statistics",
+            "",
+            stats.model_dump_json().encode("utf-8"),
+            ttl=STATISTICS_CACHE_TTL_SECONDS,
+        )
+    return cached
+
+
+def warm_up_caches(session_factory: sessionmaker) -> None:
+    """
+    Prime the database and response caches before serving traffic.
+
+    Stores the statistics response and the default search response with its
+    facets under the keys the routes look up, so the first requests are
+    cache hits. Computing them also pulls the hot SQLite pages into memory
+    and compiles the most common statements.
+
+    Args:
+        session_factory: Factory for the warm-up session
+    """
+    filters = _search_filters()
+    db = session_factory()
+    try:
+        _get_statistics_response(db)
+        results, total = SearchService.search_automations(
+            db, "", per_page=DEFAULT_PER_PAGE
+        )
+        facets = SearchService.get_facets(db, "")
+    finally:
+        db.close()
+
+    response_cache.set(
+        "facets", _facets_cache_key("", filters), orjson.dumps(facets), compress=False
+    )
+    response_cache.set(
+        "search",
+        _search_cache_key("", 1, DEFAULT_PER_PAGE, filters, None),
+        _search_response_body("", 1, DEFAULT_PER_PAGE, results, total, facets),
+    )
+
+
 @router.get("/statistics", response_model=StatisticsResponse)
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(
+    request: Request,
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
     """
     Get statistics about indexed repositories and automations.
 
+    Cache hits are answered without a database session; misses run the
+    aggregation in a worker thread so the event loop stays free.
+
     Args:
-        db: Database session
+        request: Incoming request
+        session_factory: Factory for the session used on a cache miss
 
     Returns:
         Statistics about indexed data
     """
-    stats = SearchService.get_statistics(db)
-    return stats
+    cached = response_cache.get("statistics", "")
+    if cached is None:
+        cached = await _run_in_session(session_factory, _get_statistics_response)
+    return _cached_json_response(request, cached, STATISTICS_CACHE_TTL_SECONDS)
 
 
 @router.post("/index", response_model=IndexResponse)
-async def trigger_indexing(
-    background_tasks: BackgroundTasks, db: Session = Depends(get_db)
-):
+async def trigger_indexing():
     """
     Trigger indexing of repositories with hadiscover or ha-discover topics.
 
     This endpoint is only available in development mode.
     In production, indexing runs on a daily schedule via GitHub Actions.
 
-    Args:
-        background_tasks: FastAPI background tasks
-        db: Database session
-
     Returns:
         Confirmation that indexing has started
 
@@ -251,39 +636,33 @@ async def trigger_indexing(
             detail="This endpoint is not available in production. Indexing runs on a daily schedule.",
         )
 
-    global last_indexing_time
-
-    # Check if indexing was recently triggered
-    if last_indexing_time is not None:
-        time_since_last = datetime.now(timezone.utc) - last_indexing_time
-        cooldown = timedelta(minutes=INDEXING_COOLDOWN_MINUTES)
-
-        if time_since_last < cooldown:
-            remaining_seconds = int((cooldown - time_since_last).total_seconds())
-            remaining_minutes = remaining_seconds // 60
-            remaining_seconds = remaining_seconds % 60
+    # Check if indexing was recently triggered and start a new cooldown if not
+    remaining = indexing_rate_limiter.try_acquire()
+    if remaining is not None:
+        remaining_seconds = int(remaining)
+        remaining_minutes = remaining_seconds // 60
+        remaining_seconds = remaining_seconds % 60
 
-            raise HTTPException(
-                status_code=429,
-                detail=f"Indexing rate limit exceeded. Please wait {remaining_minutes}m {remaining_seconds}s before triggering again.",
-            )
-
-    # Update last indexing time
-    last_indexing_time = datetime.now(timezone.utc)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Indexing rate limit exceeded. Please wait {remaining_minutes}m {remaining_seconds}s before triggering again.",
+        )
 
-    async def run_indexing():
-        """Background task to run indexing."""
+    def run_indexing():
+        """Run indexing on the indexing thread."""
         indexer = IndexingService()
         # Create a new session for background task
-        from app.models import SessionLocal
-
         bg_db = SessionLocal()
         try:
-            await indexer.index_repositories(bg_db)
+            asyncio.run(indexer.index_repositories(bg_db))
+        except Exception as e:
+            logger.error(f"Background indexing failed: {e}", exc_info=True)
         finally:
             bg_db.close()
+            # Indexed data changed, drop cached search and statistics responses
+            response_cache.clear()
 
-    background_tasks.add_task(run_indexing)
+    asyncio.get_running_loop().run_in_executor(indexing_executor, run_indexing)
 
     return {
         "message": "Indexing started in background. Refresh your browser to see the changes once complete.",
@@ -291,12 +670,16 @@ async def trigger_indexing(
     }
 
 
+# Health responses never change, so the body is encoded once at import
+HEALTH_RESPONSE_BODY = b'{"status":"healthy"}'
+
+
 @router.get("/health")
-async def health_check():
+async def health_check() -> Response:
     """
     Health check endpoint.
 
     Returns:
         Simple health status
     """
-    return {"status": "healthy"}
+    return Response(content=HEALTH_RESPONSE_BODY, media_type="application/json")
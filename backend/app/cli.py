@@ -4,33 +4,73 @@ import asyncio
 import logging
 import os
 import sys
-
+from typing import Dict
+
+from app.models import get_engine
+from app.models.database import (
+    Base,
+    ensure_automation_lookups,
+    ensure_automation_search_index,
+    ensure_columns,
+    ensure_indexes,
+)
 from app.services.indexer import IndexingService
 from app.services.static_exporter import export_search_index
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+# httpx logs every request at INFO, one line per GitHub API call
+logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Session factories keyed by database URL, so each URL gets one engine and pool
+_session_factories: Dict[str, sessionmaker] = {}
+
 
-def get_db_session():
-    """Create a database session."""
+def get_db_session() -> Session:
+    """Create a database session on a shared, initialized engine."""
     db_url = os.getenv("DATABASE_URL", "sqlite:///./data/hadiscover.db")
-    engine = create_engine(
-        db_url, connect_args={"check_same_thread": False} if "sqlite" in db_url else {}
-    )
 
-    # Initialize database tables on this engine
-    from app.models.database import Base
+    session_factory = _session_factories.get(db_url)
+    if session_factory is None:
+        engine = get_engine(db_url)
 
-    Base.metadata.create_all(bind=engine)
+        # Initialize database tables once per engine
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            ensure_columns(connection)
+            ensure_indexes(connection)
+            ensure_automation_search_index(connection)
+            ensure_automation_lookups(connection)
 
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        _session_factories[db_url] = session_factory
+
+    return session_factory()
+
+
+def close_db_engines() -> None:
+    """
+    Checkpoint and close all engines opened by the CLI.
+
+    SQLite databases run in WAL mode, so committed data may still live in
+    the -wal file. The workflow compresses and publishes the main database
+    file only, so the WAL is folded back in before the process exits.
+    """
+    for db_url, session_factory in list(_session_factories.items()):
+        engine = session_factory.kw["bind"]
+        try:
+            if engine.dialect.name == "sqlite":
+                with engine.connect() as connection:
+                    connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            logger.warning(f"Could not checkpoint database {db_url}: {e}")
+        finally:
+            engine.dispose()
+            del _session_factories[db_url]
 
 
 async def run_indexing():
@@ -80,7 +120,10 @@ def main():
     command = sys.argv[1]
 
     if command == "index-now":
-        exit_code = asyncio.run(run_indexing())
+        try:
+            exit_code = asyncio.run(run_indexing())
+        finally:
+            close_db_engines()
         sys.exit(exit_code)
     elif command == "export-static":
         output_path = (
@@ -94,6 +137,7 @@ def main():
             logger.info("Static search index exported to %s", destination)
         finally:
             db.close()
+            close_db_engines()
         sys.exit(0)
     else:
         print(f"Unknown command: {command}")
@@ -1,18 +1,24 @@
 """Main FastAPI application for hadiscover."""
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 
-from app.api.routes import router
-from app.models import init_db
+import orjson
+from app.api.routes import router, warm_up_caches
+from app.models import SessionLocal, init_db
+from app.services.cache import GZIP_COMPRESS_LEVEL, GZIP_MINIMUM_SIZE, accepts_gzip
 from app.services.database_bootstrap import bootstrap_database_from_release
 from app.services.scheduler import SchedulerService
 from app.version import __version__
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Load environment variables
 load_dotenv()
@@ -21,25 +27,71 @@ load_dotenv()
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+# httpx logs every request at INFO, one line per GitHub API call
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Get root_path from environment variable
 # This allows the app to work correctly behind reverse proxies or when deployed
 # to cloud platforms with different base paths (e.g., Azure Container Apps)
 root_path = os.getenv("ROOT_PATH", "")
 
+# Frontend origins allowed to call the API
+CORS_ALLOWED_ORIGINS = ("http://localhost:8080", "https://hadiscover.com")
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
+# How long browsers may reuse a preflight result (Chromium caps this at 2h)
+CORS_PREFLIGHT_MAX_AGE_SECONDS = 7200
 
-    async def dispatch(self, request: Request, call_next):
-        """Add security headers to response."""
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Strict-Transport-Security"] = (
-            "max-age=31536000; includeSubDomains"
-        )
-        return response
+
+# Security headers added to every HTTP response, pre-encoded for ASGI
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
+
+
+class SecurityHeadersMiddleware:
+    """
+    Add security headers to all responses.
+
+    Implemented as plain ASGI middleware that only extends the response
+    start message, so responses are not wrapped or re-streamed.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Wrap an ASGI application."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Add security headers to HTTP responses."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *SECURITY_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class NegotiatedGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that honours q-values in Accept-Encoding.
+
+    The base middleware compresses whenever "gzip" occurs anywhere in the
+    header, including "gzip;q=0" which refuses it.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Compress responses only for clients that accept gzip."""
+        if scope["type"] == "http" and not accepts_gzip(
+            Headers(scope=scope).get("accept-encoding")
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
 
 @asynccontextmanager
@@ -64,11 +116,25 @@ async def lifespan(app: FastAPI):
             "indexing is handled externally (e.g. GitHub Actions update-db workflow)"
         )
 
+    # Starlette builds the middleware stack before lifespan starts and route
+    # patterns compile at registration; the OpenAPI schema is the one thing
+    # still generated lazily, on the first /docs or /openapi.json request
+    app.openapi()
+
+    # Warm caches so the first requests after a cold start are not slow
+    try:
+        await asyncio.to_thread(warm_up_caches, SessionLocal)
+        logging.info("Caches warmed up")
+    except Exception as e:
+        logging.warning(f"Cache warm-up failed: {e}")
+
     yield
 
     # Shutdown
     if scheduler_service is not None:
         scheduler_service.shutdown()
+        if scheduler_service.indexer is not None:
+            await scheduler_service.indexer.aclose()
         logging.info("Scheduler shut down")
 
 
@@ -81,16 +147,27 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Compress JSON responses; search facets repeat short strings and shrink well
+app.add_middleware(
+    NegotiatedGZipMiddleware,
+    minimum_size=GZIP_MINIMUM_SIZE,
+    compresslevel=GZIP_COMPRESS_LEVEL,
+)
+
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
-# Configure CORS for frontend
+# Configure CORS for frontend. Added last so it is the outermost middleware
+# and answers preflight requests before the other middleware run.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:8080", "https://hadiscover.com"],
+    allow_origins=CORS_ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST"],
-    allow_headers=["Content-Type", "Authorization"],
+    # If-None-Match lets browsers revalidate cached search responses by ETag
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=CORS_PREFLIGHT_MAX_AGE_SECONDS,
 )
 
 # Determine the API route prefix based on root_path configuration
@@ -102,13 +179,27 @@ api_prefix = "" if root_path else "/api/v1"
 app.include_router(router, prefix=api_prefix)
 
 
+# The root body never changes, so it is serialized once at import time
+ROOT_BODY = orjson.dumps(
+    {"message": "hadiscover API", "version": __version__, "docs": "/docs"}
+)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
-    return {"message": "hadiscover API", "version": __version__, "docs": "/docs"}
+    # A fresh Response per request, since FastAPI attaches background tasks to it
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)  # nosec B104
+    # uvloop and httptools ship with uvicorn[standard]
+    uvicorn.run(
+        app,
+        host="0.0.0.0",  # nosec B104
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+    )
@@ -1,11 +1,19 @@
 """Database configuration and session management."""
 
 import os
+from functools import lru_cache
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from .database import Base
+from .database import (
+    Base,
+    ensure_automation_lookups,
+    ensure_automation_search_index,
+    ensure_columns,
+    ensure_indexes,
+)
 
 # Ensure the data directory exists for SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/hadiscover.db")
@@ -15,12 +23,100 @@ if DATABASE_URL.startswith("sqlite:///"):
     if data_dir and not os.path.exists(data_dir):
         os.makedirs(data_dir, exist_ok=True)
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+# Applied to every new connection on file-backed SQLite databases. WAL lets
+# searches read while the indexer writes, and NORMAL sync is safe under WAL.
+# The size limit truncates the WAL after checkpoints so a full reindex does
+# not leave a file the size of the database behind in long-running processes.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA journal_size_limit=67108864",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
 )
 
+# Compiled SQL cache entries per engine. Search and facet queries vary by the
+# combination of active filters, so the default of 500 is sized up.
+QUERY_CACHE_SIZE = 1200
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply the SQLite tuning PRAGMAs to a new DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_url: str) -> Engine:
+    """
+    Create a database engine with the shared connection pool configuration.
+
+    Engines are expensive to build and each owns its own pool, so callers
+    should create one per database URL and reuse it.
+
+    Args:
+        database_url: SQLAlchemy database URL
+
+    Returns:
+        Configured SQLAlchemy engine
+    """
+    if "sqlite" in database_url:
+        if ":memory:" in database_url or database_url.rstrip("/") == "sqlite:":
+            # An in-memory database lives in its one connection, so every
+            # thread (queries run in worker threads) must share that connection
+            return create_engine(
+                database_url,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+                query_cache_size=QUERY_CACHE_SIZE,
+            )
+        sqlite_engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            pool_size=10,
+            max_overflow=20,
+            pool_timeout=30,
+            query_cache_size=QUERY_CACHE_SIZE,
+        )
+        event.listen(sqlite_engine, "connect", _apply_sqlite_pragmas)
+        return sqlite_engine
+
+    return create_engine(
+        database_url,
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        query_cache_size=QUERY_CACHE_SIZE,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_engine(database_url: str) -> Engine:
+    """
+    Return the shared engine for a database URL, creating it on first use.
+
+    The API, the scheduler and the CLI all go through here, so a process
+    holds one engine and connection pool per database however many
+    components use it.
+
+    Args:
+        database_url: SQLAlchemy database URL
+
+    Returns:
+        Shared SQLAlchemy engine
+    """
+    return create_db_engine(database_url)
+
+
+# Create engine
+engine = get_engine(DATABASE_URL)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -28,12 +124,20 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def init_db():
     """Initialize the database by creating all tables."""
     Base.metadata.create_all(bind=engine)
+    # Databases created by older versions gain newer columns and indexes here
+    with engine.begin() as connection:
+        ensure_columns(connection)
+        ensure_indexes(connection)
+        ensure_automation_search_index(connection)
+        ensure_automation_lookups(connection)
 
 
-def get_db():
-    """Dependency for FastAPI to get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_session_factory() -> sessionmaker:
+    """
+    Dependency for FastAPI to get the session factory.
+
+    Used by routes that run several queries concurrently, since each thread
+    needs a session of its own. Declared async so FastAPI resolves it on
+    the event loop instead of dispatching it to the threadpool per request.
+    """
+    return SessionLocal
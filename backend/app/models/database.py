@@ -1,10 +1,32 @@
 """Database models for hadiscover."""
 
+import logging
 from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    delete,
+    event,
+    insert,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeBase, relationship
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
@@ -16,6 +38,10 @@ class Repository(Base):
     """Represents a GitHub repository with Home Assistant automations."""
 
     __tablename__ = "repositories"
+    __table_args__ = (
+        # Repository filter ("owner/name")
+        Index("ix_repositories_owner_name", "owner", "name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -24,6 +50,8 @@ class Repository(Base):
     url = Column(String(512), nullable=False, unique=True)
     stars = Column(Integer, nullable=False, default=0)
     indexed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # GitHub pushed_at (UTC) when the repository was last indexed completely
+    pushed_at = Column(DateTime, nullable=True)
 
     # Relationship to automations
     automations = relationship(
@@ -38,6 +66,16 @@ class Automation(Base):
     """Represents a Home Assistant automation from a repository."""
 
     __tablename__ = "automations"
+    __table_args__ = (
+        # Per-file replacement of a repository's automations during indexing
+        Index(
+            "ix_automations_repository_id_source_file_path",
+            "repository_id",
+            "source_file_path",
+        ),
+        # Default result ordering and cursor pagination
+        Index("ix_automations_indexed_at_id", "indexed_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     alias = Column(String(512), nullable=True, index=True)
@@ -65,6 +103,348 @@ class Automation(Base):
         return f"<Automation(alias='{self.alias}', repo_id={self.repository_id})>"
 
 
+class AutomationTrigger(Base):
+    """Trigger type used by an automation, one row per distinct type."""
+
+    __tablename__ = "automation_triggers"
+    __table_args__ = (
+        # Trigger filter and facet lookups
+        Index("ix_automation_triggers_trigger_type", "trigger_type", "automation_id"),
+    )
+
+    automation_id = Column(
+        Integer,
+        ForeignKey("automations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    trigger_type = Column(String(255), primary_key=True)
+
+    def __repr__(self):
+        return (
+            f"<AutomationTrigger(automation_id={self.automation_id}, "
+            f"trigger_type='{self.trigger_type}')>"
+        )
+
+
+class AutomationActionCall(Base):
+    """Action call used by an automation, one row per distinct call."""
+
+    __tablename__ = "automation_action_calls"
+    __table_args__ = (
+        # Action and action domain filter and facet lookups
+        Index("ix_automation_action_calls_action_call", "action_call", "automation_id"),
+        Index("ix_automation_action_calls_domain", "domain", "automation_id"),
+    )
+
+    automation_id = Column(
+        Integer,
+        ForeignKey("automations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    action_call = Column(String(512), primary_key=True)
+    # Part before the first dot, e.g. "light" for "light.turn_on"
+    domain = Column(String(255), nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<AutomationActionCall(automation_id={self.automation_id}, "
+            f"action_call='{self.action_call}')>"
+        )
+
+
+def _split_comma_list(value: Optional[str]) -> List[str]:
+    """Split a comma-separated column value into its distinct entries."""
+    if not value:
+        return []
+    return list(
+        dict.fromkeys(part.strip() for part in value.split(",") if part.strip())
+    )
+
+
+def _column_lookups(
+    automation_id: int, trigger_types: Optional[str], action_calls: Optional[str]
+) -> Tuple[int, List[str], List[str]]:
+    """Split an automation's comma-separated columns for write_automation_lookups."""
+    return (
+        automation_id,
+        _split_comma_list(trigger_types),
+        _split_comma_list(action_calls),
+    )
+
+
+def write_automation_lookups(
+    connection: Connection,
+    automations: Iterable[Tuple[int, Iterable[str], Iterable[str]]],
+) -> None:
+    """
+    Insert the trigger and action call rows for automations.
+
+    The comma-separated trigger_types and action_calls columns remain the
+    source of truth; these rows index them for exact-match filtering.
+
+    Args:
+        connection: Connection to the database holding the automations
+        automations: (automation id, trigger types, action calls) tuples with
+            the distinct entries of both columns
+    """
+    trigger_rows: List[Dict[str, Any]] = []
+    action_rows: List[Dict[str, Any]] = []
+    for automation_id, trigger_types, action_calls in automations:
+        for trigger_type in trigger_types:
+            trigger_rows.append(
+                {"automation_id": automation_id, "trigger_type": trigger_type}
+            )
+        for action_call in action_calls:
+            action_rows.append(
+                {
+                    "automation_id": automation_id,
+                    "action_call": action_call,
+                    "domain": (
+                        action_call.split(".", 1)[0] if "." in action_call else None
+                    ),
+                }
+            )
+
+    if trigger_rows:
+        connection.execute(insert(AutomationTrigger), trigger_rows)
+    if action_rows:
+        connection.execute(insert(AutomationActionCall), action_rows)
+
+
+def delete_automation_lookups(connection: Connection, automation_ids: Any) -> None:
+    """
+    Delete the trigger and action call rows for automations.
+
+    Args:
+        connection: Connection to the database holding the automations
+        automation_ids: List of automation IDs or a select of them
+    """
+    for table in (AutomationTrigger.__table__, AutomationActionCall.__table__):
+        connection.execute(
+            delete(table).where(table.c.automation_id.in_(automation_ids))
+        )
+
+
+def ensure_automation_lookups(connection: Connection) -> bool:
+    """
+    Fill the trigger and action call tables for databases that predate them.
+
+    Args:
+        connection: Connection to the database holding the automations
+
+    Returns:
+        True if the tables were backfilled, False if they were already in use
+    """
+    for model in (AutomationTrigger, AutomationActionCall):
+        if connection.execute(select(model.automation_id).limit(1)).first():
+            return False
+
+    rows = connection.execute(
+        select(Automation.id, Automation.trigger_types, Automation.action_calls).where(
+            or_(Automation.trigger_types != "", Automation.action_calls != "")
+        )
+    ).all()
+    if not rows:
+        return False
+
+    write_automation_lookups(connection, (_column_lookups(*row) for row in rows))
+    logger.info(
+        f"Backfilled trigger and action call lookups for {len(rows)} automations"
+    )
+    return True
+
+
+# ORM writes keep the lookup rows in sync. The indexer's bulk statements
+# bypass these events and maintain the rows itself.
+@event.listens_for(Automation, "after_insert")
+def _insert_automation_lookups(mapper, connection, target) -> None:
+    """Add lookup rows for a newly flushed automation."""
+    write_automation_lookups(
+        connection,
+        [_column_lookups(target.id, target.trigger_types, target.action_calls)],
+    )
+
+
+@event.listens_for(Automation, "after_update")
+def _update_automation_lookups(mapper, connection, target) -> None:
+    """Rewrite the lookup rows of an updated automation."""
+    delete_automation_lookups(connection, [target.id])
+    write_automation_lookups(
+        connection,
+        [_column_lookups(target.id, target.trigger_types, target.action_calls)],
+    )
+
+
+@event.listens_for(Automation, "after_delete")
+def _delete_automation_lookups(mapper, connection, target) -> None:
+    """Remove the lookup rows of a deleted automation."""
+    delete_automation_lookups(connection, [target.id])
+
+
+# Full-text index over the searchable automation columns (SQLite only). The
+# trigram tokenizer matches arbitrary substrings, like the LIKE search it backs.
+AUTOMATIONS_FTS_TABLE = "automations_fts"
+
+_AUTOMATIONS_FTS_COLUMNS = "alias, description, trigger_types, action_calls"
+
+# Whether each engine's database has the full-text index. Recorded when the
+# index is ensured at startup so searches do not query the schema each time.
+_search_index_engines: "WeakKeyDictionary[Engine, bool]" = WeakKeyDictionary()
+
+_AUTOMATIONS_FTS_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {AUTOMATIONS_FTS_TABLE} USING fts5(
+        {_AUTOMATIONS_FTS_COLUMNS},
+        content='automations', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {AUTOMATIONS_FTS_TABLE}_ai
+    AFTER INSERT ON automations BEGIN
+        INSERT INTO {AUTOMATIONS_FTS_TABLE}(rowid, {_AUTOMATIONS_FTS_COLUMNS})
+        VALUES (new.id, new.alias, new.description, new.trigger_types,
+                new.action_calls);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {AUTOMATIONS_FTS_TABLE}_ad
+    AFTER DELETE ON automations BEGIN
+        INSERT INTO {AUTOMATIONS_FTS_TABLE}(
+            {AUTOMATIONS_FTS_TABLE}, rowid, {_AUTOMATIONS_FTS_COLUMNS}
+        )
+        VALUES ('delete', old.id, old.alias, old.description, old.trigger_types,
+                old.action_calls);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {AUTOMATIONS_FTS_TABLE}_au
+    AFTER UPDATE ON automations BEGIN
+        INSERT INTO {AUTOMATIONS_FTS_TABLE}(
+            {AUTOMATIONS_FTS_TABLE}, rowid, {_AUTOMATIONS_FTS_COLUMNS}
+        )
+        VALUES ('delete', old.id, old.alias, old.description, old.trigger_types,
+                old.action_calls);
+        INSERT INTO {AUTOMATIONS_FTS_TABLE}(rowid, {_AUTOMATIONS_FTS_COLUMNS})
+        VALUES (new.id, new.alias, new.description, new.trigger_types,
+                new.action_calls);
+    END
+    """,
+)
+
+
+def ensure_automation_search_index(connection: Connection) -> bool:
+    """
+    Create the automation full-text index if it does not exist yet.
+
+    The index is kept in sync by triggers and is built from the existing
+    rows when it is first created, so older databases gain it on startup.
+
+    Args:
+        connection: Connection to the database holding the automations table
+
+    Returns:
+        True if the full-text index is available, False otherwise
+    """
+    if _search_index_exists(connection):
+        return True
+    if connection.dialect.name != "sqlite":
+        return False
+
+    try:
+        for statement in _AUTOMATIONS_FTS_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            f"INSERT INTO {AUTOMATIONS_FTS_TABLE}({AUTOMATIONS_FTS_TABLE}) "
+            "VALUES ('rebuild')"
+        )
+    except OperationalError as e:
+        # FTS5 or its trigram tokenizer is not compiled into this SQLite build
+        logger.warning(f"Full-text search index unavailable: {e}")
+        return False
+
+    logger.info("Created automation full-text search index")
+    _search_index_engines[connection.engine] = True
+    return True
+
+
+def _search_index_exists(connection: Connection) -> bool:
+    """Check the schema for the full-text index and record the result."""
+    exists = connection.dialect.name == "sqlite" and (
+        connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (AUTOMATIONS_FTS_TABLE,),
+        ).first()
+        is not None
+    )
+    _search_index_engines[connection.engine] = exists
+    return exists
+
+
+def has_automation_search_index(connection: Connection) -> bool:
+    """
+    Return whether the automation full-text index is available.
+
+    The answer recorded by ensure_automation_search_index is reused; the
+    schema is only checked for engines that never went through it.
+
+    Args:
+        connection: Connection to the database holding the automations table
+
+    Returns:
+        True if the full-text index is available, False otherwise
+    """
+    available = _search_index_engines.get(connection.engine)
+    if available is None:
+        available = _search_index_exists(connection)
+    return available
+
+
+def ensure_columns(connection: Connection) -> None:
+    """
+    Add nullable model columns missing from existing tables.
+
+    create_all skips tables that already exist, so columns added to the
+    models later are added here for databases built by older versions.
+
+    Args:
+        connection: Connection to the database holding the tables
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            )
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def ensure_indexes(connection: Connection) -> None:
+    """
+    Create any model indexes missing from existing tables.
+
+    create_all skips tables that already exist, so indexes added to the
+    models later are created here for databases built by older versions.
+
+    Args:
+        connection: Connection to the database holding the tables
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+@event.listens_for(Automation.__table__, "after_create")
+def _create_automation_search_index(target, connection, **kw) -> None:
+    """Create the full-text index alongside a new automations table."""
+    ensure_automation_search_index(connection)
+
+
 class IndexingMetadata(Base):
     """Tracks metadata about indexing operations."""
 
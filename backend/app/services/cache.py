@@ -0,0 +1,172 @@
+"""In-process caching for serialized API responses."""
+
+import gzip
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Shared with the GZip middleware: bodies from this size on are compressed
+GZIP_MINIMUM_SIZE = 500
+GZIP_COMPRESS_LEVEL = 5
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Check whether an Accept-Encoding header allows a gzip response.
+
+    Codings are compared case-insensitively together with their q-values:
+    "gzip;q=0" refuses gzip, and "*" covers gzip unless gzip is listed.
+
+    Args:
+        accept_encoding: Accept-Encoding header value, if any
+
+    Returns:
+        True if gzip is acceptable with a q-value above 0
+    """
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        name = name.strip().lower()
+        if name == "gzip":
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized response body together with its entity tag."""
+
+    body: bytes
+    etag: str
+    # Compressed once when cached, so cache hits skip the GZip middleware
+    gzip_body: Optional[bytes] = None
+
+
+class ResponseCache:
+    """
+    Namespaced TTL cache for serialized API responses.
+
+    Entries are keyed by a namespace (e.g. "search") and a digest of the
+    normalized request parameters. The indexed data only changes when an
+    indexing run completes, so callers clear the cache at that point.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept across all namespaces
+            ttl: Time-to-live for entries in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, CachedResponse]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a cache key from normalized request parameters."""
+        raw = "|".join("" if part is None else str(part) for part in parts)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """Compute a weak entity tag for a response body."""
+        return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        """
+        Return the cached response for a key, or None if missing or expired.
+
+        Args:
+            namespace: Cache namespace
+            key: Cache key from make_key
+
+        Returns:
+            Cached response, or None
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, cached = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            return cached
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        body: bytes,
+        ttl: Optional[float] = None,
+        compress: bool = True,
+    ) -> CachedResponse:
+        """
+        Store a serialized response body.
+
+        Args:
+            namespace: Cache namespace
+            key: Cache key from make_key
+            body: Serialized response body
+            ttl: Time-to-live in seconds (defaults to the cache-wide TTL)
+            compress: Precompress the body; off for fragments of responses
+
+        Returns:
+            The cached response including its entity tag
+        """
+        cached = CachedResponse(
+            body=body,
+            etag=self.make_etag(body),
+            gzip_body=(
+                gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+                if compress and len(body) >= GZIP_MINIMUM_SIZE
+                else None
+            ),
+        )
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+            if len(self._entries) >= self.maxsize:
+                self._evict(now)
+            self._entries[(namespace, key)] = (expires_at, cached)
+        return cached
+
+    def clear_namespace(self, namespace: str) -> None:
+        """Remove all entries in a namespace."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the oldest ones until there is room."""
+        for entry_key in [k for k, v in self._entries.items() if v[0] <= now]:
+            del self._entries[entry_key]
+        while len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+
+
+# Shared cache for API responses
+response_cache = ResponseCache()
@@ -1,14 +1,39 @@
 """GitHub API integration service for discovering repositories with hadiscover topic."""
 
-import base64
+import asyncio
 import logging
+import math
 import os
-from typing import Dict, List, Optional
+import random
+import re
+import time
+from binascii import a2b_base64
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Retries of rate limited requests: attempts in total, the backoff base
+# in seconds and the longest Retry-After worth waiting for in-process
+MAX_REQUEST_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0
+MAX_RETRY_AFTER_SECONDS = 120
+
+# Media type for file contents without the JSON and base64 wrapping
+RAW_MEDIA_TYPE = "application/vnd.github.raw+json"
+
+# GitHub search returns at most this many results per query
+SEARCH_RESULT_LIMIT = 1000
+
+# Automation files anywhere in a repository tree
+_AUTOMATION_RE = re.compile(r"(^|/)automations?\.ya?ml$", re.IGNORECASE)
+
 
 class GitHubRateLimitError(Exception):
     """Raised when GitHub API returns a rate limit or backoff signal."""
@@ -25,6 +50,155 @@ class GitHubRateLimitError(Exception):
         self.retry_after = retry_after
 
 
+class _RateLimiter:
+    """
+    Client-side throttle for GitHub API requests.
+
+    Combines three controls so requests slow down before GitHub starts
+    rejecting them:
+
+    - a sliding one-minute window capping requests per minute
+    - a pause until the quota resets once X-RateLimit-Remaining runs low
+    - an AIMD limit on concurrent requests that halves on throttling
+      responses and grows back by half a request per success
+    """
+
+    # Responses that signal the API is overloaded or throttling
+    BACKOFF_STATUSES = (429, 502, 503)
+
+    def __init__(
+        self,
+        requests_per_minute: int = 600,
+        max_concurrency: int = 40,
+        min_remaining: int = 10,
+        max_wait: float = 60.0,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Requests allowed in any 60 second window
+            max_concurrency: Upper bound for concurrent requests
+            min_remaining: Quota left at which requests pause until the reset
+            max_wait: Longest pause for a quota reset, in seconds; later
+                resets are left to the rate limit error
+        """
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_remaining = min_remaining
+        self.max_wait = max_wait
+        self.concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._sent_at: Deque[float] = deque()
+        self._paused_until = 0.0
+        # Created on first use so it binds to the running event loop
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._in_flight < int(self.concurrency)
+            )
+            self._in_flight += 1
+
+        try:
+            while True:
+                now = time.monotonic()
+                while self._sent_at and self._sent_at[0] <= now - 60:
+                    self._sent_at.popleft()
+                if len(self._sent_at) < self.requests_per_minute:
+                    break
+                await asyncio.sleep(self._sent_at[0] + 60 - now)
+            self._sent_at.append(now)
+
+            wait = self._paused_until - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            # A task cancelled while waiting must hand its slot back, or the
+            # limiter's concurrency shrinks for the rest of the run
+            await self._free_slot()
+            raise
+
+    async def release(self, response: Optional[httpx.Response]) -> None:
+        """
+        Record a finished request and adapt to its response.
+
+        Args:
+            response: The response, or None if the request failed
+        """
+        if response is not None:
+            remaining = _header_int(response, "X-RateLimit-Remaining")
+            if response.status_code in self.BACKOFF_STATUSES or (
+                response.status_code == 403 and remaining == 0
+            ):
+                self.concurrency = max(1.0, self.concurrency / 2)
+            else:
+                self.concurrency = min(
+                    float(self.max_concurrency), self.concurrency + 0.5
+                )
+
+            reset_at = _header_int(response, "X-RateLimit-Reset")
+            if (
+                remaining is not None
+                and reset_at is not None
+                and remaining < self.min_remaining
+            ):
+                wait = reset_at - time.time()
+                if 0 < wait <= self.max_wait:
+                    logger.info(
+                        "GitHub quota nearly used up, pausing %.0f seconds", wait
+                    )
+                    self._paused_until = max(self._paused_until, float(reset_at))
+
+        await self._free_slot()
+
+    async def _free_slot(self) -> None:
+        """Give back a concurrency slot taken by acquire."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+def _header_int(response: httpx.Response, name: str) -> Optional[int]:
+    """Return an integer response header, or None if missing or malformed."""
+    value = response.headers.get(name)
+    if not isinstance(value, str):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a GitHub ISO 8601 timestamp into a naive UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@dataclass(frozen=True)
+class FetchedFile:
+    """Result of fetching a repository file."""
+
+    # Undecoded file body; the YAML loader reads UTF-8 bytes directly
+    content: Optional[bytes]
+    etag: Optional[str] = None
+    unchanged: bool = False
+
+
 class GitHubService:
     """Service for interacting with GitHub API."""
 
@@ -37,11 +211,141 @@ class GitHubService:
     def __init__(self, token: Optional[str] = None):
         """Initialize GitHub service with optional authentication token."""
         self.token = token or os.getenv("GITHUB_TOKEN")
+        # Previous behavior of one search per topic, kept for one release
+        self.search_per_topic = (
+            os.getenv("GITHUB_SEARCH_PER_TOPIC", "false").lower() == "true"
+        )
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
         }
         if self.token:
             self.headers["Authorization"] = f"token {self.token}"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._rate_limiter = _RateLimiter()
+
+    async def get_client(self) -> httpx.AsyncClient:
+        """
+        Return the shared HTTP client, creating it on first use.
+
+        Reusing one client keeps connections to the GitHub API alive across
+        requests instead of repeating the TCP and TLS handshakes per call.
+        HTTP/2 lets concurrent requests share one connection as streams.
+
+        Returns:
+            HTTP client bound to the running event loop
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            )
+        return self._client
+
+    async def __aenter__(self) -> "GitHubService":
+        """Open the shared HTTP client for a block of API calls."""
+        await self.get_client()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the shared HTTP client when the block exits."""
+        await self.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request through the shared client and the rate limiter.
+
+        Rate limited responses are retried with exponential backoff and
+        jitter, honouring Retry-After when GitHub sends it.
+
+        Args:
+            method: HTTP method, GET or HEAD
+            url: Request URL
+            **kwargs: Passed on to the client (params, headers)
+
+        Returns:
+            The HTTP response
+        """
+        client = await self.get_client()
+        send = client.head if method == "HEAD" else client.get
+        for attempt in range(MAX_REQUEST_ATTEMPTS):
+            await self._rate_limiter.acquire()
+            response = None
+            try:
+                response = await send(url, **kwargs)
+            finally:
+                await self._rate_limiter.release(response)
+
+            if not self._is_rate_limited(response):
+                return response
+            retry_seconds = self._retry_after_seconds(response)
+            # Long waits and the last attempt are left to the caller's
+            # rate limit check, which halts the indexing run
+            if (
+                retry_seconds is not None and retry_seconds > MAX_RETRY_AFTER_SECONDS
+            ) or attempt == MAX_REQUEST_ATTEMPTS - 1:
+                return response
+
+            delay = (
+                retry_seconds
+                if retry_seconds is not None
+                else RETRY_BASE_DELAY * 2**attempt
+            ) + random.uniform(
+                0, RETRY_BASE_DELAY
+            )  # nosec B311
+            logger.info(
+                "Rate limited on %s, retrying in %.1f seconds (attempt %d of %d)",
+                url,
+                delay,
+                attempt + 1,
+                MAX_REQUEST_ATTEMPTS,
+            )
+            await asyncio.sleep(delay)
+        return response
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        # The limiter's condition is bound to the loop the client ran on
+        self._rate_limiter = _RateLimiter()
+
+    @staticmethod
+    def _is_rate_limited(response: httpx.Response) -> bool:
+        """Return whether a response is a GitHub rate limit or backoff signal."""
+        # HEAD responses carry no body, so the remaining quota header also counts
+        return response.status_code == 429 or (
+            response.status_code == 403
+            and (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+                or "rate limit" in response.text.lower()
+            )
+        )
+
+    @staticmethod
+    def _retry_after_seconds(response: httpx.Response) -> Optional[int]:
+        """Return how long a rate limited response asks clients to wait."""
+        retry_seconds = _header_int(response, "Retry-After")
+        if retry_seconds is None:
+            # Retry-After may also be an HTTP date
+            retry_after = response.headers.get("Retry-After")
+            if isinstance(retry_after, str):
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    retry_seconds = max(int(retry_at.timestamp() - time.time()), 0)
+                except (TypeError, ValueError):
+                    retry_seconds = None
+        if retry_seconds is None:
+            # Primary rate limits only report when the quota resets
+            reset_at = _header_int(response, "X-RateLimit-Reset")
+            if (
+                reset_at is not None
+                and response.headers.get("X-RateLimit-Remaining") == "0"
+            ):
+                retry_seconds = max(reset_at - int(time.time()), 0)
+        return retry_seconds
 
     def _check_rate_limit(self, response: httpx.Response, operation: str) -> None:
         """
@@ -54,21 +358,49 @@ class GitHubService:
         Raises:
             GitHubRateLimitError: If rate limit is detected
         """
-        if response.status_code == 429 or (
-            response.status_code == 403 and "rate limit" in response.text.lower()
-        ):
-            retry_after = response.headers.get("Retry-After")
-            retry_seconds = int(retry_after) if retry_after else None
+        if self._is_rate_limited(response):
+            retry_seconds = self._retry_after_seconds(response)
             message = f"GitHub API rate limit exceeded for {operation}"
             if retry_seconds:
                 message += f". Retry after {retry_seconds} seconds"
             logger.warning(message)
             raise GitHubRateLimitError(message, retry_after=retry_seconds)
 
+    async def _search_page(
+        self, query: str, per_page: int, page: int
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Fetch one page of a repository search.
+
+        Args:
+            query: Search query
+            per_page: Number of results per page (max 100)
+            page: Page number, starting at 1
+
+        Returns:
+            Tuple of (parsed response body, whether a next page exists)
+        """
+        url = f"{self.BASE_URL}/search/repositories"
+        params = {"q": query, "per_page": per_page, "page": page}
+
+        response = await self._request("GET", url, params=params)
+
+        # Check for rate limiting (status 429 or 403 with rate limit message)
+        self._check_rate_limit(response, "search_repositories")
+
+        response.raise_for_status()
+
+        # The last page has no rel="next" link
+        return orjson.loads(response.content), "next" in response.links
+
     async def search_repositories(self, per_page: int = 100) -> List[Dict]:
         """
         Search for repositories with the hadiscover or ha-discover topics.
 
+        Both topics are searched in a single query joined with OR. The first
+        page reports the total result count, so the remaining pages are
+        requested concurrently instead of one after another.
+
         Args:
             per_page: Number of results per page (max 100)
 
@@ -78,68 +410,62 @@ class GitHubService:
         all_repositories = []
         seen_repos = set()  # Track repos to avoid duplicates
 
-        async with httpx.AsyncClient() as client:
-            # Search for each topic
-            for topic in self.SEARCH_TOPICS:
-                page = 1
-                while True:
-                    try:
-                        url = f"{self.BASE_URL}/search/repositories"
-                        params = {
-                            "q": f"topic:{topic}",
-                            "per_page": per_page,
-                            "page": page,
+        topic_queries = [f"topic:{topic}" for topic in self.SEARCH_TOPICS]
+        if self.search_per_topic:
+            queries = topic_queries
+        else:
+            queries = [" OR ".join(topic_queries)]
+
+        for query in queries:
+            pages: List[List[Dict[str, Any]]] = []
+            try:
+                data, has_next = await self._search_page(query, per_page, 1)
+                pages.append(data.get("items", []))
+                if has_next:
+                    page_count = min(
+                        math.ceil(data.get("total_count", 0) / per_page),
+                        SEARCH_RESULT_LIMIT // per_page,
+                    )
+                    results = await asyncio.gather(
+                        *(
+                            self._search_page(query, per_page, page)
+                            for page in range(2, page_count + 1)
+                        ),
+                        return_exceptions=True,
+                    )
+                    for result in results:
+                        # Rate limits and unexpected errors abort the search
+                        if isinstance(result, BaseException):
+                            raise result
+                        pages.append(result[0].get("items", []))
+
+            except httpx.HTTPError as e:
+                logger.error("Error searching repositories with '%s': %s", query, e)
+
+            for items in pages:
+                for repo in items:
+                    repo_key = f"{repo['owner']['login']}/{repo['name']}"
+                    # Skip repos listed by another topic or shifted across pages
+                    if repo_key in seen_repos:
+                        continue
+
+                    seen_repos.add(repo_key)
+                    all_repositories.append(
+                        {
+                            "name": repo["name"],
+                            "owner": repo["owner"]["login"],
+                            "description": repo.get("description", ""),
+                            "url": repo["html_url"],
+                            "default_branch": repo.get("default_branch", "main"),
+                            "stars": repo.get("stargazers_count", 0),
+                            "pushed_at": _parse_timestamp(repo.get("pushed_at")),
                         }
-
-                        response = await client.get(
-                            url, headers=self.headers, params=params, timeout=30.0
-                        )
-
-                        # Check for rate limiting (status 429 or 403 with rate limit message)
-                        self._check_rate_limit(response, "search_repositories")
-
-                        response.raise_for_status()
-
-                        data = response.json()
-                        items = data.get("items", [])
-
-                        if not items:
-                            break
-
-                        for repo in items:
-                            repo_key = f"{repo['owner']['login']}/{repo['name']}"
-                            # Skip if we've already seen this repo
-                            if repo_key in seen_repos:
-                                continue
-
-                            seen_repos.add(repo_key)
-                            all_repositories.append(
-                                {
-                                    "name": repo["name"],
-                                    "owner": repo["owner"]["login"],
-                                    "description": repo.get("description", ""),
-                                    "url": repo["html_url"],
-                                    "default_branch": repo.get(
-                                        "default_branch", "main"
-                                    ),
-                                    "stars": repo.get("stargazers_count", 0),
-                                }
-                            )
-
-                        # Check if there are more pages
-                        if len(items) < per_page:
-                            break
-
-                        page += 1
-
-                    except httpx.HTTPError as e:
-                        logger.error(
-                            f"Error searching repositories with topic '{topic}': {e}"
-                        )
-                        break
+                    )
 
         logger.info(
-            f"Found {len(all_repositories)} repositories with topics {self.SEARCH_TOPICS}"
+            "Found %d repositories with topics %s",
+            len(all_repositories),
+            self.SEARCH_TOPICS,
         )
         return all_repositories
 
@@ -158,32 +484,74 @@ class GitHubService:
         Returns:
             File content as string, or None if file not found
         """
-        try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}"
-                params = {"ref": branch}
-
-                response = await client.get(
-                    url, headers=self.headers, params=params, timeout=30.0
-                )
-
-                if response.status_code == 404:
-                    logger.debug(f"File not found: {owner}/{repo}/{path}")
-                    return None
+        fetched = await self.fetch_file(owner, repo, path, branch)
+        return None if fetched.content is None else fetched.content.decode("utf-8")
+
+    async def fetch_file(
+        self,
+        owner: str,
+        repo: str,
+        path: str,
+        branch: str = "main",
+        etag: Optional[str] = None,
+    ) -> FetchedFile:
+        """
+        Fetch a file, skipping the body if it still matches a known ETag.
 
-                # Check for rate limiting
-                self._check_rate_limit(response, "get_file_content")
+        GitHub answers a matching If-None-Match with 304 Not Modified, which
+        carries no body and does not count against the rate limit.
 
-                response.raise_for_status()
-                data = response.json()
+        Args:
+            owner: Repository owner
+            repo: Repository name
+            path: File path in repository
+            branch: Branch name (default: main)
+            etag: ETag from the last successful fetch of this file
 
-                # GitHub returns base64 encoded content
-                content = base64.b64decode(data["content"]).decode("utf-8")
-                return content
+        Returns:
+            The fetched file; content is None if the file was not found,
+            could not be fetched or is unchanged
+        """
+        try:
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}"
+            params = {"ref": branch}
+            # Ask for the raw file body; fall back to the JSON representation
+            # with base64 content if the raw media type is refused
+            for accept in (RAW_MEDIA_TYPE, self.headers["Accept"]):
+                headers = {"Accept": accept}
+                if etag:
+                    headers["If-None-Match"] = etag
+
+                response = await self._request(
+                    "GET", url, params=params, headers=headers
+                )
+                if response.status_code != 415:
+                    break
+
+            if response.status_code == 404:
+                logger.debug("File not found: %s/%s/%s", owner, repo, path)
+                return FetchedFile(content=None)
+
+            # Check for rate limiting
+            self._check_rate_limit(response, "get_file_content")
+
+            if response.status_code == 304:
+                logger.debug("File unchanged: %s/%s/%s", owner, repo, path)
+                return FetchedFile(content=None, etag=etag, unchanged=True)
+
+            response.raise_for_status()
+            if accept == RAW_MEDIA_TYPE:
+                content = response.content
+            else:
+                data = orjson.loads(response.content)
+                # GitHub returns base64 encoded content wrapped at 60 characters;
+                # a2b_base64 skips the line breaks without a separate pass
+                content = a2b_base64(data["content"])
+            return FetchedFile(content=content, etag=response.headers.get("ETag"))
 
         except httpx.HTTPError as e:
-            logger.error(f"Error fetching file {owner}/{repo}/{path}: {e}")
-            return None
+            logger.error("Error fetching file %s/%s/%s: %s", owner, repo, path, e)
+            return FetchedFile(content=None)
 
     async def find_automation_files(
         self, owner: str, repo: str, branch: str = "main"
@@ -211,26 +579,93 @@ class GitHubService:
             "home-assistant/automations.yml",
         ]
 
+        async def probe(path: str) -> Optional[str]:
+            try:
+                url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}"
+                params = {"ref": branch}
+
+                # HEAD answers with the same status as GET but without the
+                # base64 file body
+                response = await self._request("HEAD", url, params=params)
+
+                # Check for rate limiting
+                self._check_rate_limit(response, "find_automation_files")
+
+                if response.status_code == 200:
+                    logger.info("Found automation file: %s/%s/%s", owner, repo, path)
+                    return path
+
+            except httpx.HTTPError:
+                pass
+            return None
+
+        # Probe all candidate paths concurrently over the shared connection pool
+        results = await asyncio.gather(
+            *(probe(path) for path in potential_paths), return_exceptions=True
+        )
+
         found_files = []
+        for result in results:
+            # Rate limits and unexpected errors still abort the repository
+            if isinstance(result, BaseException):
+                raise result
+            if result is not None:
+                found_files.append(result)
 
-        async with httpx.AsyncClient() as client:
-            for path in potential_paths:
-                try:
-                    url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}"
-                    params = {"ref": branch}
+        return found_files
 
-                    response = await client.get(
-                        url, headers=self.headers, params=params, timeout=30.0
-                    )
+    async def list_automation_files(
+        self, owner: str, repo: str, branch: str = "main"
+    ) -> Dict[str, Optional[str]]:
+        """
+        List automation files from one recursive listing of the repository tree.
 
-                    # Check for rate limiting
-                    self._check_rate_limit(response, "find_automation_files")
+        Finds automation files in any directory with a single API call. Falls
+        back to probing the common locations when GitHub truncates the tree.
 
-                    if response.status_code == 200:
-                        found_files.append(path)
-                        logger.info(f"Found automation file: {owner}/{repo}/{path}")
+        Args:
+            owner: Repository owner
+            repo: Repository name
+            branch: Branch name
+
+        Returns:
+            Blob SHAs keyed by the paths of files that might contain
+            automations; the SHA is None for files found by probing
+
+        Raises:
+            httpx.HTTPError: If the tree cannot be listed
+        """
+        try:
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/git/trees/{branch}"
+
+            response = await self._request("GET", url, params={"recursive": "1"})
+
+            # Check for rate limiting
+            self._check_rate_limit(response, "list_automation_files")
 
-                except httpx.HTTPError:
-                    continue
+            # 404 for a missing branch, 409 for an empty repository
+            if response.status_code in (404, 409):
+                logger.debug("No tree for %s/%s@%s", owner, repo, branch)
+                return {}
 
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+
+        except httpx.HTTPError as e:
+            # Raised rather than reported as an empty tree, which would be
+            # stored and then skipped until the next push
+            logger.error("Error listing tree of %s/%s: %s", owner, repo, e)
+            raise
+
+        if data.get("truncated"):
+            logger.info("Tree of %s/%s is truncated, probing common paths", owner, repo)
+            return dict.fromkeys(await self.find_automation_files(owner, repo, branch))
+
+        found_files = {
+            entry["path"]: entry.get("sha")
+            for entry in data.get("tree", [])
+            if entry.get("type") == "blob" and _AUTOMATION_RE.search(entry["path"])
+        }
+        for path in found_files:
+            logger.info("Found automation file: %s/%s/%s", owner, repo, path)
         return found_files
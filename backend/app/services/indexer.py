@@ -1,17 +1,80 @@
 """Indexing service for discovering and storing Home Assistant automations."""
 
+import asyncio
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Optional
-
-import httpx
-from app.models.database import Automation, IndexingMetadata, Repository
-from app.services.github_service import GitHubRateLimitError, GitHubService
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from app.models.database import (
+    Automation,
+    IndexingMetadata,
+    Repository,
+    delete_automation_lookups,
+    write_automation_lookups,
+)
+from app.services.github_service import (
+    FetchedFile,
+    GitHubRateLimitError,
+    GitHubService,
+)
 from app.services.parser import AutomationParser
+from app.services.search_service import DEFAULT_FACETS_METADATA_KEY, SearchService
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# IndexingMetadata key prefix for the ETag of each indexed automation file
+FILE_ETAG_METADATA_PREFIX = "etag:"
+
+# IndexingMetadata key prefix for the git blob SHA of each indexed automation file
+FILE_SHA_METADATA_PREFIX = "sha:"
+
+# IndexingMetadata key of the last repository URL of a rate limited run up to
+# which every repository was processed; the next run resumes after it
+RESUME_CURSOR_METADATA_KEY = "index_resume_cursor"
+
+# Repositories fetched from GitHub at the same time during an indexing run
+INDEX_CONCURRENCY = 8
+
+# Stored repositories as (repository ID, pushed_at) keyed by repository URL
+KnownRepositories = Dict[str, Tuple[int, Optional[datetime]]]
+
+# Files fetched at the same time for one repository
+FILE_FETCH_CONCURRENCY = 16
+
+# Worker processes parsing YAML during an indexing run
+PARSE_WORKERS = os.cpu_count() or 1
+
+# Distinct file contents whose parsed automations are kept during a run
+PARSED_BLOB_CACHE_SIZE = 4096
+
+
+@dataclass
+class RepositoryFiles:
+    """Automation files fetched from one repository, ready to be stored."""
+
+    # Column values of the parsed automations, without repository fields
+    automation_rows: List[Dict[str, Any]] = field(default_factory=list)
+    # Parsed (trigger types, action calls) of each row, for the lookup tables
+    automation_lookups: List[Tuple[List[str], List[str]]] = field(default_factory=list)
+    # Files whose stored automations are kept as they are
+    unchanged_paths: List[str] = field(default_factory=list)
+    # ETags of all files whose automations are stored after this run
+    etags: Dict[str, str] = field(default_factory=dict)
+    # Blob SHAs of all files whose automations are stored after this run
+    shas: Dict[str, str] = field(default_factory=dict)
+    # Every stored file was unchanged and no file was added or removed
+    unchanged: bool = False
+    # Every listed file was fetched, so a later run may skip the repository
+    complete: bool = True
+
 
 class IndexingService:
     """Service for indexing Home Assistant automations from GitHub repositories."""
@@ -20,6 +83,11 @@ class IndexingService:
         """Initialize indexing service with GitHub API access."""
         self.github_service = GitHubService(token=github_token)
         self.parser = AutomationParser()
+        # YAML parsing is CPU bound, so runs parse in worker processes
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        # Parsed automations keyed by git blob SHA, kept for one run so files
+        # shared by several repositories, such as forks, are parsed once
+        self._parsed_blobs: Dict[str, List[Dict[str, Any]]] = {}
 
     async def index_repositories(self, db: Session) -> dict:
         """
@@ -34,62 +102,227 @@ class IndexingService:
         stats = {
             "repositories_found": 0,
             "repositories_indexed": 0,
+            "repositories_resumed": 0,
             "automations_indexed": 0,
             "errors": 0,
             "rate_limited": False,
         }
 
-        try:
-            # Search for repositories
-            repositories = await self.github_service.search_repositories()
-            stats["repositories_found"] = len(repositories)
-
-            # Index each repository
-            for repo_data in repositories:
-                try:
-                    result = await self._index_repository(db, repo_data)
-                    if result["success"]:
-                        stats["repositories_indexed"] += 1
-                        stats["automations_indexed"] += result["automations_count"]
-                    else:
-                        stats["errors"] += 1
-                except GitHubRateLimitError as e:
-                    logger.warning(
-                        f"Rate limit hit while indexing repository {repo_data['owner']}/{repo_data['name']}: {e}"
+        # The client is bound to this run's event loop, so it is closed on exit
+        async with self.github_service, self._parsing_workers():
+            try:
+                # Search for repositories
+                repositories = await self.github_service.search_repositories()
+                stats["repositories_found"] = len(repositories)
+
+                # Process in URL order so a rate limited run can be resumed
+                repositories.sort(key=lambda repo_data: repo_data["url"])
+                resume_after = self._load_resume_cursor(db)
+                if resume_after is not None:
+                    repositories = [
+                        repo_data
+                        for repo_data in repositories
+                        if repo_data["url"] > resume_after
+                    ]
+                    stats["repositories_resumed"] = stats["repositories_found"] - len(
+                        repositories
                     )
-                    stats["rate_limited"] = True
-                    stats["errors"] += 1
-                    # Stop indexing when rate limited
-                    break
-                except Exception as e:
-                    logger.error(
-                        f"Error indexing repository {repo_data['owner']}/{repo_data['name']}: {e}"
+                    logger.info(
+                        f"Resuming interrupted run after {resume_after}, "
+                        f"skipping {stats['repositories_resumed']} repositories"
                     )
-                    stats["errors"] += 1
-
-            # Only store completion timestamp if indexing was not rate limited
-            if not stats["rate_limited"]:
-                self._store_completion_timestamp(db)
-                # Also fetch and store hadiscover repo star count
-                await self._store_repo_star_count(db)
-                logger.info("Indexing completed successfully")
-            else:
-                logger.warning(
-                    "Indexing halted due to rate limiting. Completion timestamp not stored."
+                processed_urls = set()
+
+                # Stored repositories of the whole run, looked up in one query
+                known_repositories = self._load_known_repositories(
+                    db, [repo_data["url"] for repo_data in repositories]
                 )
 
-            logger.info(f"Indexing stats: {stats}")
+                # Index repositories concurrently; each one's writes happen in
+                # a single stretch without awaiting, so they never interleave
+                semaphore = asyncio.Semaphore(INDEX_CONCURRENCY)
+
+                async def index_one(repo_data: dict) -> None:
+                    async with semaphore:
+                        # Stop starting new repositories once rate limited
+                        if stats["rate_limited"]:
+                            return
+                        try:
+                            result = await self._index_repository(
+                                db, repo_data, known_repositories
+                            )
+                            if result["success"]:
+                                stats["repositories_indexed"] += 1
+                                stats["automations_indexed"] += result[
+                                    "automations_count"
+                                ]
+                            else:
+                                stats["errors"] += 1
+                        except GitHubRateLimitError as e:
+                            logger.warning(
+                                f"Rate limit hit while indexing repository {repo_data['owner']}/{repo_data['name']}: {e}"
+                            )
+                            stats["rate_limited"] = True
+                            stats["errors"] += 1
+                            return
+                        except Exception as e:
+                            logger.error(
+                                f"Error indexing repository {repo_data['owner']}/{repo_data['name']}: {e}"
+                            )
+                            stats["errors"] += 1
+                        processed_urls.add(repo_data["url"])
+
+                await asyncio.gather(
+                    *(index_one(repo_data) for repo_data in repositories)
+                )
 
-        except GitHubRateLimitError as e:
-            logger.error(f"Rate limit hit during repository search: {e}")
-            stats["rate_limited"] = True
-            stats["errors"] += 1
-        except Exception as e:
-            logger.error(f"Error in indexing process: {e}")
-            stats["errors"] += 1
+                # Indexed data changed, refresh the precomputed default facets
+                self._store_default_facets(db)
+
+                # Only store completion timestamp if indexing was not rate limited
+                if not stats["rate_limited"]:
+                    self._store_resume_cursor(db, None)
+                    self._store_completion_timestamp(db)
+                    # Also fetch and store hadiscover repo star count
+                    await self._store_repo_star_count(db)
+                    logger.info("Indexing completed successfully")
+                else:
+                    logger.warning(
+                        "Indexing halted due to rate limiting. Completion timestamp not stored."
+                    )
+                    # Repositories finish out of order; resume after the
+                    # longest run of processed ones from the start
+                    cursor = None
+                    for repo_data in repositories:
+                        if repo_data["url"] not in processed_urls:
+                            break
+                        cursor = repo_data["url"]
+                    if cursor is not None:
+                        self._store_resume_cursor(db, cursor)
+
+                logger.info(f"Indexing stats: {stats}")
+
+            except GitHubRateLimitError as e:
+                logger.error(f"Rate limit hit during repository search: {e}")
+                stats["rate_limited"] = True
+                stats["errors"] += 1
+            except Exception as e:
+                logger.error(f"Error in indexing process: {e}")
+                stats["errors"] += 1
 
         return stats
 
+    async def aclose(self) -> None:
+        """Close the GitHub API client and its pooled connections."""
+        await self.github_service.aclose()
+        self._shutdown_parse_pool()
+
+    @asynccontextmanager
+    async def _parsing_workers(self) -> AsyncIterator[None]:
+        """Start the YAML parsing worker processes for one indexing run."""
+        # Spawned rather than forked, the event loop process runs threads
+        self._parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        try:
+            yield
+        finally:
+            self._shutdown_parse_pool()
+            self._parsed_blobs.clear()
+
+    def _shutdown_parse_pool(self) -> None:
+        """Stop the YAML parsing worker processes, if running."""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(cancel_futures=True)
+            self._parse_pool = None
+
+    async def _parse_automation_file(
+        self, content: bytes, sha: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse an automation file without blocking the event loop.
+
+        Args:
+            content: Undecoded YAML file content
+            sha: Git blob SHA of the content, if known
+
+        Returns:
+            Automation metadata extracted by the parser
+        """
+        if sha is not None and sha in self._parsed_blobs:
+            return self._parsed_blobs[sha]
+        if self._parse_pool is None:
+            automations = self.parser.parse_automation_file(content)
+        else:
+            automations = await asyncio.get_running_loop().run_in_executor(
+                self._parse_pool, AutomationParser.parse_automation_file, content
+            )
+        if sha is not None and len(self._parsed_blobs) < PARSED_BLOB_CACHE_SIZE:
+            self._parsed_blobs[sha] = automations
+        return automations
+
+    @staticmethod
+    def _load_resume_cursor(db: Session) -> Optional[str]:
+        """
+        Load the URL after which an interrupted indexing run resumes.
+
+        Args:
+            db: Database session
+
+        Returns:
+            Repository URL, or None if the last run was not interrupted
+        """
+        return db.scalar(
+            select(IndexingMetadata.value).where(
+                IndexingMetadata.key == RESUME_CURSOR_METADATA_KEY
+            )
+        )
+
+    def _store_resume_cursor(self, db: Session, cursor: Optional[str]) -> None:
+        """
+        Store or clear the URL after which the next indexing run resumes.
+
+        Args:
+            db: Database session
+            cursor: Repository URL, or None to clear the cursor
+        """
+        try:
+            if cursor is None:
+                # One DELETE, without loading the row first
+                db.execute(
+                    delete(IndexingMetadata).where(
+                        IndexingMetadata.key == RESUME_CURSOR_METADATA_KEY
+                    )
+                )
+                db.commit()
+                return
+
+            metadata = (
+                db.query(IndexingMetadata)
+                .filter_by(key=RESUME_CURSOR_METADATA_KEY)
+                .first()
+            )
+
+            current_time = datetime.now(timezone.utc)
+
+            if metadata:
+                metadata.value = cursor
+                metadata.updated_at = current_time
+            else:
+                metadata = IndexingMetadata(
+                    key=RESUME_CURSOR_METADATA_KEY,
+                    value=cursor,
+                    updated_at=current_time,
+                )
+                db.add(metadata)
+
+            db.commit()
+            logger.info(f"Stored indexing resume cursor: {cursor}")
+        except Exception as e:
+            logger.error(f"Error storing resume cursor: {e}")
+            db.rollback()
+
     def _store_completion_timestamp(self, db: Session) -> None:
         """
         Store the completion timestamp of a successful indexing run.
@@ -126,6 +359,42 @@ class IndexingService:
             logger.error(f"Error storing completion timestamp: {e}")
             db.rollback()
 
+    def _store_default_facets(self, db: Session) -> None:
+        """
+        Precompute and store the facets shown for an unfiltered search.
+
+        Args:
+            db: Database session
+        """
+        try:
+            facets = SearchService.compute_facets(db)
+            value = orjson.dumps(facets).decode("utf-8")
+
+            metadata = (
+                db.query(IndexingMetadata)
+                .filter_by(key=DEFAULT_FACETS_METADATA_KEY)
+                .first()
+            )
+
+            current_time = datetime.now(timezone.utc)
+
+            if metadata:
+                metadata.value = value
+                metadata.updated_at = current_time
+            else:
+                metadata = IndexingMetadata(
+                    key=DEFAULT_FACETS_METADATA_KEY,
+                    value=value,
+                    updated_at=current_time,
+                )
+                db.add(metadata)
+
+            db.commit()
+            logger.info("Stored precomputed default facets")
+        except Exception as e:
+            logger.error(f"Error storing default facets: {e}")
+            db.rollback()
+
     async def _store_repo_star_count(self, db: Session) -> None:
         """
         Fetch and store the hadiscover repository star count.
@@ -134,55 +403,83 @@ class IndexingService:
             db: Database session
         """
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.github_service.BASE_URL}/repos/DevSecNinja/hadiscover"
-                response = await client.get(
-                    url, headers=self.github_service.headers, timeout=10.0
-                )
+            client = await self.github_service.get_client()
+            url = f"{self.github_service.BASE_URL}/repos/DevSecNinja/hadiscover"
+            response = await client.get(url, timeout=10.0)
 
-                if response.status_code == 200:
-                    data = response.json()
-                    star_count = data.get("stargazers_count", 0)
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                star_count = data.get("stargazers_count", 0)
 
-                    # Check if metadata record exists
-                    metadata = (
-                        db.query(IndexingMetadata)
-                        .filter_by(key="repo_star_count")
-                        .first()
-                    )
+                # Check if metadata record exists
+                metadata = (
+                    db.query(IndexingMetadata).filter_by(key="repo_star_count").first()
+                )
 
-                    current_time = datetime.now(timezone.utc)
-
-                    if metadata:
-                        # Update existing record
-                        metadata.value = str(star_count)
-                        metadata.updated_at = current_time
-                    else:
-                        # Create new record
-                        metadata = IndexingMetadata(
-                            key="repo_star_count",
-                            value=str(star_count),
-                            updated_at=current_time,
-                        )
-                        db.add(metadata)
-
-                    db.commit()
-                    logger.info(f"Stored repository star count: {star_count}")
+                current_time = datetime.now(timezone.utc)
+
+                if metadata:
+                    # Update existing record
+                    metadata.value = str(star_count)
+                    metadata.updated_at = current_time
                 else:
-                    logger.warning(
-                        f"Failed to fetch repo star count. Status: {response.status_code}"
+                    # Create new record
+                    metadata = IndexingMetadata(
+                        key="repo_star_count",
+                        value=str(star_count),
+                        updated_at=current_time,
                     )
+                    db.add(metadata)
+
+                db.commit()
+                logger.info(f"Stored repository star count: {star_count}")
+            else:
+                logger.warning(
+                    f"Failed to fetch repo star count. Status: {response.status_code}"
+                )
         except Exception as e:
             logger.error(f"Error storing repo star count: {e}")
             db.rollback()
 
-    async def _index_repository(self, db: Session, repo_data: dict) -> dict:
+    @staticmethod
+    def _load_known_repositories(db: Session, urls: List[str]) -> KnownRepositories:
+        """
+        Load the ID and pushed_at of the stored repositories among the given URLs.
+
+        Args:
+            db: Database session
+            urls: GitHub URLs of the repositories found by the search
+
+        Returns:
+            Tuples of (repository ID, pushed_at) keyed by repository URL
+        """
+        if not urls:
+            return {}
+        rows = db.execute(
+            select(Repository.url, Repository.id, Repository.pushed_at).where(
+                Repository.url.in_(urls)
+            )
+        )
+        return {
+            url: (repository_id, pushed_at) for url, repository_id, pushed_at in rows
+        }
+
+    async def _index_repository(
+        self, db: Session, repo_data: dict, known_repositories: KnownRepositories
+    ) -> dict:
         """
         Index a single repository.
 
+        All GitHub calls happen before the first write, and the writes then
+        run without awaiting, so concurrent runs sharing the session never
+        interleave inside each other's transaction. Repositories not pushed
+        since their last complete index are refreshed without any GitHub call.
+
         Args:
             db: Database session
             repo_data: Repository metadata from GitHub
+            known_repositories: Stored repositories keyed by URL, updated with
+                repositories added by this call
 
         Returns:
             Dictionary with indexing result
@@ -192,88 +489,24 @@ class IndexingService:
         owner = repo_data["owner"]
         name = repo_data["name"]
         url = repo_data["url"]
-        branch = repo_data.get("default_branch", "main")
 
         try:
-            # Check if repository already exists
-            existing_repo = db.query(Repository).filter_by(url=url).first()
-
-            if existing_repo:
-                # Update existing repository
-                repository = existing_repo
-                repository.description = repo_data.get("description", "")
-                repository.stars = repo_data.get("stars", 0)
-                logger.info(f"Updating existing repository: {owner}/{name}")
-
-                # Remove old automations to re-index
-                for automation in repository.automations:
-                    db.delete(automation)
+            known = known_repositories.get(url)
+            pushed_at = repo_data.get("pushed_at")
+            if known is not None and pushed_at is not None and known[1] == pushed_at:
+                result["automations_count"] = self._refresh_repository(
+                    db, known[0], repo_data
+                )
             else:
-                # Create new repository
-                repository = Repository(
-                    name=name,
-                    owner=owner,
-                    description=repo_data.get("description", ""),
-                    url=url,
-                    stars=repo_data.get("stars", 0),
+                files = await self._fetch_repository_files(
+                    repo_data,
+                    self._load_file_metadata(db, FILE_ETAG_METADATA_PREFIX, url),
+                    self._load_file_metadata(db, FILE_SHA_METADATA_PREFIX, url),
                 )
-                db.add(repository)
-                logger.info(f"Adding new repository: {owner}/{name}")
-
-            # Flush to get repository ID without committing
-            # This allows us to rollback if rate limiting occurs
-            db.flush()
-
-            # Find automation files
-            automation_files = await self.github_service.find_automation_files(
-                owner, name, branch
-            )
-
-            if not automation_files:
-                logger.warning(f"No automation files found in {owner}/{name}")
-                # Commit the repository even if no automations found
-                db.commit()
-                result["success"] = True  # Still consider it successful
-                return result
-
-            # Process each automation file
-            for file_path in automation_files:
-                content = await self.github_service.get_file_content(
-                    owner, name, file_path, branch
+                result["automations_count"] = self._store_repository(
+                    db, repo_data, files, known_repositories
                 )
-
-                if not content:
-                    logger.warning(
-                        f"Could not fetch content for {owner}/{name}/{file_path}"
-                    )
-                    continue
-
-                # Parse automations
-                automations = self.parser.parse_automation_file(content)
-
-                # Store automations
-                for auto_data in automations:
-                    automation = Automation(
-                        alias=auto_data.get("alias"),
-                        description=auto_data.get("description"),
-                        trigger_types=",".join(auto_data.get("trigger_types", [])),
-                        blueprint_path=auto_data.get("blueprint_path"),
-                        action_calls=",".join(auto_data.get("action_calls", [])),
-                        source_file_path=file_path,
-                        github_url=f"{url}/blob/{branch}/{file_path}",
-                        start_line=auto_data.get("start_line"),
-                        end_line=auto_data.get("end_line"),
-                        repository_id=repository.id,
-                    )
-                    db.add(automation)
-                    result["automations_count"] += 1
-
-            # Only commit if all GitHub API calls succeeded
-            db.commit()
             result["success"] = True
-            logger.info(
-                f"Indexed {result['automations_count']} automations from {owner}/{name}"
-            )
 
         except GitHubRateLimitError:
             # Propagate rate limit errors to halt indexing
@@ -285,3 +518,384 @@ class IndexingService:
             result["success"] = False
 
         return result
+
+    async def _fetch_repository_files(
+        self,
+        repo_data: dict,
+        known_etags: Dict[str, str],
+        known_shas: Dict[str, str],
+    ) -> RepositoryFiles:
+        """
+        Fetch and parse a repository's automation files without touching the database.
+
+        Args:
+            repo_data: Repository metadata from GitHub
+            known_etags: Stored ETags keyed by file GitHub URL
+            known_shas: Stored blob SHAs keyed by file GitHub URL
+
+        Returns:
+            Parsed automations and file ETags of the repository
+        """
+        owner = repo_data["owner"]
+        name = repo_data["name"]
+        url = repo_data["url"]
+        branch = repo_data.get("default_branch", "main")
+        files = RepositoryFiles()
+
+        # Find automation files
+        automation_files = await self.github_service.list_automation_files(
+            owner, name, branch
+        )
+        if not automation_files:
+            logger.warning(f"No automation files found in {owner}/{name}")
+            return files
+
+        # Fetch the files of the repository concurrently, capped so a repository
+        # with many files leaves request slots to the others being indexed
+        github_urls = [f"{url}/blob/{branch}/{path}" for path in automation_files]
+        semaphore = asyncio.Semaphore(FILE_FETCH_CONCURRENCY)
+
+        async def fetch(file_path: str, github_url: str) -> FetchedFile:
+            # The tree lists each file's blob SHA, so an unchanged file
+            # needs no request at all
+            sha = automation_files[file_path]
+            if sha is not None and known_shas.get(github_url) == sha:
+                return FetchedFile(content=None, unchanged=True)
+            async with semaphore:
+                return await self.github_service.fetch_file(
+                    owner, name, file_path, branch, etag=known_etags.get(github_url)
+                )
+
+        results = await asyncio.gather(
+            *(
+                fetch(file_path, github_url)
+                for file_path, github_url in zip(automation_files, github_urls)
+            ),
+            return_exceptions=True,
+        )
+
+        # Process each automation file
+        changed_files = []
+        for file_path, github_url, fetched in zip(
+            automation_files, github_urls, results
+        ):
+            # Rate limits and unexpected errors still abort the repository
+            if isinstance(fetched, BaseException):
+                raise fetched
+
+            sha = automation_files[file_path]
+            if fetched.unchanged:
+                files.unchanged_paths.append(file_path)
+                if github_url in known_etags:
+                    files.etags[github_url] = known_etags[github_url]
+                if sha is not None:
+                    files.shas[github_url] = sha
+                continue
+
+            if not fetched.content:
+                logger.warning(
+                    f"Could not fetch content for {owner}/{name}/{file_path}"
+                )
+                files.complete = False
+                continue
+
+            if fetched.etag:
+                files.etags[github_url] = fetched.etag
+            if sha is not None:
+                files.shas[github_url] = sha
+            changed_files.append((file_path, github_url, fetched.content, sha))
+
+        # Parse the changed files in parallel
+        parsed_files = await asyncio.gather(
+            *(
+                self._parse_automation_file(content, sha)
+                for _, _, content, sha in changed_files
+            )
+        )
+        for (file_path, github_url, _, _), automations in zip(
+            changed_files, parsed_files
+        ):
+            for auto_data in automations:
+                trigger_types = auto_data.get("trigger_types", [])
+                action_calls = auto_data.get("action_calls", [])
+                files.automation_lookups.append((trigger_types, action_calls))
+                files.automation_rows.append(
+                    {
+                        "alias": auto_data.get("alias"),
+                        "description": auto_data.get("description"),
+                        "trigger_types": ",".join(trigger_types),
+                        "blueprint_path": auto_data.get("blueprint_path"),
+                        "action_calls": ",".join(action_calls),
+                        "source_file_path": file_path,
+                        "github_url": github_url,
+                        "start_line": auto_data.get("start_line"),
+                        "end_line": auto_data.get("end_line"),
+                    }
+                )
+
+        files.unchanged = (
+            len(files.unchanged_paths) == len(automation_files)
+            and files.etags == known_etags
+            and files.shas == known_shas
+        )
+        return files
+
+    @staticmethod
+    def _refresh_repository(db: Session, repository_id: int, repo_data: dict) -> int:
+        """
+        Update the metadata of a repository whose files were not pushed to.
+
+        Args:
+            db: Database session
+            repository_id: ID of the stored repository
+            repo_data: Repository metadata from GitHub
+
+        Returns:
+            Number of automations stored for the repository
+        """
+        db.execute(
+            update(Repository)
+            .where(Repository.id == repository_id)
+            .values(
+                description=repo_data.get("description", ""),
+                stars=repo_data.get("stars", 0),
+            )
+        )
+        automations_count = (
+            db.query(Automation)
+            .filter(Automation.repository_id == repository_id)
+            .count()
+        )
+        db.commit()
+        logger.info(
+            f"Skipping {repo_data['owner']}/{repo_data['name']}, not pushed since last index"
+        )
+        return automations_count
+
+    def _store_repository(
+        self,
+        db: Session,
+        repo_data: dict,
+        files: RepositoryFiles,
+        known_repositories: KnownRepositories,
+    ) -> int:
+        """
+        Write a repository and its fetched automations in one transaction.
+
+        Args:
+            db: Database session
+            repo_data: Repository metadata from GitHub
+            files: Fetched automation files of the repository
+            known_repositories: Stored repositories keyed by URL
+
+        Returns:
+            Number of automations stored for the repository
+        """
+        owner = repo_data["owner"]
+        name = repo_data["name"]
+        url = repo_data["url"]
+
+        # Only a complete index lets later runs skip an unpushed repository
+        pushed_at = repo_data.get("pushed_at") if files.complete else None
+        values = {
+            "description": repo_data.get("description", ""),
+            "stars": repo_data.get("stars", 0),
+            "pushed_at": pushed_at,
+        }
+
+        known = known_repositories.get(url)
+        if known is not None:
+            # Update existing repository
+            repository_id = known[0]
+            db.execute(
+                update(Repository)
+                .where(Repository.id == repository_id)
+                .values(**values)
+            )
+            logger.info(f"Updating existing repository: {owner}/{name}")
+        else:
+            # Create new repository
+            repository_id = db.execute(
+                insert(Repository).values(name=name, owner=owner, url=url, **values)
+            ).inserted_primary_key[0]
+            logger.info(f"Adding new repository: {owner}/{name}")
+
+        # One timestamp for the whole batch instead of a column default per row
+        indexed_at = datetime.now(timezone.utc)
+        automation_rows = [
+            {**row, "repository_id": repository_id, "indexed_at": indexed_at}
+            for row in files.automation_rows
+        ]
+
+        if files.unchanged:
+            # Nothing to replace; only the repository metadata may have changed
+            automations_count = (
+                db.query(Automation)
+                .filter(Automation.repository_id == repository_id)
+                .count()
+            )
+            db.commit()
+            known_repositories[url] = (repository_id, pushed_at)
+            logger.info(f"Automations of {owner}/{name} are unchanged")
+            return automations_count
+
+        # Replace automations from changed files, keep unchanged ones
+        automations_count = len(automation_rows) + self._replace_file_automations(
+            db, repository_id, files.unchanged_paths
+        )
+        self._bulk_insert_automations(db, automation_rows, files.automation_lookups)
+        self._store_file_metadata(db, FILE_ETAG_METADATA_PREFIX, url, files.etags)
+        self._store_file_metadata(db, FILE_SHA_METADATA_PREFIX, url, files.shas)
+
+        db.commit()
+        known_repositories[url] = (repository_id, pushed_at)
+        logger.info(f"Indexed {automations_count} automations from {owner}/{name}")
+        return automations_count
+
+    @staticmethod
+    def _bulk_insert_automations(
+        db: Session,
+        automation_rows: List[Dict[str, Any]],
+        automation_lookups: List[Tuple[List[str], List[str]]],
+    ) -> None:
+        """
+        Insert a repository's automations and their lookup rows in bulk.
+
+        The rows go out as one executemany rather than one ORM flush per
+        object. Ordered RETURNING would fall back to a statement per row on
+        SQLite, so the new IDs are read back afterwards instead: they are
+        assigned in row order above the previous maximum.
+
+        Args:
+            db: Database session
+            automation_rows: Automation column values, one dict per row
+            automation_lookups: Parsed (trigger types, action calls) of each
+                row, so the joined columns are not split again
+        """
+        if not automation_rows:
+            return
+        previous_max_id = db.execute(select(func.max(Automation.id))).scalar() or 0
+        db.execute(insert(Automation), automation_rows)
+        automation_ids = db.execute(
+            select(Automation.id)
+            .where(
+                Automation.repository_id == automation_rows[0]["repository_id"],
+                Automation.id > previous_max_id,
+            )
+            .order_by(Automation.id)
+        ).scalars()
+        write_automation_lookups(
+            db.connection(),
+            (
+                (automation_id, trigger_types, action_calls)
+                for automation_id, (trigger_types, action_calls) in zip(
+                    automation_ids, automation_lookups
+                )
+            ),
+        )
+
+    @staticmethod
+    def _replace_file_automations(
+        db: Session, repository_id: int, unchanged_paths: List[str]
+    ) -> int:
+        """
+        Remove a repository's automations except those from unchanged files.
+
+        Args:
+            db: Database session
+            repository_id: Repository ID
+            unchanged_paths: Source file paths whose automations are kept
+
+        Returns:
+            Number of automations kept
+        """
+        replaced = (
+            Automation.repository_id == repository_id,
+            Automation.source_file_path.notin_(unchanged_paths),
+        )
+        delete_automation_lookups(
+            db.connection(), select(Automation.id).where(*replaced)
+        )
+        db.execute(delete(Automation).where(*replaced))
+        if not unchanged_paths:
+            return 0
+        return (
+            db.query(Automation)
+            .filter(Automation.repository_id == repository_id)
+            .count()
+        )
+
+    @staticmethod
+    def _file_metadata_rows(
+        db: Session, prefix: str, repository_url: str
+    ) -> List[IndexingMetadata]:
+        """Return the stored metadata rows of a repository's automation files."""
+        return (
+            db.query(IndexingMetadata)
+            .filter(
+                IndexingMetadata.key.startswith(
+                    f"{prefix}{repository_url}/blob/", autoescape=True
+                )
+            )
+            .all()
+        )
+
+    @staticmethod
+    def _load_file_metadata(
+        db: Session, prefix: str, repository_url: str
+    ) -> Dict[str, str]:
+        """
+        Load stored values, such as ETags, of a repository's automation files.
+
+        Args:
+            db: Database session
+            prefix: IndexingMetadata key prefix of the values
+            repository_url: Repository URL
+
+        Returns:
+            Values keyed by file GitHub URL
+        """
+        rows = IndexingService._file_metadata_rows(db, prefix, repository_url)
+        return {row.key[len(prefix) :]: row.value for row in rows if row.value}
+
+    @staticmethod
+    def _store_file_metadata(
+        db: Session, prefix: str, repository_url: str, values: Dict[str, str]
+    ) -> None:
+        """
+        Replace stored values, such as ETags, of a repository's automation files.
+
+        Files without stored automations lose their values, so the next run
+        fetches them in full instead of trusting them for missing rows.
+        Changes are committed together with the repository's automations.
+
+        Args:
+            db: Database session
+            prefix: IndexingMetadata key prefix of the values
+            repository_url: Repository URL
+            values: Values keyed by file GitHub URL
+        """
+        keys = {f"{prefix}{github_url}": value for github_url, value in values.items()}
+        current_time = datetime.now(timezone.utc)
+        existing = IndexingService._file_metadata_rows(db, prefix, repository_url)
+        stale_keys = []
+        for metadata in existing:
+            value = keys.pop(metadata.key, None)
+            if value is None:
+                stale_keys.append(metadata.key)
+            elif metadata.value != value:
+                metadata.value = value
+                metadata.updated_at = current_time
+        if stale_keys:
+            # One DELETE instead of a unit-of-work delete per row
+            db.execute(
+                delete(IndexingMetadata).where(IndexingMetadata.key.in_(stale_keys))
+            )
+        if keys:
+            db.execute(
+                insert(IndexingMetadata),
+                [
+                    {"key": key, "value": value, "updated_at": current_time}
+                    for key, value in keys.items()
+                ],
+            )
@@ -1,18 +1,38 @@
 """Parser for Home Assistant automation YAML files."""
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import yaml  # type: ignore[import-untyped]
 
+try:
+    # libyaml backed loader, several times faster than the pure Python one
+    from yaml import CSafeLoader as _Loader  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader  # type: ignore[import-untyped]
+
 logger = logging.getLogger(__name__)
 
+if _Loader is yaml.SafeLoader:  # pragma: no cover - PyYAML built without libyaml
+    logger.warning(
+        "libyaml is not available, parsing YAML with the slower pure Python loader"
+    )
+else:
+    logger.debug(f"Parsing YAML with {_Loader.__name__}")
+
+# Every automation has triggers or uses a blueprint, so a file containing
+# none of these words has no automations to parse
+_AUTOMATION_MARKERS = ("trigger", "use_blueprint", "automation")
+_AUTOMATION_MARKERS_BYTES = tuple(marker.encode() for marker in _AUTOMATION_MARKERS)
+
 
 class AutomationParser:
     """Parser for Home Assistant automation YAML files."""
 
     @staticmethod
-    def parse_automation_file(content: str) -> List[Dict[str, Any]]:
+    def parse_automation_file(
+        content: Union[str, bytes], prescan: bool = True
+    ) -> List[Dict[str, Any]]:
         """
         Parse a YAML file containing Home Assistant automations.
 
@@ -20,102 +40,63 @@ class AutomationParser:
         It handles various YAML structures gracefully.
 
         Args:
-            content: YAML file content as string
+            content: YAML file content, as text or as undecoded UTF-8 bytes
+            prescan: Skip parsing files without any automation marker word
 
         Returns:
             List of automation dictionaries with extracted metadata including line numbers
         """
         automations: List[Dict[str, Any]] = []
 
+        if prescan:
+            markers = (
+                _AUTOMATION_MARKERS_BYTES
+                if isinstance(content, bytes)
+                else _AUTOMATION_MARKERS
+            )
+            if not any(marker in content for marker in markers):
+                logger.debug("No automation markers in YAML content")
+                return automations
+
         try:
-            # Parse YAML content with line numbers
-            # First, use compose to get the document tree with line info
+            # Compose each document tree once for its line numbers, then
+            # construct the data from it instead of parsing the text again.
+            # Files may hold several documents separated by "---"
+            loader = _Loader(content)
             try:
-                root_node = yaml.compose(content)
-            except Exception as e:
-                logger.warning(f"Could not compose YAML for line tracking: {e}")
-                root_node = None
-
-            # Parse YAML content normally for data extraction
-            data = yaml.safe_load(content)
-
-            if data is None:
+                documents = []
+                while loader.check_node():
+                    root_node = loader.get_node()
+                    documents.append((root_node, loader.construct_document(root_node)))
+            finally:
+                loader.dispose()
+
+            for root_node, data in documents:
+                if data is None:
+                    continue
+                entries = AutomationParser._document_automations(data, root_node)
+                if entries is None:
+                    logger.warning(f"Unexpected YAML structure: {type(data)}")
+                    continue
+                automations_list, automation_nodes = entries
+
+                # Extract metadata from each automation
+                parsed = [
+                    AutomationParser._parse_single_automation(
+                        auto, *AutomationParser._line_range(automation_nodes, idx)
+                    )
+                    for idx, auto in enumerate(automations_list)
+                    if isinstance(auto, dict)
+                ]
+                skipped = len(automations_list) - len(parsed)
+                if skipped:
+                    logger.warning(f"Skipping {skipped} non-dict automations")
+                automations.extend(parsed)
+
+            if not any(data is not None for _, data in documents):
                 logger.warning("Empty YAML content")
                 return automations
 
-            # Handle different YAML structures
-            automations_list = []
-            automation_nodes = []
-
-            if isinstance(data, list):
-                # Direct list of automations
-                automations_list = data
-                if root_node and isinstance(root_node, yaml.SequenceNode):
-                    automation_nodes = root_node.value
-            elif isinstance(data, dict):
-                # Could be wrapped in a key, or a single automation
-                if "automation" in data:
-                    automations_list = data["automation"]
-                    if not isinstance(automations_list, list):
-                        automations_list = [automations_list]
-                        if root_node and isinstance(root_node, yaml.MappingNode):
-                            for key_node, value_node in root_node.value:
-                                if (
-                                    hasattr(key_node, "value")
-                                    and key_node.value == "automation"
-                                ):
-                                    automation_nodes = (
-                                        [value_node]
-                                        if not isinstance(value_node, yaml.SequenceNode)
-                                        else value_node.value
-                                    )
-                                    break
-                    else:
-                        if root_node and isinstance(root_node, yaml.MappingNode):
-                            for key_node, value_node in root_node.value:
-                                if (
-                                    hasattr(key_node, "value")
-                                    and key_node.value == "automation"
-                                ):
-                                    if isinstance(value_node, yaml.SequenceNode):
-                                        automation_nodes = value_node.value
-                                    break
-                else:
-                    # Treat the whole dict as a single automation
-                    automations_list = [data]
-                    if root_node:
-                        automation_nodes = [root_node]
-            else:
-                logger.warning(f"Unexpected YAML structure: {type(data)}")
-                return automations
-
-            # Extract metadata from each automation
-            for idx, auto in enumerate(automations_list):
-                if not isinstance(auto, dict):
-                    logger.warning(f"Skipping non-dict automation at index {idx}")
-                    continue
-
-                # Get line numbers from corresponding node
-                start_line = None
-                end_line = None
-                if idx < len(automation_nodes):
-                    node = automation_nodes[idx]
-                    if hasattr(node, "start_mark") and hasattr(node, "end_mark"):
-                        # Line numbers are 0-indexed in yaml, add 1 for 1-indexed
-                        # start_mark.line points to the first line (0-indexed)
-                        # end_mark.line points to the line after the last line (0-indexed)
-                        # So end_mark.line is already one past the end in 0-indexed terms
-                        start_line = node.start_mark.line + 1
-                        end_line = (
-                            node.end_mark.line
-                        )  # Converting 0-indexed 'line after last' to 1-indexed gives us the actual last line
-
-                parsed = AutomationParser._parse_single_automation(
-                    auto, start_line, end_line
-                )
-                if parsed:
-                    automations.append(parsed)
-
             logger.info("Parsed %d automations from YAML", len(automations))
 
         except yaml.YAMLError as e:
@@ -125,12 +106,82 @@ class AutomationParser:
 
         return automations
 
+    @staticmethod
+    def _document_automations(
+        data: Any, root_node: Any
+    ) -> Optional[Tuple[List[Any], List[Any]]]:
+        """
+        Find the automations in one constructed YAML document.
+
+        Args:
+            data: Constructed document
+            root_node: Composed root node of the document
+
+        Returns:
+            Tuple of (automations, their composed nodes), or None if the
+            document has an unexpected structure
+        """
+        if isinstance(data, list):
+            # Direct list of automations
+            nodes = root_node.value if isinstance(root_node, yaml.SequenceNode) else []
+            return data, nodes
+
+        if not isinstance(data, dict):
+            return None
+
+        if "automation" not in data:
+            # Treat the whole dict as a single automation
+            return [data], [root_node]
+
+        # Wrapped in an automation key, holding a list or a single automation
+        automations_list = data["automation"]
+        is_list = isinstance(automations_list, list)
+        if not is_list:
+            automations_list = [automations_list]
+
+        automation_nodes: List[Any] = []
+        if isinstance(root_node, yaml.MappingNode):
+            for key_node, value_node in root_node.value:
+                if getattr(key_node, "value", None) == "automation":
+                    if isinstance(value_node, yaml.SequenceNode):
+                        automation_nodes = value_node.value
+                    elif not is_list:
+                        automation_nodes = [value_node]
+                    break
+
+        return automations_list, automation_nodes
+
+    @staticmethod
+    def _line_range(
+        automation_nodes: List[Any], idx: int
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Return the 1-indexed first and last line of an automation's node.
+
+        Args:
+            automation_nodes: Composed nodes of the automations, if known
+            idx: Index of the automation
+
+        Returns:
+            Tuple of (start line, end line), or Nones if the node is unknown
+        """
+        if idx >= len(automation_nodes):
+            return None, None
+        node = automation_nodes[idx]
+        if not (hasattr(node, "start_mark") and hasattr(node, "end_mark")):
+            return None, None
+        # Line numbers are 0-indexed in yaml, add 1 for 1-indexed
+        # start_mark.line points to the first line (0-indexed)
+        # end_mark.line points to the line after the last line (0-indexed),
+        # which converted to 1-indexed is the actual last line
+        return node.start_mark.line + 1, node.end_mark.line
+
     @staticmethod
     def _parse_single_automation(
         automation: Dict[str, Any],
         start_line: Optional[int] = None,
         end_line: Optional[int] = None,
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Dict[str, Any]:
         """
         Extract metadata from a single automation dictionary.
 
@@ -140,50 +191,39 @@ class AutomationParser:
             end_line: Ending line number in source file (1-indexed)
 
         Returns:
-            Parsed automation metadata, or None if invalid
+            Parsed automation metadata
         """
-        try:
-            # Extract alias/name (required for meaningful display)
-            alias = (
-                automation.get("alias")
-                or automation.get("name")
-                or automation.get("id")
-            )
-
-            # Extract description
-            description = automation.get("description", "")
-
-            # Extract trigger types (best effort)
-            # Home Assistant supports both 'trigger' and 'triggers' keys
-            triggers = automation.get("triggers") or automation.get("trigger", [])
-            trigger_types = AutomationParser._extract_trigger_types(triggers)
-
-            # Extract blueprint information
-            blueprint_info = AutomationParser._extract_blueprint_info(automation)
-
-            # Extract action calls (services used)
-            # Home Assistant supports both 'action' and 'actions' keys
-            actions = automation.get("actions") or automation.get("action", [])
-            action_calls = AutomationParser._extract_action_calls(actions)
-
-            return {
-                "alias": alias,
-                "description": description,
-                "trigger_types": trigger_types,
-                "blueprint_path": (
-                    blueprint_info.get("path") if blueprint_info else None
-                ),
-                "blueprint_input": (
-                    blueprint_info.get("input") if blueprint_info else None
-                ),
-                "action_calls": action_calls,
-                "start_line": start_line,
-                "end_line": end_line,
-            }
-
-        except Exception as e:
-            logger.warning(f"Error parsing single automation: {e}")
-            return None
+        # Bound once, the lookups below run for every automation indexed
+        get = automation.get
+
+        # Extract alias/name (required for meaningful display)
+        alias = get("alias") or get("name") or get("id")
+
+        # Extract description
+        description = get("description", "")
+
+        # Extract trigger types (best effort)
+        # Home Assistant supports both 'trigger' and 'triggers' keys
+        triggers = get("triggers") or get("trigger", [])
+        trigger_types = AutomationParser._extract_trigger_types(triggers)
+
+        # Extract blueprint path
+        blueprint_path = AutomationParser._extract_blueprint_path(automation)
+
+        # Extract action calls (services used)
+        # Home Assistant supports both 'action' and 'actions' keys
+        actions = get("actions") or get("action", [])
+        action_calls = AutomationParser._extract_action_calls(actions)
+
+        return {
+            "alias": alias,
+            "description": description,
+            "trigger_types": trigger_types,
+            "blueprint_path": blueprint_path,
+            "action_calls": action_calls,
+            "start_line": start_line,
+            "end_line": end_line,
+        }
 
     @staticmethod
     def _extract_trigger_types(triggers: Any) -> List[str]:
@@ -199,50 +239,40 @@ class AutomationParser:
         Returns:
             List of unique trigger types
         """
-        trigger_types: List[str] = []
-
-        try:
-            # Normalize to list
-            if isinstance(triggers, dict):
-                triggers = [triggers]
-            elif not isinstance(triggers, list):
-                return trigger_types
-
-            # Extract platform/trigger from each trigger
-            for trigger in triggers:
-                if isinstance(trigger, dict):
-                    # Try 'trigger' key first (newer format), then 'platform' (older format)
-                    trigger_type = trigger.get("trigger") or trigger.get("platform")
-                    if trigger_type and trigger_type not in trigger_types:
-                        trigger_types.append(trigger_type)
-
-        except Exception as e:
-            logger.warning(f"Error extracting trigger types: {e}")
-
-        return trigger_types
+        # Normalize to list
+        if isinstance(triggers, dict):
+            triggers = [triggers]
+        elif not isinstance(triggers, list):
+            return []
+
+        # Extract platform/trigger from each trigger, deduplicated in order
+        trigger_types: Dict[str, None] = {}
+        for trigger in triggers:
+            if isinstance(trigger, dict):
+                # Try 'trigger' key first (newer format), then 'platform' (older format)
+                trigger_type = trigger.get("trigger") or trigger.get("platform")
+                if trigger_type and isinstance(trigger_type, str):
+                    trigger_types[trigger_type] = None
+
+        return list(trigger_types)
 
     @staticmethod
-    def _extract_blueprint_info(automation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _extract_blueprint_path(automation: Dict[str, Any]) -> Optional[str]:
         """
-        Extract blueprint information from automation.
+        Extract the blueprint path from automation.
 
-        Automations using blueprints have a 'use_blueprint' key with path and input.
+        Automations using blueprints have a 'use_blueprint' key with path and
+        input. Only the path is indexed, so the input is not extracted.
 
         Args:
             automation: Automation dictionary
 
         Returns:
-            Dictionary with blueprint path and input, or None if not a blueprint
+            Blueprint path, or None if not a blueprint
         """
-        try:
-            use_blueprint = automation.get("use_blueprint")
-            if use_blueprint and isinstance(use_blueprint, dict):
-                return {
-                    "path": use_blueprint.get("path", ""),
-                    "input": use_blueprint.get("input", {}),
-                }
-        except Exception as e:
-            logger.warning(f"Error extracting blueprint info: {e}")
+        use_blueprint = automation.get("use_blueprint")
+        if use_blueprint and isinstance(use_blueprint, dict):
+            return use_blueprint.get("path", "")
 
         return None
 
@@ -262,47 +292,39 @@ class AutomationParser:
         """
         action_calls_set = set()
 
-        try:
-            # Normalize to list
-            if isinstance(actions, dict):
-                actions = [actions]
-            elif not isinstance(actions, list):
-                return []
-
-            # Extract service calls recursively
-            def extract_from_action(action: Dict[str, Any]) -> None:
-                if not isinstance(action, dict):
-                    return
-
-                # Direct service call - try 'action' key first (newer format), then 'service' (older format)
-                service = action.get("action") or action.get("service")
-                if service:
-                    action_calls_set.add(service)
-
-                # Check for nested actions (choose, if/then/else, repeat, etc.)
-                for key in ["then", "else", "sequence", "default"]:
-                    nested = action.get(key)
-                    if nested:
-                        if isinstance(nested, list):
-                            for nested_action in nested:
-                                extract_from_action(nested_action)
-                        elif isinstance(nested, dict):
-                            extract_from_action(nested)
-
-                # Handle choose actions
-                choose = action.get("choose")
-                if isinstance(choose, list):
-                    for choice in choose:
-                        if isinstance(choice, dict):
-                            sequence = choice.get("sequence")
-                            if isinstance(sequence, list):
-                                for seq_action in sequence:
-                                    extract_from_action(seq_action)
-
-            for action in actions:
-                extract_from_action(action)
-
-        except Exception as e:
-            logger.warning(f"Error extracting action calls: {e}")
+        # Normalize to list
+        if isinstance(actions, dict):
+            actions = [actions]
+        elif not isinstance(actions, list):
+            return []
+
+        # Walk nested actions (choose, if/then/else, repeat, etc.) with an
+        # explicit stack instead of recursing once per action
+        stack = list(actions)
+        while stack:
+            action = stack.pop()
+            if not isinstance(action, dict):
+                continue
+
+            # Direct service call - try 'action' key first (newer format), then 'service' (older format)
+            service = action.get("action") or action.get("service")
+            if service and isinstance(service, str):
+                action_calls_set.add(service)
+
+            for key in ("then", "else", "sequence", "default"):
+                nested = action.get(key)
+                if isinstance(nested, list):
+                    stack.extend(nested)
+                elif isinstance(nested, dict):
+                    stack.append(nested)
+
+            # Handle choose actions
+            choose = action.get("choose")
+            if isinstance(choose, list):
+                for choice in choose:
+                    if isinstance(choice, dict):
+                        sequence = choice.get("sequence")
+                        if isinstance(sequence, list):
+                            stack.extend(sequence)
 
         return list(action_calls_set)
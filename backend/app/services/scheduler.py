@@ -1,13 +1,14 @@
 """Scheduler service for running periodic background tasks."""
 
+import asyncio
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
+from app.models import get_engine
+from app.services.cache import response_cache
 from app.services.indexer import IndexingService
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 logger = logging.getLogger(__name__)
@@ -18,17 +19,15 @@ class SchedulerService:
 
     def __init__(self):
         """Initialize the scheduler service."""
-        self.scheduler = AsyncIOScheduler()
+        self._task: Optional[asyncio.Task] = None
         self.indexer = None
         self._setup_database()
 
     def _setup_database(self):
         """Set up database connection for scheduled tasks."""
         db_url = os.getenv("DATABASE_URL", "sqlite:///./data/hadiscover.db")
-        self.engine = create_engine(
-            db_url,
-            connect_args={"check_same_thread": False} if "sqlite" in db_url else {},
-        )
+        # Same engine and pool as the API when both use the same database
+        self.engine = get_engine(db_url)
         self.SessionLocal = sessionmaker(
             autocommit=False, autoflush=False, bind=self.engine
         )
@@ -62,25 +61,38 @@ class SchedulerService:
             logger.error(f"Scheduled indexing failed: {e}", exc_info=True)
         finally:
             db.close()
+            # Indexed data changed, drop cached search and statistics responses
+            response_cache.clear()
+
+    @staticmethod
+    def _next_top_of_hour(now: datetime) -> datetime:
+        """Return the first top of the hour after a point in time."""
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    async def _run_hourly(self) -> None:
+        """Run the indexing task at the top of every hour until cancelled."""
+        next_run = self._next_top_of_hour(datetime.now(timezone.utc))
+        while True:
+            delay = (next_run - datetime.now(timezone.utc)).total_seconds()
+            await asyncio.sleep(max(delay, 0))
+            await self.run_indexing_task()
+
+            # Runs never overlap: hours that passed while indexing are skipped
+            next_run += timedelta(hours=1)
+            now = datetime.now(timezone.utc)
+            while next_run <= now:
+                next_run += timedelta(hours=1)
 
     def start(self):
         """Start the scheduler with hourly indexing at top of the hour."""
-        # Add hourly indexing job - runs at minute 0 of every hour
-        self.scheduler.add_job(
-            self.run_indexing_task,
-            trigger=CronTrigger(minute=0),
-            id="hourly_indexing",
-            name="Index Home Assistant automations from GitHub",
-            replace_existing=True,
-            max_instances=1,  # Only one instance at a time
+        self._task = asyncio.get_running_loop().create_task(
+            self._run_hourly(), name="hourly_indexing"
         )
-
-        # Start the scheduler
-        self.scheduler.start()
         logger.info("Scheduler started - indexing will run at the top of every hour")
 
     def shutdown(self):
         """Shutdown the scheduler gracefully."""
-        if self.scheduler.running:
-            self.scheduler.shutdown()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
             logger.info("Scheduler shut down")
+        self._task = None
@@ -1,14 +1,97 @@
 """Search service for querying Home Assistant automations."""
 
+import base64
 import logging
-from typing import Any, Dict, List, Optional, Tuple
-
-from app.models.database import Automation, IndexingMetadata, Repository
-from sqlalchemy import func, or_
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TypedDict
+
+import orjson
+from app.models.database import (
+    AUTOMATIONS_FTS_TABLE,
+    Automation,
+    AutomationActionCall,
+    AutomationTrigger,
+    IndexingMetadata,
+    Repository,
+    has_automation_search_index,
+)
+from sqlalchemy import (
+    ColumnElement,
+    RowMapping,
+    Select,
+    and_,
+    func,
+    literal,
+    literal_column,
+    null,
+    or_,
+    select,
+    table,
+    union_all,
+)
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# The trigram tokenizer cannot match queries shorter than three characters
+FTS_MIN_QUERY_LENGTH = 3
+
+# IndexingMetadata key holding the unfiltered facets as JSON
+DEFAULT_FACETS_METADATA_KEY = "default_facets"
+
+
+# Columns of a search result, selected as plain rows so that no ORM objects
+# are built for results that are only turned into dictionaries
+_SEARCH_COLUMNS = (
+    Automation.id,
+    Automation.alias,
+    Automation.description,
+    Automation.trigger_types,
+    Automation.blueprint_path,
+    Automation.action_calls,
+    Automation.source_file_path,
+    Automation.github_url,
+    Automation.start_line,
+    Automation.end_line,
+    Automation.indexed_at,
+    Repository.name.label("repository_name"),
+    Repository.owner.label("repository_owner"),
+    Repository.description.label("repository_description"),
+    Repository.url.label("repository_url"),
+    Repository.stars.label("repository_stars"),
+)
+
+# Position after the last returned result: (indexed_at, id); indexed_at is
+# None for rows that were never stamped, which sort after all others
+SearchCursor = Tuple[Optional[datetime], int]
+
+
+class RepositoryRow(TypedDict):
+    """Repository information in a search result."""
+
+    name: str
+    owner: str
+    description: Optional[str]
+    url: str
+    stars: int
+
+
+class AutomationRow(TypedDict):
+    """Automation search result in the API response format."""
+
+    id: int
+    alias: Optional[str]
+    description: Optional[str]
+    trigger_types: List[str]
+    blueprint_path: Optional[str]
+    action_calls: List[str]
+    source_file_path: str
+    github_url: str
+    start_line: Optional[int]
+    end_line: Optional[int]
+    repository: RepositoryRow
+    indexed_at: Optional[str]
+
 
 class SearchService:
     """Service for searching Home Assistant automations."""
@@ -22,69 +105,240 @@ class SearchService:
         escaped = escaped.replace("_", escape_char + "_")
         return escaped
 
+    # The lookup subqueries select from the Core tables: an ORM-entity
+    # subquery compiles to a different statement cache key on first use.
+
     @staticmethod
-    def _extract_action_domain(action_call: str) -> str:
+    def _trigger_condition(
+        trigger_type: str, automation_id: Any = Automation.id
+    ) -> ColumnElement[bool]:
         """
-        Extract the domain from an action call.
+        Create the SQL condition for automations using a trigger type.
 
         Args:
-            action_call: Action call in format "domain.service" (e.g., "media_player.volume_set")
+            trigger_type: The exact trigger type to match
+            automation_id: Automation id column to restrict
 
         Returns:
-            The domain part (e.g., "media_player"), or empty string if no domain found
+            Condition seeking the trigger lookup index
         """
-        if "." in action_call:
-            return action_call.split(".")[0]
-        return ""
+        triggers = AutomationTrigger.__table__.c
+        return automation_id.in_(
+            select(triggers.automation_id).where(triggers.trigger_type == trigger_type)
+        )
 
     @staticmethod
-    def _exact_match_in_comma_list(column, value: str):
+    def _action_call_condition(
+        action_call: str, automation_id: Any = Automation.id
+    ) -> ColumnElement[bool]:
+        """
+        Create the SQL condition for automations using an action call.
+
+        Args:
+            action_call: The exact action call to match (e.g., "light.turn_on")
+            automation_id: Automation id column to restrict
+
+        Returns:
+            Condition seeking the action call lookup index
         """
-        Create SQL condition for exact match in comma-separated list.
+        action_calls = AutomationActionCall.__table__.c
+        return automation_id.in_(
+            select(action_calls.automation_id).where(
+                action_calls.action_call == action_call
+            )
+        )
 
-        Handles these cases:
-        - Single value: "value"
-        - First in list: "value,..."
-        - Middle of list: "...,value,..."
-        - Last in list: "...,value"
+    @staticmethod
+    def _action_domain_condition(
+        domain: str, automation_id: Any = Automation.id
+    ) -> ColumnElement[bool]:
+        """
+        Create the SQL condition for automations using an action domain.
 
         Args:
-            column: SQLAlchemy column containing comma-separated values
-            value: The exact value to match
+            domain: The action domain to match (e.g., "media_player")
+            automation_id: Automation id column to restrict
 
         Returns:
-            SQLAlchemy OR condition for exact matching
+            Condition seeking the action domain lookup index
+        """
+        action_calls = AutomationActionCall.__table__.c
+        return automation_id.in_(
+            select(action_calls.automation_id).where(action_calls.domain == domain)
+        )
+
+    @staticmethod
+    def _has_search_index(db: Session) -> bool:
+        """Check whether the automation full-text index is available."""
+        return has_automation_search_index(db.connection())
+
+    @staticmethod
+    def _text_search_condition(db: Session, query: str) -> ColumnElement[bool]:
         """
-        escape_char = "\\"
-        escaped_value = SearchService._escape_like(value, escape_char=escape_char)
+        Create the SQL condition for a free-text search query.
+
+        Automation fields are matched through the full-text index when it is
+        available and the query is long enough for trigram matching. Shorter
+        queries and databases without the index fall back to LIKE scans.
+        Repository fields are always matched with LIKE.
+
+        Args:
+            db: Database session
+            query: Search query string
+
+        Returns:
+            SQLAlchemy OR condition matching the query
+        """
+        search_pattern = func.lower(f"%{query}%")
+        repository_conditions = [
+            func.lower(Repository.owner).like(search_pattern),
+            func.lower(Repository.name).like(search_pattern),
+            func.lower(Repository.description).like(search_pattern),
+        ]
+
+        if len(query) >= FTS_MIN_QUERY_LENGTH and SearchService._has_search_index(db):
+            # Quote the query as a single FTS5 phrase so operators are literal
+            phrase = '"' + query.replace('"', '""') + '"'
+            automation_condition = Automation.id.in_(
+                select(literal_column("rowid"))
+                .select_from(table(AUTOMATIONS_FTS_TABLE))
+                .where(literal_column(AUTOMATIONS_FTS_TABLE).op("MATCH")(phrase))
+            )
+            return or_(automation_condition, *repository_conditions)
 
         return or_(
-            column == value,  # Exact match (single value)
-            column.like(f"{escaped_value},%", escape=escape_char),  # First in list
-            column.like(f"%,{escaped_value},%", escape=escape_char),  # Middle of list
-            column.like(f"%,{escaped_value}", escape=escape_char),  # Last in list
+            func.lower(Automation.alias).like(search_pattern),
+            func.lower(Automation.description).like(search_pattern),
+            func.lower(Automation.trigger_types).like(search_pattern),
+            func.lower(Automation.action_calls).like(search_pattern),
+            *repository_conditions,
         )
 
     @staticmethod
-    def search_automations(
+    def _split_csv(value: Optional[str]) -> List[str]:
+        """Split a comma-separated column, dropping whitespace and empty entries."""
+        if not value:
+            return []
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    @staticmethod
+    def _format_automation(row: RowMapping) -> AutomationRow:
+        """
+        Format a search row as an API result.
+
+        Args:
+            row: Mapping of the _SEARCH_COLUMNS of one automation
+
+        Returns:
+            Dictionary in the search API result format
+        """
+        indexed_at = row["indexed_at"]
+        return {
+            "id": row["id"],
+            "alias": row["alias"],
+            "description": row["description"],
+            "trigger_types": SearchService._split_csv(row["trigger_types"]),
+            "blueprint_path": row["blueprint_path"],
+            "action_calls": SearchService._split_csv(row["action_calls"]),
+            "source_file_path": row["source_file_path"],
+            "github_url": row["github_url"],
+            "start_line": row["start_line"],
+            "end_line": row["end_line"],
+            "repository": {
+                "name": row["repository_name"],
+                "owner": row["repository_owner"],
+                "description": row["repository_description"],
+                "url": row["repository_url"],
+                "stars": row["repository_stars"] or 0,
+            },
+            "indexed_at": indexed_at.isoformat() if indexed_at else None,
+        }
+
+    @staticmethod
+    def encode_cursor(result: AutomationRow) -> str:
+        """
+        Build an opaque cursor pointing just past a search result.
+
+        Args:
+            result: Last result of the current page
+
+        Returns:
+            URL-safe cursor string
+        """
+        indexed_at = result["indexed_at"] or ""
+        raw = f"{indexed_at}|{result['id']}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> SearchCursor:
+        """
+        Decode a cursor produced by encode_cursor.
+
+        Args:
+            cursor: Cursor string from a previous search response
+
+        Returns:
+            Tuple of (indexed_at, id) of the last result already returned
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        indexed_at, _, automation_id = raw.rpartition("|")
+        return (
+            datetime.fromisoformat(indexed_at) if indexed_at else None,
+            int(automation_id),
+        )
+
+    @staticmethod
+    def _apply_cursor(base_query: Select, cursor: SearchCursor) -> Select:
+        """Restrict an ordered search query to results after a cursor."""
+        indexed_at, automation_id = cursor
+        # SQLite sorts NULL timestamps last in descending order
+        if indexed_at is None:
+            return base_query.filter(
+                Automation.indexed_at.is_(None), Automation.id < automation_id
+            )
+        return base_query.filter(
+            or_(
+                Automation.indexed_at < indexed_at,
+                and_(
+                    Automation.indexed_at == indexed_at,
+                    Automation.id < automation_id,
+                ),
+                Automation.indexed_at.is_(None),
+            )
+        )
+
+    @staticmethod
+    def _paginate(
+        base_query: Select, page: int, per_page: int, cursor: Optional[SearchCursor]
+    ) -> Select:
+        """Skip to the requested page, by cursor if given, else by offset."""
+        if cursor is not None:
+            return SearchService._apply_cursor(base_query, cursor)
+        return base_query.offset((page - 1) * per_page)
+
+    @staticmethod
+    def _build_search_query(
         db: Session,
         query: str,
-        page: int = 1,
-        per_page: int = 15,
         repo_filter: Optional[str] = None,
         blueprint_filter: Optional[str] = None,
         trigger_filter: Optional[str] = None,
         action_domain_filter: Optional[str] = None,
         action_filter: Optional[str] = None,
-    ) -> Tuple[List[Dict[str, Any]], int]:
+    ) -> Select:
         """
-        Search automations by text query across multiple fields.
+        Build the automation search query for a text query and filters.
+
+        Results are ordered by (indexed_at, id), most recently indexed first,
+        which is also the order that search cursors follow.
 
         Args:
             db: Database session
             query: Search query string
-            page: Page number (1-indexed)
-            per_page: Number of results per page
             repo_filter: Filter by repository (format: "owner/name")
             blueprint_filter: Filter by blueprint path
             trigger_filter: Filter by trigger type
@@ -92,146 +346,113 @@ class SearchService:
             action_filter: Filter by action call (service name)
 
         Returns:
-            Tuple of (list of automation results with repository information, total count)
+            Select yielding the _SEARCH_COLUMNS of matching automations
         """
-        if (
-            not query
-            and not repo_filter
-            and not blueprint_filter
-            and not trigger_filter
-            and not action_domain_filter
-            and not action_filter
-        ):
-            # Return recent automations if no query or filters
-            return SearchService._get_recent_automations(db, page, per_page)
+        base_query = select(*_SEARCH_COLUMNS).join_from(
+            Automation, Repository, Automation.repository_id == Repository.id
+        )
 
-        try:
-            # Build query with filters
-            base_query = db.query(Automation, Repository).join(
-                Repository, Automation.repository_id == Repository.id
+        # Apply text search if provided
+        if query:
+            base_query = base_query.filter(
+                SearchService._text_search_condition(db, query)
             )
 
-            # Apply text search if provided
-            if query:
-                search_pattern = f"%{query}%"
+        # Apply repository filter
+        if repo_filter:
+            # repo_filter format is "owner/name"
+            if "/" in repo_filter:
+                owner, name = repo_filter.split("/", 1)
                 base_query = base_query.filter(
-                    or_(
-                        func.lower(Automation.alias).like(func.lower(search_pattern)),
-                        func.lower(Automation.description).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Automation.trigger_types).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Automation.action_calls).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Repository.owner).like(func.lower(search_pattern)),
-                        func.lower(Repository.name).like(func.lower(search_pattern)),
-                        func.lower(Repository.description).like(
-                            func.lower(search_pattern)
-                        ),
-                    )
+                    Repository.owner == owner, Repository.name == name
                 )
 
-            # Apply repository filter
-            if repo_filter:
-                # repo_filter format is "owner/name"
-                if "/" in repo_filter:
-                    owner, name = repo_filter.split("/", 1)
-                    base_query = base_query.filter(
-                        Repository.owner == owner, Repository.name == name
-                    )
+        # Apply blueprint filter
+        if blueprint_filter:
+            base_query = base_query.filter(
+                Automation.blueprint_path == blueprint_filter
+            )
 
-            # Apply blueprint filter
-            if blueprint_filter:
-                base_query = base_query.filter(
-                    Automation.blueprint_path == blueprint_filter
-                )
+        # Apply trigger filter
+        if trigger_filter:
+            base_query = base_query.filter(
+                SearchService._trigger_condition(trigger_filter)
+            )
 
-            # Apply trigger filter
-            if trigger_filter:
-                # Trigger types are stored as comma-separated, use exact match
-                base_query = base_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.trigger_types, trigger_filter
-                    )
-                )
+        # Apply action domain filter
+        if action_domain_filter:
+            base_query = base_query.filter(
+                SearchService._action_domain_condition(action_domain_filter)
+            )
 
-            # Apply action domain filter
-            if action_domain_filter:
-                # Action calls are stored as comma-separated (e.g., "media_player.volume_set")
-                # Filter by domain (e.g., "media_player") by matching patterns that ensure
-                # the domain is followed by a dot (to avoid partial matches)
-                escape_char = "\\"
-                escaped_domain = SearchService._escape_like(
-                    action_domain_filter, escape_char=escape_char
-                )
-                # Match domain at start or after comma, always followed by a dot
-                base_query = base_query.filter(
-                    or_(
-                        Automation.action_calls.like(
-                            f"{escaped_domain}.%", escape=escape_char
-                        ),  # Start of string
-                        Automation.action_calls.like(
-                            f"%,{escaped_domain}.%", escape=escape_char
-                        ),  # After comma
-                    )
-                )
+        # Apply action filter
+        if action_filter:
+            base_query = base_query.filter(
+                SearchService._action_call_condition(action_filter)
+            )
 
-            # Apply action filter
-            if action_filter:
-                # Action calls are stored as comma-separated, use exact match
-                base_query = base_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.action_calls, action_filter
-                    )
-                )
+        # Most recently indexed first; the id tiebreak keeps pages stable
+        return base_query.order_by(Automation.indexed_at.desc(), Automation.id.desc())
+
+    @staticmethod
+    def _count(db: Session, base_query: Select) -> int:
+        """Count the rows of a search query, ignoring its ordering."""
+        return db.execute(
+            select(func.count()).select_from(base_query.order_by(None).subquery())
+        ).scalar_one()
+
+    @staticmethod
+    def search_automations(
+        db: Session,
+        query: str,
+        page: int = 1,
+        per_page: int = 15,
+        repo_filter: Optional[str] = None,
+        blueprint_filter: Optional[str] = None,
+        trigger_filter: Optional[str] = None,
+        action_domain_filter: Optional[str] = None,
+        action_filter: Optional[str] = None,
+        cursor: Optional[SearchCursor] = None,
+    ) -> Tuple[List[AutomationRow], int]:
+        """
+        Search automations by text query across multiple fields.
+
+        Args:
+            db: Database session
+            query: Search query string
+            page: Page number (1-indexed), ignored when a cursor is given
+            per_page: Number of results per page
+            repo_filter: Filter by repository (format: "owner/name")
+            blueprint_filter: Filter by blueprint path
+            trigger_filter: Filter by trigger type
+            action_domain_filter: Filter by action domain (e.g., "media_player")
+            action_filter: Filter by action call (service name)
+            cursor: Decoded cursor; returns the results after it without an offset
+
+        Returns:
+            Tuple of (list of automation results with repository information, total count)
+        """
+        try:
+            base_query = SearchService._build_search_query(
+                db,
+                query,
+                repo_filter=repo_filter,
+                blueprint_filter=blueprint_filter,
+                trigger_filter=trigger_filter,
+                action_domain_filter=action_domain_filter,
+                action_filter=action_filter,
+            )
 
             # Get total count before pagination
-            total = base_query.count()
+            total = SearchService._count(db, base_query)
 
             # Apply pagination
-            offset = (page - 1) * per_page
-            results = base_query.offset(offset).limit(per_page).all()
-
-            # Format results
-            formatted_results = []
-            for automation, repository in results:
-                formatted_results.append(
-                    {
-                        "id": automation.id,
-                        "alias": automation.alias,
-                        "description": automation.description,
-                        "trigger_types": (
-                            automation.trigger_types.split(",")
-                            if automation.trigger_types
-                            else []
-                        ),
-                        "blueprint_path": automation.blueprint_path,
-                        "action_calls": (
-                            automation.action_calls.split(",")
-                            if automation.action_calls
-                            else []
-                        ),
-                        "source_file_path": automation.source_file_path,
-                        "github_url": automation.github_url,
-                        "start_line": automation.start_line,
-                        "end_line": automation.end_line,
-                        "repository": {
-                            "name": repository.name,
-                            "owner": repository.owner,
-                            "description": repository.description,
-                            "url": repository.url,
-                            "stars": repository.stars or 0,
-                        },
-                        "indexed_at": (
-                            automation.indexed_at.isoformat()
-                            if automation.indexed_at
-                            else None
-                        ),
-                    }
-                )
+            page_query = SearchService._paginate(base_query, page, per_page, cursor)
+            results = db.execute(page_query.limit(per_page)).mappings()
+
+            formatted_results = [
+                SearchService._format_automation(row) for row in results
+            ]
 
             logger.info(
                 f"Search query '{query}' returned {len(formatted_results)} results (page {page}, total {total})"
@@ -243,81 +464,103 @@ class SearchService:
             return [], 0
 
     @staticmethod
-    def _get_recent_automations(
-        db: Session, page: int, per_page: int
-    ) -> Tuple[List[Dict[str, Any]], int]:
+    def count_automations(
+        db: Session,
+        query: str,
+        repo_filter: Optional[str] = None,
+        blueprint_filter: Optional[str] = None,
+        trigger_filter: Optional[str] = None,
+        action_domain_filter: Optional[str] = None,
+        action_filter: Optional[str] = None,
+    ) -> int:
         """
-        Get most recently indexed automations.
+        Count automations matching a text query and filters.
 
         Args:
             db: Database session
-            page: Page number (1-indexed)
-            per_page: Number of results per page
+            query: Search query string
+            repo_filter: Filter by repository (format: "owner/name")
+            blueprint_filter: Filter by blueprint path
+            trigger_filter: Filter by trigger type
+            action_domain_filter: Filter by action domain (e.g., "media_player")
+            action_filter: Filter by action call (service name)
 
         Returns:
-            Tuple of (list of recent automations, total count)
+            Total number of matching automations
         """
         try:
-            # Get total count
-            total = (
-                db.query(Automation)
-                .join(Repository, Automation.repository_id == Repository.id)
-                .count()
+            return SearchService._count(
+                db,
+                SearchService._build_search_query(
+                    db,
+                    query,
+                    repo_filter=repo_filter,
+                    blueprint_filter=blueprint_filter,
+                    trigger_filter=trigger_filter,
+                    action_domain_filter=action_domain_filter,
+                    action_filter=action_filter,
+                ),
             )
+        except Exception as e:
+            logger.error(f"Error counting automations: {e}")
+            return 0
 
-            # Apply pagination
-            offset = (page - 1) * per_page
-            results = (
-                db.query(Automation, Repository)
-                .join(Repository, Automation.repository_id == Repository.id)
-                .order_by(Automation.indexed_at.desc(), Automation.id.desc())
-                .offset(offset)
-                .limit(per_page)
-                .all()
+    @staticmethod
+    def iter_automations(
+        db: Session,
+        query: str,
+        page: int = 1,
+        per_page: int = 15,
+        repo_filter: Optional[str] = None,
+        blueprint_filter: Optional[str] = None,
+        trigger_filter: Optional[str] = None,
+        action_domain_filter: Optional[str] = None,
+        action_filter: Optional[str] = None,
+        cursor: Optional[SearchCursor] = None,
+    ) -> Iterator[AutomationRow]:
+        """
+        Yield one page of search results without materializing the page.
+
+        Takes the same arguments as search_automations. Rows are fetched from
+        the database in small batches and formatted as they are consumed.
+
+        Yields:
+            Automation results with repository information
+        """
+        try:
+            base_query = SearchService._build_search_query(
+                db,
+                query,
+                repo_filter=repo_filter,
+                blueprint_filter=blueprint_filter,
+                trigger_filter=trigger_filter,
+                action_domain_filter=action_domain_filter,
+                action_filter=action_filter,
             )
+            rows = db.execute(
+                SearchService._paginate(base_query, page, per_page, cursor)
+                .limit(per_page)
+                .execution_options(yield_per=25)
+            ).mappings()
+            for row in rows:
+                yield SearchService._format_automation(row)
+        except Exception as e:
+            logger.error(f"Error streaming automations: {e}")
 
-            formatted_results = []
-            for automation, repository in results:
-                formatted_results.append(
-                    {
-                        "id": automation.id,
-                        "alias": automation.alias,
-                        "description": automation.description,
-                        "trigger_types": (
-                            automation.trigger_types.split(",")
-                            if automation.trigger_types
-                            else []
-                        ),
-                        "blueprint_path": automation.blueprint_path,
-                        "action_calls": (
-                            automation.action_calls.split(",")
-                            if automation.action_calls
-                            else []
-                        ),
-                        "source_file_path": automation.source_file_path,
-                        "github_url": automation.github_url,
-                        "start_line": automation.start_line,
-                        "end_line": automation.end_line,
-                        "repository": {
-                            "name": repository.name,
-                            "owner": repository.owner,
-                            "description": repository.description,
-                            "url": repository.url,
-                            "stars": repository.stars or 0,
-                        },
-                        "indexed_at": (
-                            automation.indexed_at.isoformat()
-                            if automation.indexed_at
-                            else None
-                        ),
-                    }
-                )
+    @staticmethod
+    def list_all_automations(db: Session) -> List[AutomationRow]:
+        """
+        Return every automation in the search result format.
 
-            return formatted_results, total
+        Args:
+            db: Database session
 
-        except Exception as e:
-            logger.error(f"Error getting recent automations: {e}")
-            return [], 0
+        Returns:
+            All automations with repository information, most recently
+            indexed first
+        """
+        rows = db.execute(SearchService._build_search_query(db, "")).mappings()
+        return [SearchService._format_automation(row) for row in rows]
 
     @staticmethod
     def get_statistics(db: Session) -> Dict[str, Any]:
@@ -373,6 +616,9 @@ class SearchService:
         """
         Get facets (aggregated counts) for filters.
 
+        Without a query or filters, the facets precomputed by the last
+        indexing run are returned when available.
+
         Args:
             db: Database session
             query: Current search query
@@ -385,302 +631,203 @@ class SearchService:
         Returns:
             Dictionary with facets for repositories, blueprints, triggers, action domains, and actions
         """
+        if (
+            not query
+            and not repo_filter
+            and not blueprint_filter
+            and not trigger_filter
+            and not action_domain_filter
+            and not action_filter
+        ):
+            precomputed = SearchService._load_default_facets(db)
+            if precomputed is not None:
+                return precomputed
+
+        return SearchService.compute_facets(
+            db,
+            query,
+            repo_filter=repo_filter,
+            blueprint_filter=blueprint_filter,
+            trigger_filter=trigger_filter,
+            action_domain_filter=action_domain_filter,
+            action_filter=action_filter,
+        )
+
+    @staticmethod
+    def _load_default_facets(db: Session) -> Optional[Dict[str, Any]]:
+        """
+        Load the facets precomputed by the last indexing run.
+
+        Args:
+            db: Database session
+
+        Returns:
+            Facets dictionary, or None if none are stored
+        """
         try:
-            # Build base query with current filters (except the one we're aggregating)
-            base_query = db.query(Automation, Repository).join(
-                Repository, Automation.repository_id == Repository.id
+            value = (
+                db.query(IndexingMetadata.value)
+                .filter_by(key=DEFAULT_FACETS_METADATA_KEY)
+                .scalar()
             )
+            return orjson.loads(value) if value else None
+        except Exception as e:
+            logger.error(f"Error loading precomputed facets: {e}")
+            return None
 
-            # Apply text search if provided
-            if query:
-                search_pattern = f"%{query}%"
-                base_query = base_query.filter(
-                    or_(
-                        func.lower(Automation.alias).like(func.lower(search_pattern)),
-                        func.lower(Automation.description).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Automation.trigger_types).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Automation.action_calls).like(
-                            func.lower(search_pattern)
-                        ),
-                        func.lower(Repository.owner).like(func.lower(search_pattern)),
-                        func.lower(Repository.name).like(func.lower(search_pattern)),
-                        func.lower(Repository.description).like(
-                            func.lower(search_pattern)
-                        ),
-                    )
-                )
+    @staticmethod
+    def compute_facets(
+        db: Session,
+        query: str = "",
+        repo_filter: Optional[str] = None,
+        blueprint_filter: Optional[str] = None,
+        trigger_filter: Optional[str] = None,
+        action_domain_filter: Optional[str] = None,
+        action_filter: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compute facets (aggregated counts) for filters from the automations.
 
-            # Get repository facets (excluding current repo filter)
-            repo_query = base_query
-            if blueprint_filter:
-                repo_query = repo_query.filter(
-                    Automation.blueprint_path == blueprint_filter
-                )
-            if trigger_filter:
-                repo_query = repo_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.trigger_types, trigger_filter
-                    )
-                )
-            if action_domain_filter:
-                escape_char = "\\"
-                escaped_domain = SearchService._escape_like(
-                    action_domain_filter, escape_char=escape_char
-                )
-                repo_query = repo_query.filter(
-                    or_(
-                        Automation.action_calls.like(
-                            f"{escaped_domain}.%", escape=escape_char
-                        ),
-                        Automation.action_calls.like(
-                            f"%,{escaped_domain}.%", escape=escape_char
-                        ),
-                    )
-                )
-            if action_filter:
-                repo_query = repo_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.action_calls, action_filter
-                    )
-                )
+        Args:
+            db: Database session
+            query: Current search query
+            repo_filter: Currently selected repository filter
+            blueprint_filter: Currently selected blueprint filter
+            trigger_filter: Currently selected trigger filter
+            action_domain_filter: Currently selected action domain filter
+            action_filter: Currently selected action filter
 
-            repo_facets = (
-                repo_query.with_entities(
-                    Repository.owner,
-                    Repository.name,
-                    func.max(Repository.stars).label("stars"),
-                    func.count(Automation.id).label("count"),
-                )
-                .group_by(Repository.owner, Repository.name)
-                .order_by(func.count(Automation.id).desc())
-                .limit(20)
-                .all()
+        Returns:
+            Dictionary with facets for repositories, blueprints, triggers, action domains, and actions
+        """
+        try:
+            matching_query = select(
+                Automation.id,
+                Repository.owner,
+                Repository.name,
+                Repository.stars,
+                Automation.blueprint_path,
+            ).join_from(
+                Automation, Repository, Automation.repository_id == Repository.id
             )
 
-            # Get blueprint facets (excluding current blueprint filter)
-            blueprint_query = base_query
-            if repo_filter and "/" in repo_filter:
-                owner, name = repo_filter.split("/", 1)
-                blueprint_query = blueprint_query.filter(
-                    Repository.owner == owner, Repository.name == name
-                )
-            if trigger_filter:
-                blueprint_query = blueprint_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.trigger_types, trigger_filter
-                    )
-                )
-            if action_domain_filter:
-                escape_char = "\\"
-                escaped_domain = SearchService._escape_like(
-                    action_domain_filter, escape_char=escape_char
-                )
-                blueprint_query = blueprint_query.filter(
-                    or_(
-                        Automation.action_calls.like(
-                            f"{escaped_domain}.%", escape=escape_char
-                        ),
-                        Automation.action_calls.like(
-                            f"%,{escaped_domain}.%", escape=escape_char
-                        ),
-                    )
-                )
-            if action_filter:
-                blueprint_query = blueprint_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.action_calls, action_filter
-                    )
+            # Apply text search if provided
+            if query:
+                matching_query = matching_query.where(
+                    SearchService._text_search_condition(db, query)
                 )
 
-            blueprint_facets = (
-                blueprint_query.filter(Automation.blueprint_path.isnot(None))
-                .with_entities(
-                    Automation.blueprint_path, func.count(Automation.id).label("count")
-                )
-                .group_by(Automation.blueprint_path)
-                .order_by(func.count(Automation.id).desc())
-                .limit(20)
-                .all()
-            )
+            # Every facet reads the matches from this CTE in one statement, so
+            # the database evaluates the text search once for all of them
+            matching = matching_query.cte("matching")
+            m = matching.c
 
-            # Get trigger facets (excluding current trigger filter)
-            trigger_query = base_query
+            # Each facet applies the current filters except its own
+            filters: Dict[str, ColumnElement[bool]] = {}
             if repo_filter and "/" in repo_filter:
                 owner, name = repo_filter.split("/", 1)
-                trigger_query = trigger_query.filter(
-                    Repository.owner == owner, Repository.name == name
-                )
+                filters["repositories"] = and_(m.owner == owner, m.name == name)
             if blueprint_filter:
-                trigger_query = trigger_query.filter(
-                    Automation.blueprint_path == blueprint_filter
+                filters["blueprints"] = m.blueprint_path == blueprint_filter
+            if trigger_filter:
+                filters["triggers"] = SearchService._trigger_condition(
+                    trigger_filter, m.id
                 )
             if action_domain_filter:
-                escape_char = "\\"
-                escaped_domain = SearchService._escape_like(
-                    action_domain_filter, escape_char=escape_char
-                )
-                trigger_query = trigger_query.filter(
-                    or_(
-                        Automation.action_calls.like(
-                            f"{escaped_domain}.%", escape=escape_char
-                        ),
-                        Automation.action_calls.like(
-                            f"%,{escaped_domain}.%", escape=escape_char
-                        ),
-                    )
+                filters["action_domains"] = SearchService._action_domain_condition(
+                    action_domain_filter, m.id
                 )
             if action_filter:
-                trigger_query = trigger_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.action_calls, action_filter
-                    )
+                filters["actions"] = SearchService._action_call_condition(
+                    action_filter, m.id
                 )
 
-            # Get all trigger types and aggregate
-            all_triggers = (
-                trigger_query.filter(Automation.trigger_types.isnot(None))
-                .with_entities(Automation.trigger_types)
-                .all()
-            )
+            def other_filters(facet: str) -> List[ColumnElement[bool]]:
+                return [condition for key, condition in filters.items() if key != facet]
 
-            # Parse comma-separated trigger types and count
-            trigger_counts: Dict[str, int] = {}
-            for (trigger_str,) in all_triggers:
-                if trigger_str:
-                    for trigger in trigger_str.split(","):
-                        trigger = trigger.strip()
-                        if trigger:
-                            trigger_counts[trigger] = trigger_counts.get(trigger, 0) + 1
-
-            # Sort by count and limit
-            trigger_facets = sorted(
-                trigger_counts.items(), key=lambda x: x[1], reverse=True
-            )[:20]
-
-            # Get action domain facets (excluding current action domain filter)
-            action_domain_query = base_query
-            if repo_filter and "/" in repo_filter:
-                owner, name = repo_filter.split("/", 1)
-                action_domain_query = action_domain_query.filter(
-                    Repository.owner == owner, Repository.name == name
-                )
-            if blueprint_filter:
-                action_domain_query = action_domain_query.filter(
-                    Automation.blueprint_path == blueprint_filter
-                )
-            if trigger_filter:
-                action_domain_query = action_domain_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.trigger_types, trigger_filter
-                    )
-                )
-            if action_filter:
-                action_domain_query = action_domain_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.action_calls, action_filter
-                    )
-                )
-
-            # Get all action calls and extract domains
-            all_action_domains = (
-                action_domain_query.filter(Automation.action_calls.isnot(None))
-                .with_entities(Automation.action_calls)
-                .all()
-            )
+            count = func.count()
+            triggers = AutomationTrigger.__table__
+            action_calls = AutomationActionCall.__table__
 
-            # Parse comma-separated action calls, extract domains, and count
-            action_domain_counts: Dict[str, int] = {}
-            for (action_str,) in all_action_domains:
-                if action_str:
-                    for action in action_str.split(","):
-                        action = action.strip()
-                        domain = SearchService._extract_action_domain(action)
-                        if domain:
-                            action_domain_counts[domain] = (
-                                action_domain_counts.get(domain, 0) + 1
-                            )
-
-            # Sort by count and limit
-            action_domain_facets = sorted(
-                action_domain_counts.items(), key=lambda x: x[1], reverse=True
-            )[:20]
-
-            # Get action facets (excluding current action filter)
-            action_query = base_query
-            if repo_filter and "/" in repo_filter:
-                owner, name = repo_filter.split("/", 1)
-                action_query = action_query.filter(
-                    Repository.owner == owner, Repository.name == name
-                )
-            if blueprint_filter:
-                action_query = action_query.filter(
-                    Automation.blueprint_path == blueprint_filter
-                )
-            if trigger_filter:
-                action_query = action_query.filter(
-                    SearchService._exact_match_in_comma_list(
-                        Automation.trigger_types, trigger_filter
-                    )
+            def top_values(facet: str, value: Any, lookup: Any = None) -> Any:
+                """Count the 20 most frequent values of a facet column."""
+                facet_query = select(
+                    literal(facet).label("facet"),
+                    value.label("value"),
+                    null().label("name"),
+                    null().label("stars"),
+                    count.label("count"),
                 )
-            if action_domain_filter:
-                escape_char = "\\"
-                escaped_domain = SearchService._escape_like(
-                    action_domain_filter, escape_char=escape_char
-                )
-                action_query = action_query.filter(
-                    or_(
-                        Automation.action_calls.like(
-                            f"{escaped_domain}.%", escape=escape_char
-                        ),
-                        Automation.action_calls.like(
-                            f"%,{escaped_domain}.%", escape=escape_char
-                        ),
+                if lookup is not None:
+                    facet_query = facet_query.join_from(
+                        matching, lookup, lookup.c.automation_id == m.id
                     )
+                return (
+                    facet_query.where(value.isnot(None), *other_filters(facet))
+                    .group_by(value)
+                    .order_by(count.desc())
+                    .limit(20)
+                    .subquery()
                 )
 
-            # Get all action calls and aggregate
-            all_actions = (
-                action_query.filter(Automation.action_calls.isnot(None))
-                .with_entities(Automation.action_calls)
-                .all()
+            repo_facets = (
+                select(
+                    literal("repositories").label("facet"),
+                    m.owner.label("value"),
+                    m.name.label("name"),
+                    func.max(m.stars).label("stars"),
+                    count.label("count"),
+                )
+                .where(*other_filters("repositories"))
+                .group_by(m.owner, m.name)
+                .order_by(count.desc())
+                .limit(20)
+                .subquery()
             )
-
-            # Parse comma-separated action calls and count
-            action_counts: Dict[str, int] = {}
-            for (action_str,) in all_actions:
-                if action_str:
-                    for action in action_str.split(","):
-                        action = action.strip()
-                        if action:
-                            action_counts[action] = action_counts.get(action, 0) + 1
-
-            # Sort by count and limit
-            action_facets = sorted(
-                action_counts.items(), key=lambda x: x[1], reverse=True
-            )[:20]
+            facet_queries = [
+                repo_facets,
+                top_values("blueprints", m.blueprint_path),
+                top_values("triggers", triggers.c.trigger_type, triggers),
+                top_values("action_domains", action_calls.c.domain, action_calls),
+                top_values("actions", action_calls.c.action_call, action_calls),
+            ]
+            rows = db.execute(
+                union_all(*(select(facet_query) for facet_query in facet_queries))
+            ).all()
+
+            facets: Dict[str, List[Any]] = {
+                "repositories": [],
+                "blueprints": [],
+                "triggers": [],
+                "action_domains": [],
+                "actions": [],
+            }
+            for facet, value, name, stars, facet_count in rows:
+                facets[facet].append((value, name, stars, facet_count))
+            for values in facets.values():
+                # Union members are not guaranteed to keep their own ordering
+                values.sort(key=lambda x: x[3], reverse=True)
 
             return {
                 "repositories": [
                     {"owner": owner, "name": name, "stars": stars or 0, "count": count}
-                    for owner, name, stars, count in repo_facets
+                    for owner, name, stars, count in facets["repositories"]
                 ],
                 "blueprints": [
-                    {"path": path, "count": count} for path, count in blueprint_facets
+                    {"path": path, "count": count}
+                    for path, _, _, count in facets["blueprints"]
                 ],
                 "triggers": [
                     {"type": trigger, "count": count}
-                    for trigger, count in trigger_facets
+                    for trigger, _, _, count in facets["triggers"]
                 ],
                 "action_domains": [
                     {"domain": domain, "count": count}
-                    for domain, count in action_domain_facets
+                    for domain, _, _, count in facets["action_domains"]
                 ],
                 "actions": [
-                    {"call": action, "count": count} for action, count in action_facets
+                    {"call": action, "count": count}
+                    for action, _, _, count in facets["actions"]
                 ],
             }
 
@@ -9,5 +9,6 @@ if [ "$1" = "index-now" ]; then
 	exec python -m app.cli index-now
 else
 	echo "Starting web server..."
-	exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+	# Single worker: the scheduler and response cache live in-process
+	exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools --workers 1
 fi
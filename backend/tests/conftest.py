@@ -48,6 +48,15 @@ action:
 """
 
 
+@pytest.fixture(autouse=True)
+def wait_for_manual_indexing():
+    """Let indexing runs queued by a test finish before the next test starts."""
+    yield
+    from app.api import routes
+
+    routes.indexing_executor.submit(lambda: None).result(timeout=30)
+
+
 @pytest.fixture
 def test_db():
     """Create a test database."""
@@ -1,5 +1,7 @@
 """Tests for API endpoints."""
 
+from unittest.mock import patch
+
 from app.main import app
 from fastapi.testclient import TestClient
 
@@ -10,6 +12,7 @@ def test_health_endpoint():
     response = client.get("/api/v1/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+    assert response.headers["content-type"] == "application/json"
 
 
 def test_root_endpoint():
@@ -119,3 +122,263 @@ def test_statistics_includes_star_count():
     assert "last_indexed_at" in data
     assert "repo_star_count" in data
     assert isinstance(data["repo_star_count"], int)
+
+
+def test_search_endpoint_streaming():
+    """Test that streamed search responses have the buffered structure."""
+    client = TestClient(app)
+    rows = [{"id": 1, "alias": "One"}, {"id": 2, "alias": "Two"}]
+
+    with (
+        patch("app.api.routes.SearchService.iter_automations", return_value=iter(rows)),
+        patch("app.api.routes.SearchService.count_automations", return_value=2),
+    ):
+        response = client.get("/api/v1/search?q=stream&stream=true")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "etag" not in response.headers
+    data = response.json()
+    assert data["query"] == "stream"
+    assert data["results"] == rows
+    assert data["count"] == 2
+    assert data["total"] == 2
+    assert data["page"] == 1
+    assert "facets" in data
+
+
+def test_search_endpoint_matches_response_schema(test_db):
+    """Test that the unvalidated search body still matches SearchResponse."""
+    from app.api.routes import SearchResponse
+    from app.models.database import Automation, Repository
+    from app.services.cache import response_cache
+    from app.services.search_service import SearchService
+
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+    test_db.add(
+        Automation(
+            alias="Schema Check",
+            trigger_types="state",
+            action_calls="light.turn_on",
+            source_file_path="automations.yaml",
+            github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+            repository_id=repo.id,
+        )
+    )
+    test_db.commit()
+    results, total = SearchService.search_automations(test_db, "schema")
+
+    response_cache.clear()
+    client = TestClient(app)
+    with patch(
+        "app.api.routes.SearchService.search_automations",
+        return_value=(results, total),
+    ):
+        response = client.get("/api/v1/search?q=schema")
+
+    assert response.status_code == 200
+    parsed = SearchResponse.model_validate(response.json())
+    assert parsed.model_dump(mode="json") == response.json()
+    assert parsed.results[0].repository.stars == 0
+
+
+def test_search_endpoint_uses_session_per_query():
+    """Test that results and facets each run on their own session."""
+    from app.models import get_session_factory
+    from app.models.database import Automation, Base, Repository
+    from app.services.cache import response_cache
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        repo = Repository(
+            name="test-repo",
+            owner="testuser",
+            url="https://github.com/testuser/test-repo",
+        )
+        db.add(repo)
+        db.commit()
+        db.add(
+            Automation(
+                alias="Concurrent Search",
+                trigger_types="state",
+                source_file_path="automations.yaml",
+                github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+                repository_id=repo.id,
+            )
+        )
+        db.commit()
+
+    sessions = []
+
+    def tracking_factory():
+        session = factory()
+        sessions.append(session)
+        return session
+
+    response_cache.clear()
+    app.dependency_overrides[get_session_factory] = lambda: tracking_factory
+    try:
+        response = TestClient(app).get("/api/v1/search?q=concurrent")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["facets"]["triggers"] == [{"type": "state", "count": 1}]
+    assert len(sessions) == 2
+    assert sessions[0] is not sessions[1]
+
+
+def test_index_endpoint_runs_on_indexing_thread():
+    """Test that manual indexing runs off the event loop on its own thread."""
+    import os
+    import threading
+
+    import app.api.routes as routes_module
+
+    threads = []
+
+    async def index_repositories(db):
+        threads.append(threading.current_thread().name)
+
+    routes_module.indexing_rate_limiter.reset()
+    try:
+        with (
+            patch.dict(os.environ, {"ENVIRONMENT": "development"}),
+            patch("app.api.routes.IndexingService") as mock_indexer_class,
+        ):
+            mock_indexer_class.return_value.index_repositories.side_effect = (
+                index_repositories
+            )
+            response = TestClient(app).post("/api/v1/index")
+            # Wait for the queued run to finish
+            routes_module.indexing_executor.submit(lambda: None).result(timeout=5)
+    finally:
+        routes_module.indexing_rate_limiter.reset()
+
+    assert response.status_code == 200
+    assert len(threads) == 1
+    assert threads[0].startswith("indexing")
+
+
+def test_responses_are_gzip_compressed():
+    """Test that large responses are gzip-compressed and small ones are not."""
+    client = TestClient(app)
+
+    large = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.json()["info"]["title"] == "hadiscover API"
+
+    small = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_search_endpoint_rejects_invalid_cursor():
+    """Test that a malformed cursor yields 400 Bad Request."""
+    client = TestClient(app)
+    response = client.get("/api/v1/search?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_search_endpoint_returns_next_cursor():
+    """Test that a full page carries a cursor for the following page."""
+    from app.services.cache import response_cache
+    from app.services.search_service import SearchService
+
+    rows = [
+        {"id": 20 - i, "alias": f"Row {i}", "indexed_at": "2025-01-01T00:00:00"}
+        for i in range(10)
+    ]
+    response_cache.clear()
+    client = TestClient(app)
+    with patch(
+        "app.api.routes.SearchService.search_automations", return_value=(rows, 30)
+    ):
+        response = client.get("/api/v1/search?q=cursor&per_page=10")
+
+    next_cursor = response.json()["next_cursor"]
+    assert SearchService.decode_cursor(next_cursor)[1] == 11
+
+    with patch(
+        "app.api.routes.SearchService.search_automations", return_value=(rows, 30)
+    ) as mock_search:
+        client.get(f"/api/v1/search?q=cursor&per_page=10&cursor={next_cursor}")
+    assert mock_search.call_args.kwargs["cursor"] == SearchService.decode_cursor(
+        next_cursor
+    )
+
+
+def test_cors_allows_conditional_requests():
+    """Test that browsers may send If-None-Match and read the ETag."""
+    client = TestClient(app)
+
+    preflight = client.options(
+        "/api/v1/search",
+        headers={
+            "Origin": "https://hadiscover.com",
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "if-none-match",
+        },
+    )
+    assert preflight.status_code == 200
+    assert "If-None-Match" in preflight.headers["access-control-allow-headers"]
+
+    response = client.get(
+        "/api/v1/statistics", headers={"Origin": "https://hadiscover.com"}
+    )
+    assert response.headers["access-control-expose-headers"] == "ETag"
+
+
+def test_security_headers_on_all_responses():
+    """Test that security headers are set on regular and streamed responses."""
+    client = TestClient(app)
+
+    for response in (
+        client.get("/api/v1/health"),
+        client.get("/api/v1/search?stream=true"),
+        client.get("/api/v1/does-not-exist"),
+    ):
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert response.headers["x-frame-options"] == "DENY"
+        assert (
+            response.headers["strict-transport-security"]
+            == "max-age=31536000; includeSubDomains"
+        )
+
+
+def test_cors_preflight_is_cacheable():
+    """Test that preflight responses let browsers cache them for a while."""
+    from app.main import CORS_PREFLIGHT_MAX_AGE_SECONDS
+
+    client = TestClient(app)
+
+    preflight = client.options(
+        "/api/v1/search",
+        headers={
+            "Origin": "https://hadiscover.com",
+            "Access-Control-Request-Method": "GET",
+        },
+    )
+
+    assert preflight.status_code == 200
+    assert preflight.headers["access-control-max-age"] == str(
+        CORS_PREFLIGHT_MAX_AGE_SECONDS
+    )
+    assert preflight.headers["access-control-allow-methods"] != "*"
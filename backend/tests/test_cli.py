@@ -1,12 +1,15 @@
 """Tests for CLI commands."""
 
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import AsyncMock, patch
 
 import pytest
-from app.cli import get_db_session, main, run_indexing
-from app.models import Base
-from sqlalchemy import create_engine
+from app.cli import close_db_engines, get_db_session, main, run_indexing
+from app.models import Base, create_db_engine
+from app.models.database import Repository
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 
@@ -145,23 +148,159 @@ def test_main_index_now_command():
 
 def test_get_db_session_default():
     """Test database session creation with default URL."""
-    with patch.dict(os.environ, {}, clear=True):
-        with patch("app.cli.create_engine") as mock_engine:
-            get_db_session()
-            mock_engine.assert_called_once_with(
-                "sqlite:///./data/hadiscover.db",
-                connect_args={"check_same_thread": False},
-            )
+    with (
+        patch.dict(os.environ, {}, clear=True),
+        patch.dict("app.cli._session_factories", clear=True),
+        patch("app.cli.get_engine") as mock_engine,
+    ):
+        get_db_session()
+        mock_engine.assert_called_once_with("sqlite:///./data/hadiscover.db")
 
 
 def test_get_db_session_custom_url():
     """Test database session creation with custom URL."""
-    with patch.dict(os.environ, {"DATABASE_URL": "sqlite:///custom.db"}):
-        with patch("app.cli.create_engine") as mock_engine:
-            get_db_session()
-            mock_engine.assert_called_once_with(
-                "sqlite:///custom.db", connect_args={"check_same_thread": False}
+    with (
+        patch.dict(os.environ, {"DATABASE_URL": "sqlite:///custom.db"}),
+        patch.dict("app.cli._session_factories", clear=True),
+        patch("app.cli.get_engine") as mock_engine,
+    ):
+        get_db_session()
+        mock_engine.assert_called_once_with("sqlite:///custom.db")
+
+
+def test_get_db_session_reuses_engine():
+    """Test that repeated sessions share one engine per database URL."""
+    with (
+        patch.dict(os.environ, {"DATABASE_URL": "sqlite:///custom.db"}),
+        patch.dict("app.cli._session_factories", clear=True),
+        patch("app.cli.get_engine") as mock_engine,
+        patch("app.cli.Base.metadata.create_all") as mock_create_all,
+    ):
+        get_db_session()
+        get_db_session()
+        mock_engine.assert_called_once()
+        mock_create_all.assert_called_once()
+
+
+def test_get_db_session_uses_wal(tmp_path):
+    """Test that file databases run in WAL mode and are checkpointed on close."""
+    db_path = tmp_path / "hadiscover.db"
+
+    with (
+        patch.dict(os.environ, {"DATABASE_URL": f"sqlite:///{db_path}"}),
+        patch.dict("app.cli._session_factories", clear=True),
+    ):
+        db = get_db_session()
+        assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        db.add(Repository(name="repo", owner="owner", url="https://github.com/o/r"))
+        db.commit()
+        db.close()
+
+        close_db_engines()
+
+        from app import cli
+
+        assert cli._session_factories == {}
+
+    wal_path = tmp_path / "hadiscover.db-wal"
+    assert not wal_path.exists() or wal_path.stat().st_size == 0
+    connection = sqlite3.connect(db_path)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM repositories").fetchone() == (
+            1,
+        )
+    finally:
+        connection.close()
+
+
+def test_get_db_session_adds_missing_columns(tmp_path):
+    """Test that databases created by older versions gain newer columns."""
+    db_path = tmp_path / "hadiscover.db"
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "CREATE TABLE repositories (id INTEGER PRIMARY KEY, name VARCHAR,"
+        " owner VARCHAR, description TEXT, url VARCHAR UNIQUE, stars INTEGER,"
+        " indexed_at DATETIME)"
+    )
+    connection.commit()
+    connection.close()
+
+    with (
+        patch.dict(os.environ, {"DATABASE_URL": f"sqlite:///{db_path}"}),
+        patch.dict("app.cli._session_factories", clear=True),
+    ):
+        db = get_db_session()
+        columns = [
+            row[1] for row in db.execute(text("PRAGMA table_info(repositories)"))
+        ]
+        db.close()
+        close_db_engines()
+
+    assert "pushed_at" in columns
+
+
+def test_file_engine_applies_sqlite_pragmas(tmp_path):
+    """Test that file-backed engines tune every new connection."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'hadiscover.db'}")
+    try:
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            # MEMORY
+            assert connection.execute(text("PRAGMA temp_store")).scalar() == 2
+            assert (
+                connection.execute(text("PRAGMA journal_size_limit")).scalar()
+                == 67108864
+            )
+    finally:
+        engine.dispose()
+
+
+def test_memory_engine_shares_database_across_threads():
+    """Test that worker threads see the same in-memory database."""
+    engine = create_db_engine("sqlite:///:memory:")
+    try:
+        Base.metadata.create_all(engine)
+
+        def count_repositories():
+            with engine.connect() as connection:
+                return connection.execute(
+                    text("SELECT COUNT(*) FROM repositories")
+                ).scalar()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(count_repositories).result() == 0
+    finally:
+        engine.dispose()
+
+
+def test_get_db_session_adds_missing_indexes(tmp_path):
+    """Test that databases from older versions gain newer model indexes."""
+    db_path = tmp_path / "hadiscover.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_automations_indexed_at_id")
+    engine.dispose()
+
+    with (
+        patch.dict(os.environ, {"DATABASE_URL": f"sqlite:///{db_path}"}),
+        patch.dict("app.cli._session_factories", clear=True),
+    ):
+        db = get_db_session()
+        index_names = {
+            row[0]
+            for row in db.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
             )
+        }
+        db.close()
+        close_db_engines()
+
+    assert "ix_automations_indexed_at_id" in index_names
+    assert "ix_automations_repository_id_source_file_path" in index_names
+    assert "ix_repositories_owner_name" in index_names
 
 
 def test_standalone_index_now_script():
@@ -1,8 +1,10 @@
 """Tests for DISABLE_SCHEDULER environment variable configuration."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import app.main
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -33,6 +35,7 @@ def test_scheduler_enabled_by_default(monkeypatch):
     monkeypatch.delenv("DISABLE_SCHEDULER", raising=False)
 
     mock_scheduler = MagicMock()
+    mock_scheduler.indexer.aclose = AsyncMock()
 
     # Patch SchedulerService where it's used (in app.main namespace)
     with patch(
@@ -47,3 +50,57 @@ def test_scheduler_enabled_by_default(monkeypatch):
             # SchedulerService SHOULD have been started
             mock_cls.assert_called_once()
             mock_scheduler.start.assert_called_once()
+
+        # The scheduler's GitHub client is closed on shutdown
+        mock_scheduler.indexer.aclose.assert_awaited_once()
+
+
+def test_scheduler_shares_the_api_engine(monkeypatch):
+    """Test that the scheduler reuses the API engine for the same database."""
+    from app.models import DATABASE_URL, engine
+    from app.services.scheduler import SchedulerService
+
+    monkeypatch.setenv("DATABASE_URL", DATABASE_URL)
+
+    service = SchedulerService()
+
+    assert service.engine is engine
+
+
+def test_startup_builds_openapi_schema(monkeypatch):
+    """Test that the OpenAPI schema is generated before the first request."""
+    monkeypatch.setenv("DISABLE_SCHEDULER", "true")
+    app.main.app.openapi_schema = None
+
+    with TestClient(app.main.app):
+        assert app.main.app.openapi_schema is not None
+
+
+def test_next_top_of_hour():
+    """Test that scheduled runs fall on the next top of the hour."""
+    from datetime import datetime
+
+    from app.services.scheduler import SchedulerService
+
+    assert SchedulerService._next_top_of_hour(
+        datetime(2026, 5, 8, 12, 30, 15)
+    ) == datetime(2026, 5, 8, 13, 0)
+    assert SchedulerService._next_top_of_hour(datetime(2026, 5, 8, 23, 0)) == datetime(
+        2026, 5, 9, 0, 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_scheduler_task_cancelled_on_shutdown():
+    """Test that start schedules the hourly loop and shutdown cancels it."""
+    from app.services.scheduler import SchedulerService
+
+    service = SchedulerService()
+    service.start()
+    task = service._task
+    assert task is not None and not task.done()
+
+    service.shutdown()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert service._task is None
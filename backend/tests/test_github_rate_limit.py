@@ -1,9 +1,26 @@
 """Tests for GitHub API rate limit handling."""
 
+import os
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
-from app.services.github_service import GitHubRateLimitError, GitHubService
+from app.services.github_service import (
+    RAW_MEDIA_TYPE,
+    GitHubRateLimitError,
+    GitHubService,
+    _RateLimiter,
+)
+
+
+@pytest.fixture(autouse=True)
+def retry_sleep():
+    """Skip the real backoff delays between rate limited attempts."""
+    with patch(
+        "app.services.github_service.asyncio.sleep", new_callable=AsyncMock
+    ) as mock_sleep:
+        yield mock_sleep
 
 
 @pytest.mark.asyncio
@@ -88,7 +105,7 @@ async def test_find_automation_files_rate_limit():
     with patch("httpx.AsyncClient") as mock_client_class:
         mock_client = AsyncMock()
         mock_client.__aenter__.return_value = mock_client
-        mock_client.get.return_value = mock_response
+        mock_client.head.return_value = mock_response
         mock_client_class.return_value = mock_client
 
         with pytest.raises(GitHubRateLimitError) as exc_info:
@@ -96,3 +113,559 @@ async def test_find_automation_files_rate_limit():
 
         assert "rate limit exceeded" in str(exc_info.value).lower()
         assert exc_info.value.retry_after == 30
+
+
+@pytest.mark.asyncio
+async def test_requests_share_one_client():
+    """Test that API calls reuse one HTTP client until it is closed."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 404
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.is_closed = False
+        mock_client.get.return_value = mock_response
+        mock_client.head.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        await service.find_automation_files("owner", "repo")
+        await service.get_file_content("owner", "repo", "automations.yaml")
+
+        mock_client_class.assert_called_once()
+        assert mock_client_class.call_args.kwargs["http2"] is True
+        assert mock_client.head.call_count == 6
+        assert mock_client.get.call_count == 1
+
+        await service.aclose()
+
+        mock_client.aclose.assert_awaited_once()
+        assert service._client is None
+
+
+@pytest.mark.asyncio
+async def test_find_automation_files_probes_paths_concurrently():
+    """Test that all candidate paths are probed and found paths keep their order."""
+    service = GitHubService()
+
+    async def mock_head(url, params=None):
+        response = MagicMock()
+        found = ("contents/automations.yaml", "contents/config/automations.yml")
+        response.status_code = 200 if url.endswith(found) else 404
+        return response
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.head.side_effect = mock_head
+        mock_client_class.return_value = mock_client
+
+        found = await service.find_automation_files("owner", "repo")
+
+    assert mock_client.head.call_count == 6
+    assert found == ["automations.yaml", "config/automations.yml"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_file_sends_etag_and_detects_unchanged():
+    """Test that a known ETag is sent and a 304 is reported as unchanged."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 304
+    mock_response.text = ""
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        fetched = await service.fetch_file(
+            "owner", "repo", "automations.yaml", etag='"abc"'
+        )
+
+    assert mock_client.get.call_args.kwargs["headers"] == {
+        "Accept": RAW_MEDIA_TYPE,
+        "If-None-Match": '"abc"',
+    }
+    assert fetched.unchanged is True
+    assert fetched.content is None
+    assert fetched.etag == '"abc"'
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_retry_after_from_reset_header():
+    """Test that the quota reset time is used when Retry-After is missing."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 403
+    mock_response.text = "API rate limit exceeded"
+    mock_response.headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1090"}
+
+    with (
+        patch("httpx.AsyncClient") as mock_client_class,
+        patch("app.services.github_service.time.time", return_value=1000.0),
+    ):
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        with pytest.raises(GitHubRateLimitError) as exc_info:
+            await service.search_repositories()
+
+    assert exc_info.value.retry_after == 90
+
+
+@pytest.mark.asyncio
+async def test_fetch_file_requests_raw_content():
+    """Test that file bodies are requested raw and returned as text."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = ""
+    mock_response.headers = {"ETag": '"v1"'}
+    mock_response.content = b'- alias: "Morning Lights"\n'
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        fetched = await service.fetch_file("owner", "repo", "automations.yaml")
+
+    assert mock_client.get.call_args.kwargs["headers"] == {"Accept": RAW_MEDIA_TYPE}
+    assert fetched.content == b'- alias: "Morning Lights"\n'
+    assert fetched.etag == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_fetch_file_falls_back_to_base64_content():
+    """Test that a refused raw media type falls back to decoding base64 JSON."""
+    service = GitHubService()
+
+    unsupported = MagicMock()
+    unsupported.status_code = 415
+    unsupported.text = "Unsupported Media Type"
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = ""
+    mock_response.headers = {"ETag": '"v1"'}
+    # GitHub wraps the encoded content with newlines
+    mock_response.content = b'{"content": "LSBhbGlhczogIk1vcm5pbmcg\\nTGlnaHRzIgo=\\n"}'
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = [unsupported, mock_response]
+        mock_client_class.return_value = mock_client
+
+        fetched = await service.fetch_file("owner", "repo", "automations.yaml")
+
+    assert mock_client.get.call_args.kwargs["headers"] == {
+        "Accept": GitHubService().headers["Accept"]
+    }
+    assert fetched.content == b'- alias: "Morning Lights"\n'
+    assert fetched.etag == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_search_repositories_parses_items():
+    """Test that search results of both topics are parsed from one query."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = ""
+    mock_response.links = {}
+    mock_response.content = (
+        b'{"items": [{"name": "ha-config", "owner": {"login": "octocat"},'
+        b' "description": null, "html_url": "https://github.com/octocat/ha-config",'
+        b' "default_branch": "master", "stargazers_count": 5,'
+        b' "pushed_at": "2024-05-01T12:30:00Z"}]}'
+    )
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        repositories = await service.search_repositories()
+
+    mock_client.get.assert_awaited_once()
+    assert (
+        mock_client.get.call_args.kwargs["params"]["q"]
+        == "topic:hadiscover OR topic:ha-discover"
+    )
+    assert repositories == [
+        {
+            "name": "ha-config",
+            "owner": "octocat",
+            "description": None,
+            "url": "https://github.com/octocat/ha-config",
+            "default_branch": "master",
+            "stars": 5,
+            "pushed_at": datetime(2024, 5, 1, 12, 30),
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_service_is_an_async_context_manager():
+    """Test that the shared client is opened on entry and closed on exit."""
+    service = GitHubService()
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.is_closed = False
+        mock_client_class.return_value = mock_client
+
+        async with service as entered:
+            assert entered is service
+            assert service._client is mock_client
+
+    mock_client.aclose.assert_awaited_once()
+    assert service._client is None
+
+
+@pytest.mark.asyncio
+async def test_find_automation_files_detects_rate_limit_from_headers():
+    """Test that a bodiless 403 HEAD response is recognised as a rate limit."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 403
+    mock_response.text = ""
+    mock_response.headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.head.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        with pytest.raises(GitHubRateLimitError):
+            await service.find_automation_files("owner", "repo")
+
+    mock_client.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_list_automation_files_filters_tree():
+    """Test that one tree listing finds automation files in any directory."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = ""
+    mock_response.content = (
+        b'{"truncated": false, "tree": ['
+        b'{"path": "automations.yaml", "type": "blob", "sha": "a1"},'
+        b'{"path": "packages", "type": "tree", "sha": "t1"},'
+        b'{"path": "packages/lights/Automations.yml", "type": "blob", "sha": "b2"},'
+        b'{"path": "scripts.yaml", "type": "blob", "sha": "c3"},'
+        b'{"path": "old_automations.yaml", "type": "blob", "sha": "d4"}]}'
+    )
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        found = await service.list_automation_files("owner", "repo", "main")
+
+    mock_client.get.assert_called_once()
+    assert mock_client.get.call_args.args[0].endswith("/git/trees/main")
+    mock_client.head.assert_not_called()
+    assert found == {"automations.yaml": "a1", "packages/lights/Automations.yml": "b2"}
+
+
+@pytest.mark.asyncio
+async def test_list_automation_files_probes_when_truncated():
+    """Test that a truncated tree falls back to probing the common paths."""
+    service = GitHubService()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = ""
+    mock_response.content = b'{"truncated": true, "tree": []}'
+
+    with (
+        patch.object(
+            service, "find_automation_files", return_value=["automations.yaml"]
+        ) as mock_probe,
+        patch("httpx.AsyncClient") as mock_client_class,
+    ):
+        mock_client = AsyncMock()
+        mock_client.get.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        found = await service.list_automation_files("owner", "repo", "main")
+
+    mock_probe.assert_awaited_once_with("owner", "repo", "main")
+    assert found == {"automations.yaml": None}
+
+
+def _limiter_response(status_code=200, remaining=None, reset=None):
+    """Build a response carrying rate limit headers."""
+    headers = {}
+    if remaining is not None:
+        headers["X-RateLimit-Remaining"] = str(remaining)
+    if reset is not None:
+        headers["X-RateLimit-Reset"] = str(reset)
+    return httpx.Response(status_code, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_halves_concurrency_on_throttling():
+    """Test that throttling halves the concurrency limit and successes grow it."""
+    limiter = _RateLimiter(max_concurrency=8)
+
+    await limiter.acquire()
+    await limiter.release(_limiter_response(429))
+    assert limiter.concurrency == 4
+
+    await limiter.acquire()
+    await limiter.release(_limiter_response(403, remaining=0))
+    assert limiter.concurrency == 2
+
+    await limiter.acquire()
+    await limiter.release(_limiter_response(200))
+    assert limiter.concurrency == 2.5
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_enforces_requests_per_minute():
+    """Test that requests beyond the per-minute cap wait for the window."""
+    limiter = _RateLimiter(requests_per_minute=2)
+
+    with (
+        patch("app.services.github_service.time.monotonic", return_value=100.0),
+        patch("app.services.github_service.asyncio.sleep") as mock_sleep,
+    ):
+        mock_sleep.side_effect = lambda seconds: limiter._sent_at.popleft()
+        for _ in range(3):
+            await limiter.acquire()
+            await limiter.release(None)
+
+    mock_sleep.assert_called_once_with(60.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pauses_until_quota_reset():
+    """Test that a nearly exhausted quota pauses requests until the reset."""
+    limiter = _RateLimiter(min_remaining=10, max_wait=60)
+
+    with (
+        patch("app.services.github_service.time.time", return_value=1000.0),
+        patch("app.services.github_service.asyncio.sleep") as mock_sleep,
+    ):
+        await limiter.acquire()
+        await limiter.release(_limiter_response(200, remaining=5, reset=1030))
+        await limiter.acquire()
+        await limiter.release(_limiter_response(200, remaining=4, reset=5000))
+        await limiter.acquire()
+        await limiter.release(None)
+
+    # The far-off reset is left to the rate limit error instead of waiting
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [30.0, 30.0]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_frees_slot_when_cancelled_while_waiting():
+    """Test that a request cancelled inside acquire gives its slot back."""
+    import asyncio
+
+    limiter = _RateLimiter(max_concurrency=1)
+    limiter._paused_until = float("inf")
+    waiting = asyncio.Event()
+
+    async def hang(seconds):
+        waiting.set()
+        await asyncio.Event().wait()
+
+    with patch("app.services.github_service.asyncio.sleep", side_effect=hang):
+        task = asyncio.create_task(limiter.acquire())
+        await waiting.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert limiter._in_flight == 0
+    limiter._paused_until = 0.0
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+    assert limiter._in_flight == 1
+
+
+def _rate_limited_response(retry_after=None):
+    """Build a 429 response, optionally with a Retry-After header."""
+    headers = {} if retry_after is None else {"Retry-After": retry_after}
+    return httpx.Response(429, headers=headers, text="rate limit exceeded")
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried(retry_sleep):
+    """Test that a 429 is retried after its Retry-After and then succeeds."""
+    service = GitHubService()
+    request = httpx.Request("GET", GitHubService.BASE_URL)
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = [
+            _rate_limited_response("2"),
+            httpx.Response(200, content=b'{"items": []}', request=request),
+        ]
+        mock_client_class.return_value = mock_client
+
+        repositories = await service.search_repositories()
+
+    assert repositories == []
+    assert mock_client.get.call_count == 2
+    retry_sleep.assert_awaited_once()
+    assert 2 <= retry_sleep.call_args.args[0] < 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_stops_at_attempt_cap(retry_sleep):
+    """Test that retries back off exponentially and give up at the cap."""
+    from app.services.github_service import MAX_REQUEST_ATTEMPTS
+
+    service = GitHubService()
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = lambda *args, **kwargs: _rate_limited_response()
+        mock_client_class.return_value = mock_client
+
+        with pytest.raises(GitHubRateLimitError):
+            await service.get_file_content("owner", "repo", "automations.yaml")
+
+    assert mock_client.get.call_count == MAX_REQUEST_ATTEMPTS
+    delays = [call.args[0] for call in retry_sleep.call_args_list]
+    assert len(delays) == MAX_REQUEST_ATTEMPTS - 1
+    for attempt, delay in enumerate(delays):
+        assert 2**attempt <= delay < 2**attempt + 1
+
+
+@pytest.mark.asyncio
+async def test_long_retry_after_is_not_waited_for(retry_sleep):
+    """Test that a Retry-After beyond the in-process limit aborts at once."""
+    service = GitHubService()
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.return_value = _rate_limited_response("600")
+        mock_client_class.return_value = mock_client
+
+        with pytest.raises(GitHubRateLimitError) as exc_info:
+            await service.get_file_content("owner", "repo", "automations.yaml")
+
+    assert exc_info.value.retry_after == 600
+    mock_client.get.assert_called_once()
+    retry_sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_http_date_is_parsed():
+    """Test that an HTTP-date Retry-After is converted to seconds."""
+    response = _rate_limited_response("Thu, 01 Jan 1970 00:02:00 GMT")
+
+    with patch("app.services.github_service.time.time", return_value=60.0):
+        assert GitHubService._retry_after_seconds(response) == 60
+
+
+@pytest.mark.asyncio
+async def test_search_repositories_fetches_remaining_pages_concurrently():
+    """Test that pages after the first are requested together by number."""
+    service = GitHubService()
+    request = httpx.Request("GET", GitHubService.BASE_URL)
+    next_link = {"Link": f'<{GitHubService.BASE_URL}/search?page=2>; rel="next"'}
+
+    def page_response(name, headers=None):
+        return httpx.Response(
+            200,
+            content=(
+                b'{"total_count": 3, "items": [{"name": "%s", "owner":'
+                b' {"login": "octocat"}, "html_url": "https://github.com/octocat/%s"}]}'
+            )
+            % (name.encode(), name.encode()),
+            headers=headers,
+            request=request,
+        )
+
+    responses = {
+        1: page_response("one", next_link),
+        2: page_response("two", next_link),
+        3: page_response("three"),
+    }
+
+    async def mock_get(url, params=None):
+        return responses[params["page"]]
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = mock_get
+        mock_client_class.return_value = mock_client
+
+        repositories = await service.search_repositories(per_page=1)
+
+    assert [repo["name"] for repo in repositories] == ["one", "two", "three"]
+    assert mock_client.get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_search_repositories_per_topic_flag_deduplicates():
+    """Test that the per-topic search flag searches each topic separately."""
+    request = httpx.Request("GET", GitHubService.BASE_URL)
+    response = httpx.Response(
+        200,
+        content=(
+            b'{"total_count": 1, "items": [{"name": "ha-config", "owner":'
+            b' {"login": "octocat"}, "html_url": "https://github.com/octocat/ha-config"}]}'
+        ),
+        request=request,
+    )
+
+    with (
+        patch.dict(os.environ, {"GITHUB_SEARCH_PER_TOPIC": "true"}),
+        patch("httpx.AsyncClient") as mock_client_class,
+    ):
+        service = GitHubService()
+        mock_client = AsyncMock()
+        mock_client.get.return_value = response
+        mock_client_class.return_value = mock_client
+
+        repositories = await service.search_repositories()
+
+    # Both topics return the same repository, which is only listed once
+    assert [call.kwargs["params"]["q"] for call in mock_client.get.call_args_list] == [
+        "topic:hadiscover",
+        "topic:ha-discover",
+    ]
+    assert [repo["name"] for repo in repositories] == ["ha-config"]
+
+
+@pytest.mark.asyncio
+async def test_search_repositories_caps_pages_at_result_limit():
+    """Test that no page beyond GitHub's 1000 result limit is requested."""
+    service = GitHubService()
+    request = httpx.Request("GET", GitHubService.BASE_URL)
+
+    async def mock_get(url, params=None):
+        return httpx.Response(
+            200,
+            content=b'{"total_count": 5000, "items": []}',
+            headers={"Link": '<https://api.github.com/next>; rel="next"'},
+            request=request,
+        )
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = mock_get
+        mock_client_class.return_value = mock_client
+
+        await service.search_repositories(per_page=100)
+
+    pages = sorted(
+        call.kwargs["params"]["page"] for call in mock_client.get.call_args_list
+    )
+    assert pages == list(range(1, 11))
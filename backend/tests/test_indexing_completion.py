@@ -92,7 +92,7 @@ async def test_indexing_halts_on_repository_rate_limit(test_db):
         service.github_service, "search_repositories", return_value=mock_repos
     ):
         with patch.object(
-            service.github_service, "find_automation_files", side_effect=mock_error
+            service.github_service, "list_automation_files", side_effect=mock_error
         ):
             stats = await service.index_repositories(test_db)
 
@@ -158,3 +158,52 @@ def test_statistics_returns_none_when_no_timestamp(test_db):
 
     assert "last_indexed_at" in stats
     assert stats["last_indexed_at"] is None
+
+
+@pytest.mark.asyncio
+async def test_indexing_stores_default_facets(test_db):
+    """Test that indexing precomputes the unfiltered facets."""
+    from app.models.database import Automation, Repository
+
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+    test_db.add(
+        Automation(
+            alias="Facet",
+            trigger_types="state",
+            action_calls="light.turn_on",
+            source_file_path="automations.yaml",
+            github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+            repository_id=repo.id,
+        )
+    )
+    test_db.commit()
+
+    service = IndexingService()
+    with (
+        patch.object(service.github_service, "search_repositories", return_value=[]),
+        patch.object(service, "_store_repo_star_count"),
+    ):
+        await service.index_repositories(test_db)
+
+    metadata = test_db.query(IndexingMetadata).filter_by(key="default_facets").first()
+    assert metadata is not None
+
+    # Unfiltered facets are served from the stored copy
+    with patch.object(SearchService, "compute_facets") as mock_compute:
+        facets = SearchService.get_facets(test_db)
+        mock_compute.assert_not_called()
+    assert facets == SearchService.compute_facets(test_db)
+    assert facets["triggers"] == [{"type": "state", "count": 1}]
+
+    # Filtered facets are still computed from the automations
+    with patch.object(
+        SearchService, "compute_facets", wraps=SearchService.compute_facets
+    ) as mock_compute:
+        SearchService.get_facets(test_db, trigger_filter="state")
+        mock_compute.assert_called_once()
@@ -1,5 +1,8 @@
 """Tests for automation parser."""
 
+import sys
+from unittest.mock import patch
+
 from app.services.parser import AutomationParser
 from tests.conftest import SAMPLE_AUTOMATION_SINGLE, SAMPLE_AUTOMATION_YAML
 
@@ -53,6 +56,62 @@ def test_parse_invalid_yaml():
     assert len(automations) == 0
 
 
+def test_parse_skips_files_without_automation_markers():
+    """Test that files without trigger or blueprint keys are not parsed."""
+    parser = AutomationParser()
+    script = b'- alias: "Only a script"\n  sequence:\n    - service: light.turn_on\n'
+
+    with patch("app.services.parser._Loader") as mock_loader:
+        assert parser.parse_automation_file(script) == []
+    mock_loader.assert_not_called()
+
+    automations = parser.parse_automation_file(script, prescan=False)
+    assert [a["alias"] for a in automations] == ["Only a script"]
+
+
+def test_parse_multi_document_yaml():
+    """Test that every document of a multi-document file is parsed."""
+    parser = AutomationParser()
+    content = """---
+- alias: "First"
+  trigger:
+    - platform: state
+---
+alias: "Single"
+trigger:
+  platform: sun
+---
+automation:
+  - alias: "Second"
+    trigger:
+      - platform: time
+"""
+    automations = parser.parse_automation_file(content)
+
+    assert [a["alias"] for a in automations] == ["First", "Single", "Second"]
+    assert automations[0]["start_line"] == 2
+    assert automations[1]["trigger_types"] == ["sun"]
+    assert automations[2]["trigger_types"] == ["time"]
+    assert automations[2]["start_line"] == 11
+
+
+def test_parse_undecoded_bytes():
+    """Test that UTF-8 bytes parse like the decoded text."""
+    parser = AutomationParser()
+    content = SAMPLE_AUTOMATION_YAML.replace("Daily Backup", "Tägliche Sicherung ☀")
+
+    assert parser.parse_automation_file(
+        content.encode("utf-8")
+    ) == parser.parse_automation_file(content)
+
+
+def test_parse_bytes_that_are_not_utf8():
+    """Test that undecodable bytes are reported as invalid YAML."""
+    parser = AutomationParser()
+
+    assert parser.parse_automation_file(b"- alias: \xff\xfe\xfd") == []
+
+
 def test_parse_automation_without_alias():
     """Test parsing automation without alias."""
     yaml_without_alias = """
@@ -119,6 +178,14 @@ def test_extract_trigger_types_with_list():
     assert "time" in result
 
 
+def test_extract_trigger_types_skips_non_string_types():
+    """Test that trigger types which are not strings are ignored."""
+    triggers = [{"platform": ["state"]}, {"trigger": "time"}, {"platform": 5}]
+    result = AutomationParser._extract_trigger_types(triggers)
+
+    assert result == ["time"]
+
+
 def test_parse_blueprint_automation():
     """Test parsing automation that uses a blueprint."""
     yaml_with_blueprint = """
@@ -135,7 +202,8 @@ use_blueprint:
     assert len(automations) == 1
     assert automations[0]["alias"] == "Blueprint Based Automation"
     assert automations[0]["blueprint_path"] == "homeassistant/motion_light.yaml"
-    assert automations[0]["blueprint_input"] is not None
+    # The input is not indexed, so it is not carried along
+    assert "blueprint_input" not in automations[0]
 
 
 def test_extract_action_calls():
@@ -197,6 +265,24 @@ action:
     assert "notify.notify" in automations[0]["action_calls"]
 
 
+def test_extract_deeply_nested_action_calls():
+    """Test that nesting deeper than the recursion limit is still walked."""
+    action = {"service": "notify.notify"}
+    for _ in range(sys.getrecursionlimit() + 100):
+        action = {"if": [], "then": [action], "else": {"service": "light.turn_off"}}
+
+    action_calls = AutomationParser._extract_action_calls([action])
+
+    assert sorted(action_calls) == ["light.turn_off", "notify.notify"]
+
+
+def test_extract_action_calls_skips_non_string_services():
+    """Test that service values which are not strings are ignored."""
+    actions = [{"service": {"template": "x"}}, {"action": "light.turn_on"}]
+
+    assert AutomationParser._extract_action_calls(actions) == ["light.turn_on"]
+
+
 def test_parse_automation_with_line_numbers():
     """Test that line numbers are extracted from automations."""
     parser = AutomationParser()
@@ -250,6 +336,28 @@ def test_parse_automation_line_numbers_accuracy():
     assert automations[1]["end_line"] == 12
 
 
+def test_parse_automation_with_anchors_keeps_line_numbers():
+    """Test that aliased values are constructed from the composed tree."""
+    yaml_content = """- alias: "First Automation"
+  trigger: &motion
+    platform: state
+  action:
+    service: light.turn_on
+- alias: "Second Automation"
+  trigger: *motion
+  action:
+    service: light.turn_off
+"""
+    parser = AutomationParser()
+    automations = parser.parse_automation_file(yaml_content)
+
+    assert [a["trigger_types"] for a in automations] == [["state"], ["state"]]
+    assert [(a["start_line"], a["end_line"]) for a in automations] == [
+        (1, 5),
+        (6, 9),
+    ]
+
+
 def test_parse_automation_line_numbers_with_blank_lines():
     """Test that line numbers handle blank lines between automations."""
     # Create a YAML with blank lines (some files have this style)
@@ -1,12 +1,22 @@
 """Tests for database consistency when rate limiting occurs during indexing."""
 
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
 from unittest.mock import patch
 
 import pytest
-from app.models.database import Automation, Base, Repository
-from app.services.github_service import GitHubRateLimitError
-from app.services.indexer import IndexingService
-from sqlalchemy import create_engine, func
+from app.models.database import (
+    Automation,
+    AutomationActionCall,
+    AutomationTrigger,
+    Base,
+    IndexingMetadata,
+    Repository,
+)
+from app.services.github_service import FetchedFile, GitHubRateLimitError
+from app.services.indexer import FILE_FETCH_CONCURRENCY, IndexingService
+from sqlalchemy import create_engine, event, func
 from sqlalchemy.orm import sessionmaker
 
 
@@ -100,7 +110,7 @@ async def test_rate_limit_during_indexing_keeps_accurate_counts(test_db):
         service.github_service, "search_repositories", return_value=mock_repos
     ):
         with patch.object(
-            service.github_service, "find_automation_files", side_effect=mock_error
+            service.github_service, "list_automation_files", side_effect=mock_error
         ):
             stats = await service.index_repositories(test_db)
 
@@ -144,11 +154,11 @@ async def test_rate_limit_on_file_content_fetch(test_db):
     ):
         with patch.object(
             service.github_service,
-            "find_automation_files",
-            return_value=["automations.yaml"],
+            "list_automation_files",
+            return_value={"automations.yaml": None},
         ):
             with patch.object(
-                service.github_service, "get_file_content", side_effect=mock_error
+                service.github_service, "fetch_file", side_effect=mock_error
             ):
                 stats = await service.index_repositories(test_db)
 
@@ -165,3 +175,567 @@ async def test_rate_limit_on_file_content_fetch(test_db):
                 assert (
                     automation_count == 0
                 ), "Database should have 0 automations when rate limited during file fetch"
+
+
+def _add_existing_repo(test_db, automation_count):
+    """Add an indexed repository with some automations."""
+    repo = Repository(
+        name="repo",
+        owner="test",
+        description="Test repo",
+        url="https://github.com/test/repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+    for i in range(automation_count):
+        test_db.add(
+            Automation(
+                alias=f"Old Automation {i}",
+                trigger_types="state",
+                source_file_path="automations.yaml",
+                github_url="https://github.com/test/repo/blob/main/automations.yaml",
+                repository_id=repo.id,
+            )
+        )
+    test_db.commit()
+    return repo
+
+
+REINDEX_REPOS = [
+    {
+        "owner": "test",
+        "name": "repo",
+        "description": "Test repo",
+        "url": "https://github.com/test/repo",
+        "default_branch": "main",
+    }
+]
+
+REINDEX_YAML = b"""
+- alias: "New Automation"
+  trigger:
+    - platform: time
+  action:
+    - service: light.turn_on
+- alias: "Another Automation"
+  trigger:
+    - platform: state
+"""
+
+
+@pytest.mark.asyncio
+async def test_reindex_replaces_existing_automations(test_db):
+    """Test that re-indexing a repository replaces its automations in bulk."""
+    _add_existing_repo(test_db, 3)
+    service = IndexingService()
+
+    with (
+        patch.object(
+            service.github_service, "search_repositories", return_value=REINDEX_REPOS
+        ),
+        patch.object(
+            service.github_service,
+            "list_automation_files",
+            return_value={"automations.yaml": None},
+        ),
+        patch.object(
+            service.github_service,
+            "fetch_file",
+            return_value=FetchedFile(content=REINDEX_YAML, etag='"v2"'),
+        ),
+        patch.object(service, "_store_repo_star_count"),
+    ):
+        stats = await service.index_repositories(test_db)
+
+    assert stats["automations_indexed"] == 2
+    automations = test_db.query(Automation).order_by(Automation.id).all()
+    assert [a.alias for a in automations] == ["New Automation", "Another Automation"]
+    assert automations[0].trigger_types == "time"
+    assert automations[0].action_calls == "light.turn_on"
+    assert automations[0].indexed_at is not None
+    # Rows inserted for one repository share the batch timestamp
+    assert automations[1].indexed_at == automations[0].indexed_at
+    # Bulk inserted rows get lookups; the replaced rows lose theirs
+    triggers = test_db.query(AutomationTrigger).order_by(AutomationTrigger.trigger_type)
+    assert [(t.automation_id, t.trigger_type) for t in triggers] == [
+        (automations[1].id, "state"),
+        (automations[0].id, "time"),
+    ]
+    assert test_db.query(AutomationActionCall).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_during_reindex_keeps_existing_automations(test_db):
+    """Test that a rate limit during re-indexing rolls back the bulk delete."""
+    _add_existing_repo(test_db, 3)
+    service = IndexingService()
+
+    mock_error = GitHubRateLimitError("Rate limit exceeded", retry_after=60)
+    with (
+        patch.object(
+            service.github_service, "search_repositories", return_value=REINDEX_REPOS
+        ),
+        patch.object(
+            service.github_service, "list_automation_files", side_effect=mock_error
+        ),
+    ):
+        stats = await service.index_repositories(test_db)
+
+    assert stats["rate_limited"] is True
+    assert test_db.query(func.count(Automation.id)).scalar() == 3
+
+
+def _index_patches(service, fetched):
+    """Patch GitHub discovery to return one file with the given fetch result."""
+    return (
+        patch.object(
+            service.github_service, "search_repositories", return_value=REINDEX_REPOS
+        ),
+        patch.object(
+            service.github_service,
+            "list_automation_files",
+            return_value={"automations.yaml": None},
+        ),
+        patch.object(service.github_service, "fetch_file", return_value=fetched),
+        patch.object(service, "_store_repo_star_count"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_reindex_keeps_automations_of_unchanged_files(test_db):
+    """Test that a 304 for a file keeps its automations without re-parsing."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with search, find, fetch, stars:
+        await service.index_repositories(test_db)
+
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=None, etag='"v1"', unchanged=True)
+    )
+    with search, find, fetch as mock_fetch, stars:
+        stats = await service.index_repositories(test_db)
+
+    assert mock_fetch.call_args.kwargs["etag"] == '"v1"'
+    assert stats["automations_indexed"] == 2
+    automations = test_db.query(Automation).order_by(Automation.id).all()
+    assert [a.alias for a in automations] == ["New Automation", "Another Automation"]
+
+
+@pytest.mark.asyncio
+async def test_reindex_drops_etag_of_unfetched_files(test_db):
+    """Test that a file that could not be fetched loses its stored ETag."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with search, find, fetch, stars:
+        await service.index_repositories(test_db)
+
+    etag_key = "etag:https://github.com/test/repo/blob/main/automations.yaml"
+    assert test_db.query(IndexingMetadata).filter_by(key=etag_key).one().value == (
+        '"v1"'
+    )
+
+    search, find, fetch, stars = _index_patches(service, FetchedFile(content=None))
+    with search, find, fetch, stars:
+        await service.index_repositories(test_db)
+
+    assert test_db.query(func.count(Automation.id)).scalar() == 0
+    assert test_db.query(IndexingMetadata).filter_by(key=etag_key).first() is None
+
+
+@pytest.mark.asyncio
+async def test_automations_inserted_in_one_statement(test_db):
+    """Test that a repository's automations go out as one batched INSERT."""
+    from sqlalchemy import event
+
+    content = "".join(
+        f'- alias: "Automation {i}"\n  trigger:\n    - platform: state\n'
+        for i in range(50)
+    )
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=content.encode(), etag='"v1"')
+    )
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with search, find, fetch, stars:
+            stats = await service.index_repositories(test_db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert stats["automations_indexed"] == 50
+    inserts = [s for s in statements if s.startswith("INSERT INTO automations ")]
+    assert len(inserts) == 1
+    assert test_db.query(func.count(AutomationTrigger.automation_id)).scalar() == 50
+
+
+@pytest.mark.asyncio
+async def test_repositories_are_indexed_concurrently(test_db):
+    """Test that repositories are fetched concurrently up to the limit."""
+    from app.services.indexer import INDEX_CONCURRENCY
+
+    repos = [
+        {
+            "owner": "test",
+            "name": f"repo{i}",
+            "description": "",
+            "url": f"https://github.com/test/repo{i}",
+            "default_branch": "main",
+        }
+        for i in range(INDEX_CONCURRENCY + 4)
+    ]
+    in_flight = 0
+    max_in_flight = 0
+
+    async def list_files(owner, name, branch):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"automations.yaml": None}
+
+    service = IndexingService()
+    with (
+        patch.object(service.github_service, "search_repositories", return_value=repos),
+        patch.object(
+            service.github_service, "list_automation_files", side_effect=list_files
+        ),
+        patch.object(
+            service.github_service,
+            "fetch_file",
+            return_value=FetchedFile(content=REINDEX_YAML),
+        ),
+        patch.object(service, "_store_repo_star_count"),
+    ):
+        stats = await service.index_repositories(test_db)
+
+    assert max_in_flight == INDEX_CONCURRENCY
+    assert stats["repositories_indexed"] == len(repos)
+    assert stats["automations_indexed"] == 2 * len(repos)
+    # Each repository's rows were written in one piece under its own ID
+    for repo in test_db.query(Repository):
+        assert {a.github_url for a in repo.automations} == {
+            f"{repo.url}/blob/main/automations.yaml"
+        }
+        assert len(repo.automations) == 2
+
+
+@pytest.mark.asyncio
+async def test_repository_files_are_fetched_concurrently(test_db):
+    """Test that a repository's files are fetched concurrently up to the cap."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fetch_file(owner, name, path, branch, etag=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return FetchedFile(content=REINDEX_YAML.replace(b"Automation", path.encode()))
+
+    service = IndexingService()
+    paths = ["automations.yaml"] + [
+        f"packages/{i}/automations.yaml" for i in range(FILE_FETCH_CONCURRENCY + 2)
+    ]
+    with (
+        patch.object(
+            service.github_service, "search_repositories", return_value=REINDEX_REPOS
+        ),
+        patch.object(
+            service.github_service,
+            "list_automation_files",
+            return_value=dict.fromkeys(paths),
+        ),
+        patch.object(service.github_service, "fetch_file", side_effect=fetch_file),
+        patch.object(service, "_store_repo_star_count"),
+    ):
+        stats = await service.index_repositories(test_db)
+
+    assert max_in_flight == FILE_FETCH_CONCURRENCY
+    assert stats["automations_indexed"] == 2 * len(paths)
+    automations = test_db.query(Automation).order_by(Automation.id).all()
+    assert [a.source_file_path for a in automations] == [
+        path for path in paths for _ in range(2)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fully_unchanged_repository_skips_rewrites(test_db):
+    """Test that a repository whose files all answer 304 is not rewritten."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with search, find, fetch, stars:
+        await service.index_repositories(test_db)
+
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=None, etag='"v1"', unchanged=True)
+    )
+    with (
+        search,
+        find,
+        fetch,
+        stars,
+        patch.object(service, "_replace_file_automations") as mock_replace,
+        patch.object(service, "_store_file_metadata") as mock_store_etags,
+    ):
+        stats = await service.index_repositories(test_db)
+
+    mock_replace.assert_not_called()
+    mock_store_etags.assert_not_called()
+    assert stats["automations_indexed"] == 2
+
+
+PUSHED_REPOS = [{**REINDEX_REPOS[0], "stars": 7, "pushed_at": datetime(2024, 5, 1)}]
+
+
+@pytest.mark.asyncio
+async def test_unpushed_repository_skips_github_calls(test_db):
+    """Test that a repository not pushed since its last index is not fetched."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with search, find, fetch, stars:
+        await service.index_repositories(test_db)
+    repository = test_db.query(Repository).one()
+    assert repository.pushed_at is None
+
+    # The first run with pushed_at stores it, the second one skips the fetch
+    for _ in range(2):
+        search, find, fetch, stars = _index_patches(
+            service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+        )
+        with (
+            patch.object(
+                service.github_service, "search_repositories", return_value=PUSHED_REPOS
+            ),
+            find as mock_find,
+            fetch,
+            stars,
+        ):
+            stats = await service.index_repositories(test_db)
+
+    mock_find.assert_not_called()
+    assert stats["repositories_indexed"] == 1
+    assert stats["automations_indexed"] == 2
+    test_db.refresh(repository)
+    assert repository.pushed_at == datetime(2024, 5, 1)
+    assert repository.stars == 7
+
+
+@pytest.mark.asyncio
+async def test_incomplete_index_does_not_store_pushed_at(test_db):
+    """Test that a file that could not be fetched keeps the repository refetched."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=None, etag=None)
+    )
+    with (
+        patch.object(
+            service.github_service, "search_repositories", return_value=PUSHED_REPOS
+        ),
+        find,
+        fetch,
+        stars,
+    ):
+        await service.index_repositories(test_db)
+
+    assert test_db.query(Repository).one().pushed_at is None
+
+
+@pytest.mark.asyncio
+async def test_automation_files_are_parsed_in_worker_processes(test_db):
+    """Test that YAML parsing runs in worker processes during a run."""
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with (
+        search,
+        find,
+        fetch,
+        stars,
+        patch.object(
+            service.parser, "parse_automation_file", side_effect=AssertionError
+        ),
+    ):
+        stats = await service.index_repositories(test_db)
+
+    assert stats["automations_indexed"] == 2
+    # The workers only live for the run
+    assert service._parse_pool is None
+
+
+@pytest.mark.asyncio
+async def test_existing_repositories_are_looked_up_in_one_query(test_db):
+    """Test that a run looks up its stored repositories with a single query."""
+    _add_existing_repo(test_db, 1)
+    repos = [
+        REINDEX_REPOS[0],
+        {**REINDEX_REPOS[0], "name": "other", "url": "https://github.com/test/other"},
+    ]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    event.listen(test_db.get_bind(), "before_cursor_execute", record)
+    try:
+        with (
+            patch.object(
+                service.github_service, "search_repositories", return_value=repos
+            ),
+            find,
+            fetch,
+            stars,
+        ):
+            stats = await service.index_repositories(test_db)
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", record)
+
+    assert stats["repositories_indexed"] == 2
+    assert test_db.query(Repository).count() == 2
+    lookups = [s for s in statements if s.startswith("SELECT repositories.url")]
+    assert len(lookups) == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_run_is_resumed_by_the_next_run(test_db):
+    """Test that a run resumes after the repositories a rate limited run processed."""
+    repos = [
+        {**REINDEX_REPOS[0], "name": name, "url": f"https://github.com/test/{name}"}
+        for name in ["d", "c", "b", "a"]
+    ]
+    listed = []
+    rate_limited = True
+
+    async def list_files(owner, name, branch):
+        listed.append(name)
+        if name == "c" and rate_limited:
+            raise GitHubRateLimitError("rate limited")
+        return {"automations.yaml": None}
+
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with (
+        patch.object(service.github_service, "search_repositories", return_value=repos),
+        patch.object(
+            service.github_service, "list_automation_files", side_effect=list_files
+        ),
+        fetch,
+        stars,
+    ):
+        stats = await service.index_repositories(test_db)
+        assert stats["rate_limited"] is True
+        cursor = test_db.query(IndexingMetadata).filter_by(key="index_resume_cursor")
+        assert cursor.one().value == "https://github.com/test/b"
+
+        listed.clear()
+        rate_limited = False
+        stats = await service.index_repositories(test_db)
+
+    assert stats["rate_limited"] is False
+    assert stats["repositories_resumed"] == 2
+    assert sorted(listed) == ["c", "d"]
+    assert cursor.count() == 0
+
+
+@pytest.mark.asyncio
+async def test_files_with_unchanged_blob_sha_are_not_fetched(test_db):
+    """Test that files whose tree blob SHA is unchanged are not requested."""
+    service = IndexingService()
+    paths = {"automations.yaml": "a1", "packages/automations.yaml": "b1"}
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with (
+        search,
+        patch.object(
+            service.github_service, "list_automation_files", return_value=paths
+        ),
+        fetch,
+        stars,
+    ):
+        await service.index_repositories(test_db)
+
+    paths["packages/automations.yaml"] = "b2"
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v2"')
+    )
+    with (
+        search,
+        patch.object(
+            service.github_service, "list_automation_files", return_value=paths
+        ),
+        fetch as mock_fetch,
+        stars,
+    ):
+        stats = await service.index_repositories(test_db)
+
+    # Only the file whose blob changed is fetched; both keep their rows
+    assert [call.args[2] for call in mock_fetch.call_args_list] == [
+        "packages/automations.yaml"
+    ]
+    assert stats["automations_indexed"] == 4
+    shas = test_db.query(IndexingMetadata).filter(
+        IndexingMetadata.key.startswith("sha:")
+    )
+    assert sorted(row.value for row in shas) == ["a1", "b2"]
+
+
+@pytest.mark.asyncio
+async def test_files_shared_by_repositories_are_parsed_once(test_db):
+    """Test that a blob listed by several repositories is parsed once per run."""
+    repos = [
+        REINDEX_REPOS[0],
+        {**REINDEX_REPOS[0], "name": "fork", "url": "https://github.com/test/fork"},
+    ]
+
+    @asynccontextmanager
+    async def inline_parsing():
+        yield
+
+    service = IndexingService()
+    search, find, fetch, stars = _index_patches(
+        service, FetchedFile(content=REINDEX_YAML, etag='"v1"')
+    )
+    with (
+        patch.object(service.github_service, "search_repositories", return_value=repos),
+        patch.object(
+            service.github_service,
+            "list_automation_files",
+            return_value={"automations.yaml": "a1"},
+        ),
+        fetch,
+        stars,
+        patch.object(service, "_parsing_workers", inline_parsing),
+        patch.object(
+            service.parser,
+            "parse_automation_file",
+            wraps=service.parser.parse_automation_file,
+        ) as mock_parse,
+    ):
+        stats = await service.index_repositories(test_db)
+
+    mock_parse.assert_called_once()
+    assert stats["automations_indexed"] == 4
@@ -25,7 +25,7 @@ def test_index_rate_limiting():
         client = TestClient(test_app)
 
         # Reset the rate limit state
-        routes_module.last_indexing_time = None
+        routes_module.indexing_rate_limiter.reset()
 
         # First request should succeed
         response1 = client.post("/api/v1/index")
@@ -41,13 +41,15 @@ def test_index_rate_limiting():
         assert "wait" in data2["detail"].lower()
 
         # Reset for other tests
-        routes_module.last_indexing_time = None
+        routes_module.indexing_rate_limiter.reset()
     finally:
         # Restore original environment
         if original_env is not None:
             os.environ["ENVIRONMENT"] = original_env
         elif "ENVIRONMENT" in os.environ:
             del os.environ["ENVIRONMENT"]
+        # Let the queued indexing run finish before its executor is replaced
+        routes_module.indexing_executor.submit(lambda: None).result(timeout=30)
         importlib.reload(routes_module)
 
 
@@ -71,7 +73,7 @@ def test_index_rate_limit_message():
         client = TestClient(test_app)
 
         # Reset the rate limit state
-        routes_module.last_indexing_time = None
+        routes_module.indexing_rate_limiter.reset()
 
         # Trigger first request
         response1 = client.post("/api/v1/index")
@@ -87,11 +89,32 @@ def test_index_rate_limit_message():
         assert "s" in data["detail"]  # seconds
 
         # Reset for other tests
-        routes_module.last_indexing_time = None
+        routes_module.indexing_rate_limiter.reset()
     finally:
         # Restore original environment
         if original_env is not None:
             os.environ["ENVIRONMENT"] = original_env
         elif "ENVIRONMENT" in os.environ:
             del os.environ["ENVIRONMENT"]
+        # Let the queued indexing run finish before its executor is replaced
+        routes_module.indexing_executor.submit(lambda: None).result(timeout=30)
         importlib.reload(routes_module)
+
+
+def test_rate_limiter_allows_run_after_cooldown():
+    """Test that the limiter only allows one run per cooldown window."""
+    from unittest.mock import patch
+
+    from app.api.routes import IndexingRateLimiter
+
+    limiter = IndexingRateLimiter(600)
+
+    with patch("app.api.routes.time.monotonic") as mock_monotonic:
+        mock_monotonic.return_value = 1000.0
+        assert limiter.try_acquire() is None
+
+        mock_monotonic.return_value = 1240.0
+        assert limiter.try_acquire() == 360.0
+
+        mock_monotonic.return_value = 1600.0
+        assert limiter.try_acquire() is None
@@ -0,0 +1,305 @@
+"""Tests for API response caching."""
+
+import gzip
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.main import app
+from app.services.cache import ResponseCache, accepts_gzip, response_cache
+from fastapi.testclient import TestClient
+
+
+def test_cache_set_and_get():
+    """Test that stored bodies are returned with a stable ETag."""
+    cache = ResponseCache()
+    key = cache.make_key("light", 1, 15, None)
+
+    cached = cache.set("search", key, b'{"query":"light"}')
+
+    assert cache.get("search", key) == cached
+    assert cached.etag == cache.make_etag(b'{"query":"light"}')
+    assert cached.etag.startswith('W/"')
+
+
+def test_cache_keys_are_namespaced():
+    """Test that the same key in another namespace is a miss."""
+    cache = ResponseCache()
+    cache.set("search", "key", b"{}")
+
+    assert cache.get("statistics", "key") is None
+
+
+def test_cache_entries_expire():
+    """Test that entries are dropped once their TTL has passed."""
+    cache = ResponseCache(ttl=60)
+
+    with patch("app.services.cache.time.monotonic", return_value=100.0):
+        cache.set("search", "key", b"{}")
+    with patch("app.services.cache.time.monotonic", return_value=159.0):
+        assert cache.get("search", "key") is not None
+    with patch("app.services.cache.time.monotonic", return_value=161.0):
+        assert cache.get("search", "key") is None
+
+
+def test_cache_evicts_oldest_when_full():
+    """Test that the oldest entry is evicted when maxsize is reached."""
+    cache = ResponseCache(maxsize=2)
+    cache.set("search", "a", b"a")
+    cache.set("search", "b", b"b")
+    cache.set("search", "c", b"c")
+
+    assert cache.get("search", "a") is None
+    assert cache.get("search", "b") is not None
+    assert cache.get("search", "c") is not None
+
+
+def test_cache_clear_namespace():
+    """Test that clearing a namespace leaves other namespaces intact."""
+    cache = ResponseCache()
+    cache.set("search", "key", b"{}")
+    cache.set("statistics", "", b"{}")
+
+    cache.clear_namespace("search")
+
+    assert cache.get("search", "key") is None
+    assert cache.get("statistics", "") is not None
+
+
+def test_search_endpoint_sets_cache_headers():
+    """Test that search responses carry ETag and Cache-Control headers."""
+    response_cache.clear()
+    client = TestClient(app)
+
+    response = client.get("/api/v1/search?q=cache-headers")
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('W/"')
+    assert "max-age" in response.headers["cache-control"]
+    assert response.json()["query"] == "cache-headers"
+
+
+def test_search_endpoint_returns_304_for_matching_etag():
+    """Test that a matching If-None-Match header yields 304 Not Modified."""
+    response_cache.clear()
+    client = TestClient(app)
+
+    first = client.get("/api/v1/search?q=etag")
+    etag = first.headers["etag"]
+
+    with patch("app.api.routes.SearchService.search_automations") as mock_search:
+        second = client.get("/api/v1/search?q=etag", headers={"If-None-Match": etag})
+        mock_search.assert_not_called()
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_search_pages_share_cached_facets():
+    """Test that facets are computed once for all pages and streamed responses."""
+    response_cache.clear()
+    client = TestClient(app)
+
+    first = client.get("/api/v1/search?q=facet-pages")
+
+    with patch("app.api.routes.SearchService.get_facets") as mock_facets:
+        second = client.get("/api/v1/search?q=facet-pages&page=2")
+        streamed = client.get("/api/v1/search?q=facet-pages&stream=true")
+        mock_facets.assert_not_called()
+
+    assert second.json()["facets"] == first.json()["facets"]
+    assert streamed.json()["facets"] == first.json()["facets"]
+
+
+def test_statistics_endpoint_is_cached():
+    """Test that repeated statistics requests are served from the cache."""
+    response_cache.clear()
+    client = TestClient(app)
+
+    first = client.get("/api/v1/statistics")
+
+    with patch("app.api.routes.SearchService.get_statistics") as mock_stats:
+        second = client.get("/api/v1/statistics")
+        mock_stats.assert_not_called()
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_cache_entry_ttl_override():
+    """Test that a per-entry TTL overrides the cache-wide TTL."""
+    cache = ResponseCache(ttl=60)
+
+    with patch("app.services.cache.time.monotonic", return_value=100.0):
+        cache.set("statistics", "", b"{}", ttl=300)
+    with patch("app.services.cache.time.monotonic", return_value=399.0):
+        assert cache.get("statistics", "") is not None
+    with patch("app.services.cache.time.monotonic", return_value=401.0):
+        assert cache.get("statistics", "") is None
+
+
+def test_statistics_endpoint_cache_control():
+    """Test that statistics responses advertise the longer statistics TTL."""
+    from app.api.routes import STATISTICS_CACHE_TTL_SECONDS
+
+    response_cache.clear()
+    client = TestClient(app)
+
+    response = client.get("/api/v1/statistics")
+
+    assert (
+        response.headers["cache-control"]
+        == f"public, max-age={STATISTICS_CACHE_TTL_SECONDS}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_scheduled_indexing_clears_cache():
+    """Test that a scheduled indexing run invalidates cached responses."""
+    from app.services.scheduler import SchedulerService
+
+    response_cache.set("statistics", "", b"{}")
+    service = SchedulerService()
+    service.indexer = AsyncMock()
+    service.indexer.index_repositories.return_value = {}
+
+    with patch.object(service, "_get_db"):
+        await service.run_indexing_task()
+
+    assert response_cache.get("statistics", "") is None
+
+
+def test_warm_up_caches_primes_statistics(test_db):
+    """Test that the startup warm-up caches the statistics response."""
+    from app.api.routes import warm_up_caches
+
+    response_cache.clear()
+
+    warm_up_caches(lambda: test_db)
+
+    cached = response_cache.get("statistics", "")
+    assert cached is not None
+    assert b'"total_repositories":0' in cached.body
+    response_cache.clear()
+
+
+def test_warm_up_caches_primes_default_search(test_db):
+    """Test that the first default search after warm-up is a cache hit."""
+    from app.api.routes import warm_up_caches
+
+    response_cache.clear()
+    warm_up_caches(lambda: test_db)
+    client = TestClient(app)
+
+    with (
+        patch("app.api.routes.SearchService.search_automations") as mock_search,
+        patch("app.api.routes.SearchService.get_facets") as mock_facets,
+    ):
+        response = client.get("/api/v1/search")
+        client.get("/api/v1/search?stream=true")
+        mock_search.assert_not_called()
+        mock_facets.assert_not_called()
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+    assert response.json()["per_page"] == 15
+    response_cache.clear()
+
+
+def test_statistics_cache_hit_skips_database_session():
+    """Test that cached statistics are served without opening a session."""
+    from app.models import get_session_factory
+
+    response_cache.clear()
+    client = TestClient(app)
+    client.get("/api/v1/statistics")
+
+    def failing_factory():
+        raise AssertionError("cache hit opened a database session")
+
+    app.dependency_overrides[get_session_factory] = lambda: failing_factory
+    try:
+        response = client.get("/api/v1/statistics")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+
+
+def test_cache_precompresses_large_bodies():
+    """Test that large bodies are stored with a gzip copy and small ones are not."""
+    from app.services.cache import GZIP_MINIMUM_SIZE
+
+    cache = ResponseCache()
+    large_body = b'{"results":[' + b'"automation",' * GZIP_MINIMUM_SIZE + b'""]}'
+
+    large = cache.set("search", "large", large_body)
+    small = cache.set("search", "small", b"{}")
+
+    assert gzip.decompress(large.gzip_body) == large_body
+    assert small.gzip_body is None
+
+
+def test_cached_response_served_precompressed():
+    """Test that gzip clients receive the stored compressed body as-is."""
+    response_cache.clear()
+    body = b'{"total_repositories":1,"padding":"' + b"x" * 1000 + b'"}'
+    cached = response_cache.set("statistics", "", body)
+    client = TestClient(app)
+
+    try:
+        with client.stream(
+            "GET", "/api/v1/statistics", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+        identity = client.get(
+            "/api/v1/statistics", headers={"Accept-Encoding": "identity"}
+        )
+    finally:
+        response_cache.clear()
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert raw == cached.gzip_body
+    assert "content-encoding" not in identity.headers
+    assert identity.content == body
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, False),
+        ("gzip", True),
+        ("br, GZIP;q=0.5", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, *", False),
+        ("x-gzip", False),
+        ("identity, *;q=0.1", True),
+        ("*;q=0", False),
+    ],
+)
+def test_accepts_gzip_parses_q_values(header, expected):
+    """Test that gzip is only chosen when accepted with a q-value above 0."""
+    assert accepts_gzip(header) is expected
+
+
+def test_gzip_refused_with_zero_q_value():
+    """Test that clients sending gzip;q=0 get an uncompressed body."""
+    response_cache.clear()
+    body = b'{"total_repositories":1,"padding":"' + b"x" * 1000 + b'"}'
+    response_cache.set("statistics", "", body)
+    client = TestClient(app)
+
+    try:
+        with client.stream(
+            "GET", "/api/v1/statistics", headers={"Accept-Encoding": "gzip;q=0"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+        schema = client.get("/openapi.json", headers={"Accept-Encoding": "gzip;q=0"})
+    finally:
+        response_cache.clear()
+
+    assert "content-encoding" not in response.headers
+    assert raw == body
+    assert "content-encoding" not in schema.headers
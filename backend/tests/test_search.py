@@ -1,6 +1,12 @@
 """Tests for search service."""
 
-from app.models.database import Automation, Repository
+import pytest
+from app.models.database import (
+    Automation,
+    AutomationActionCall,
+    AutomationTrigger,
+    Repository,
+)
 from app.services.search_service import SearchService
 
 
@@ -1078,3 +1084,328 @@ def test_action_domain_filter_with_wildcards(test_db):
     )
     assert len(results) == 1
     assert results[0]["alias"] == "Underscore domain"
+
+
+def test_iter_automations_matches_search(test_db):
+    """Test that streamed results match the buffered search page."""
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        description="Test repository",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+
+    for i in range(12):
+        test_db.add(
+            Automation(
+                alias=f"Light {i}",
+                description="Controls a light",
+                trigger_types="state",
+                action_calls="light.turn_on",
+                source_file_path="automations.yaml",
+                github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+                repository_id=repo.id,
+            )
+        )
+    test_db.commit()
+
+    results, total = SearchService.search_automations(
+        test_db, "light", page=2, per_page=10
+    )
+    streamed = list(
+        SearchService.iter_automations(test_db, "light", page=2, per_page=10)
+    )
+
+    assert streamed == results
+    assert len(streamed) == 2
+    assert SearchService.count_automations(test_db, "light") == total == 12
+
+
+def _add_light_automation(test_db, alias="Hallway Light"):
+    """Add a repository with one automation for full-text search tests."""
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+    automation = Automation(
+        alias=alias,
+        description="Turns on the hallway light",
+        trigger_types="state",
+        action_calls="light.turn_on",
+        source_file_path="automations.yaml",
+        github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+        repository_id=repo.id,
+    )
+    test_db.add(automation)
+    test_db.commit()
+    return automation
+
+
+def test_full_text_index_tracks_changes(test_db):
+    """Test that the full-text index follows inserts, updates and deletes."""
+    automation = _add_light_automation(test_db)
+
+    assert SearchService._has_search_index(test_db)
+    assert SearchService.search_automations(test_db, "hallway")[1] == 1
+
+    automation.alias = "Porch Lamp"
+    automation.description = "Turns on the porch lamp"
+    test_db.commit()
+    assert SearchService.search_automations(test_db, "hallway")[1] == 0
+    assert SearchService.search_automations(test_db, "porch")[1] == 1
+
+    test_db.delete(automation)
+    test_db.commit()
+    assert SearchService.search_automations(test_db, "porch")[1] == 0
+
+
+def test_full_text_search_treats_query_literally(test_db):
+    """Test that FTS5 syntax in a query is matched as plain text."""
+    _add_light_automation(test_db, alias='Light "OR" NOT sensor*')
+
+    _, total = SearchService.search_automations(test_db, '"OR" NOT')
+    assert total == 1
+    assert SearchService.search_automations(test_db, "sensor* x")[1] == 0
+
+
+def test_short_query_falls_back_to_like(test_db):
+    """Test that queries too short for trigrams still match substrings."""
+    _add_light_automation(test_db)
+
+    results, total = SearchService.search_automations(test_db, "ha")
+    assert total == 1
+    assert results[0]["alias"] == "Hallway Light"
+
+
+def test_facets_run_text_search_once(test_db):
+    """Test that all facets for a query come from one text search."""
+    from sqlalchemy import event
+
+    _add_light_automation(test_db)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        facets = SearchService.get_facets(test_db, "hallway")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert sum("MATCH" in statement for statement in statements) == 1
+    assert facets["repositories"] == [
+        {"owner": "testuser", "name": "test-repo", "stars": 0, "count": 1}
+    ]
+    assert facets["triggers"] == [{"type": "state", "count": 1}]
+    assert facets["action_domains"] == [{"domain": "light", "count": 1}]
+    assert facets["actions"] == [{"call": "light.turn_on", "count": 1}]
+
+
+def test_text_search_does_not_query_schema(test_db):
+    """Test that searches reuse the recorded full-text index availability."""
+    from sqlalchemy import event
+
+    _add_light_automation(test_db)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert SearchService.search_automations(test_db, "hallway")[1] == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert not any("sqlite_master" in statement for statement in statements)
+
+
+def test_search_index_built_for_existing_database(test_db):
+    """Test that an existing database gains a populated full-text index."""
+    from app.models.database import (
+        _search_index_engines,
+        ensure_automation_search_index,
+    )
+    from sqlalchemy import text
+
+    _add_light_automation(test_db)
+    connection = test_db.connection()
+    connection.execute(text("DROP TABLE automations_fts"))
+    for suffix in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER automations_fts_{suffix}"))
+    # A new process opening the older database has nothing recorded yet
+    del _search_index_engines[connection.engine]
+    assert not SearchService._has_search_index(test_db)
+
+    assert ensure_automation_search_index(connection)
+    assert SearchService.search_automations(test_db, "hallway")[1] == 1
+
+
+def test_search_statements_are_cached():
+    """Test that searches with new parameter values reuse compiled SQL."""
+    from app.models import QUERY_CACHE_SIZE, create_db_engine
+    from app.models.database import Base
+    from sqlalchemy.orm import sessionmaker
+
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    compiled_cache = engine._compiled_cache
+    assert compiled_cache.capacity == QUERY_CACHE_SIZE
+
+    with session_factory() as db:
+        SearchService.search_automations(db, "light", trigger_filter="state")
+        SearchService.get_facets(db, "light", trigger_filter="state")
+    cached_statements = len(compiled_cache)
+
+    with session_factory() as db:
+        SearchService.search_automations(db, "motion", page=3, trigger_filter="time")
+        SearchService.get_facets(db, "motion", trigger_filter="time")
+
+    assert len(compiled_cache) == cached_statements
+
+
+def test_cursor_pagination_matches_offset_pages(test_db):
+    """Test that walking pages by cursor yields the same pages as offsets."""
+    from datetime import datetime
+
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+
+    # Several rows share a timestamp so the id tiebreak is exercised
+    for i in range(25):
+        test_db.add(
+            Automation(
+                alias=f"Light {i}",
+                trigger_types="state",
+                source_file_path="automations.yaml",
+                github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+                repository_id=repo.id,
+                indexed_at=datetime(2025, 1, 1 + i // 4),
+            )
+        )
+    test_db.commit()
+
+    cursor = None
+    for page in range(1, 4):
+        by_offset, total = SearchService.search_automations(
+            test_db, "light", page=page, per_page=10
+        )
+        by_cursor, _ = SearchService.search_automations(
+            test_db, "light", per_page=10, cursor=cursor
+        )
+        assert by_cursor == by_offset
+        assert total == 25
+        if by_cursor:
+            cursor = SearchService.decode_cursor(
+                SearchService.encode_cursor(by_cursor[-1])
+            )
+
+    assert len(by_cursor) == 5
+
+
+def test_cursor_pagination_reaches_rows_without_timestamp(test_db):
+    """Test that cursors page through rows whose indexed_at is NULL."""
+    from datetime import datetime
+
+    repo = Repository(
+        name="test-repo",
+        owner="testuser",
+        url="https://github.com/testuser/test-repo",
+    )
+    test_db.add(repo)
+    test_db.commit()
+
+    for i in range(7):
+        automation = Automation(
+            alias=f"Light {i}",
+            trigger_types="state",
+            source_file_path="automations.yaml",
+            github_url="https://github.com/testuser/test-repo/blob/main/automations.yaml",
+            repository_id=repo.id,
+        )
+        test_db.add(automation)
+        test_db.flush()
+        # Rows from older databases were never stamped
+        automation.indexed_at = datetime(2025, 1, 1) if i < 3 else None
+    test_db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        results, total = SearchService.search_automations(
+            test_db, "light", per_page=2, cursor=cursor
+        )
+        seen.extend(result["alias"] for result in results)
+        if len(results) < 2:
+            break
+        cursor = SearchService.decode_cursor(SearchService.encode_cursor(results[-1]))
+
+    assert total == 7
+    assert sorted(seen) == sorted(f"Light {i}" for i in range(7))
+    assert len(seen) == 7
+
+
+def test_decode_cursor_rejects_garbage():
+    """Test that malformed cursors raise ValueError."""
+    for cursor in ("not-a-cursor", "", "bm9waXBl"):
+        with pytest.raises(ValueError):
+            SearchService.decode_cursor(cursor)
+
+
+def test_lookup_tables_track_changes(test_db):
+    """Test that trigger and action lookups follow inserts, updates and deletes."""
+    automation = _add_light_automation(test_db)
+
+    assert SearchService.search_automations(test_db, "", trigger_filter="state")[1] == 1
+    assert (
+        SearchService.search_automations(test_db, "", action_domain_filter="light")[1]
+        == 1
+    )
+
+    automation.trigger_types = "time,sun"
+    automation.action_calls = "switch.turn_off"
+    test_db.commit()
+    assert SearchService.search_automations(test_db, "", trigger_filter="state")[1] == 0
+    assert SearchService.search_automations(test_db, "", trigger_filter="sun")[1] == 1
+    assert (
+        SearchService.search_automations(test_db, "", action_filter="switch.turn_off")[
+            1
+        ]
+        == 1
+    )
+
+    test_db.delete(automation)
+    test_db.commit()
+    assert test_db.query(AutomationTrigger).count() == 0
+    assert test_db.query(AutomationActionCall).count() == 0
+
+
+def test_lookup_tables_backfilled_for_existing_database(test_db):
+    """Test that an existing database gains populated lookup tables."""
+    from app.models.database import ensure_automation_lookups
+
+    _add_light_automation(test_db)
+    test_db.query(AutomationTrigger).delete()
+    test_db.query(AutomationActionCall).delete()
+    assert SearchService.search_automations(test_db, "", trigger_filter="state")[1] == 0
+
+    assert ensure_automation_lookups(test_db.connection())
+    assert not ensure_automation_lookups(test_db.connection())
+
+    assert SearchService.search_automations(test_db, "", trigger_filter="state")[1] == 1
+    action = test_db.query(AutomationActionCall).one()
+    assert (action.action_call, action.domain) == ("light.turn_on", "light")
@@ -71,3 +71,31 @@ def test_export_search_index_writes_frontend_contract(test_db, tmp_path):
             "indexed_at": "2026-05-08T12:30:00",
         }
     ]
+
+
+def test_export_search_index_cleans_comma_separated_columns(test_db, tmp_path):
+    """Whitespace and empty entries in legacy rows are not exported."""
+    repository = Repository(
+        name="legacy-config",
+        owner="testuser",
+        url="https://github.com/testuser/legacy-config",
+    )
+    test_db.add(repository)
+    test_db.flush()
+    test_db.add(
+        Automation(
+            alias="Legacy Automation",
+            trigger_types="state, time,",
+            action_calls=" light.turn_on,,notify.mobile_app ",
+            source_file_path="automations.yaml",
+            github_url="https://github.com/testuser/legacy-config/blob/main/automations.yaml",
+            repository_id=repository.id,
+        )
+    )
+    test_db.commit()
+
+    output_path = export_search_index(test_db, tmp_path / "search-index.json")
+
+    (automation,) = json.loads(output_path.read_text(encoding="utf-8"))["automations"]
+    assert automation["trigger_types"] == ["state", "time"]
+    assert automation["action_calls"] == ["light.turn_on", "notify.mobile_app"]